@@ -6,5 +6,10 @@ setup(
     packages=find_packages(),
     install_requires=[
         # 依赖包列表
-    ]
+        'numpy',
+    ],
+    extras_require={
+        # 可选：更快的 JSON 编码和 MessagePack 响应格式
+        'fast': ['orjson', 'msgpack'],
+    }
 ) 
\ No newline at end of file
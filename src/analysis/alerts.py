@@ -0,0 +1,263 @@
+import itertools
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..database.realtime_store import RealtimeFrame, RealtimeStore, get_realtime_store
+
+# 预警字段 -> 实时行情表的列
+ALERT_FIELDS = {
+    'price': 'current_price',
+    'change_percent': 'change_percent',
+    'volume': 'volume',
+    'amount': 'amount'
+}
+
+# 穿越方向：above 为由下向上穿越阈值，below 为由上向下穿越阈值
+ALERT_DIRECTIONS = {'above': 1, 'below': -1}
+
+class AlertRule:
+    """一条预警规则"""
+    __slots__ = ('alert_id', 'stock_code', 'field', 'direction', 'threshold', 'cooldown', 'once',
+                 'message', 'active', 'last_fired')
+
+    def __init__(self, alert_id: int, stock_code: str, field: str, direction: str, threshold: float,
+                 cooldown: float, once: bool, message: str):
+        self.alert_id = alert_id
+        self.stock_code = stock_code
+        self.field = field
+        self.direction = direction
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.once = once
+        self.message = message
+        self.active = True
+        self.last_fired = -np.inf
+
+    def to_dict(self) -> Dict:
+        return {name: getattr(self, name) for name in self.__slots__ if name != 'last_fired'}
+
+class AlertEventStream:
+    """触发的预警事件，按序号保存在定长环形缓冲中，SSE 推送方按序号增量读取"""
+    def __init__(self, capacity: int = 10000):
+        self._events: deque = deque(maxlen=capacity)
+        self._seq = 0
+        self._lock = threading.Lock()
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    def publish(self, events: List[Dict]) -> int:
+        """追加事件并分配序号，返回最新序号"""
+        with self._lock:
+            for event in events:
+                self._seq += 1
+                event['seq'] = self._seq
+                self._events.append(event)
+            return self._seq
+
+    def since(self, seq: int) -> Tuple[int, List[Dict]]:
+        """序号大于 seq 的事件（已被环形缓冲淘汰的不再返回），返回 (最新序号, 事件列表)"""
+        with self._lock:
+            if not self._events or seq >= self._seq:
+                return self._seq, []
+            skip = max(seq - self._events[0]['seq'] + 1, 0)
+            return self._seq, list(itertools.islice(self._events, skip, None))
+
+class _FieldIndex:
+    """同一字段的全部预警，按 (股票编号, 阈值) 排序，indptr 是每只股票的区间"""
+    def __init__(self, rules: List[AlertRule], symbol_ids: Dict[str, int]):
+        rules = sorted(rules, key=lambda rule: (symbol_ids[rule.stock_code], rule.threshold))
+        self.rules = rules
+        symbols = np.array([symbol_ids[rule.stock_code] for rule in rules], dtype=np.int64)
+        self.indptr = np.zeros(len(symbol_ids) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(symbols, minlength=len(symbol_ids)), out=self.indptr[1:])
+        self.thresholds = np.array([rule.threshold for rule in rules], dtype=np.float64)
+        self.directions = np.array([ALERT_DIRECTIONS[rule.direction] for rule in rules], dtype=np.int8)
+        self.cooldowns = np.array([rule.cooldown for rule in rules], dtype=np.float64)
+        self.last_fired = np.array([rule.last_fired for rule in rules], dtype=np.float64)
+        self.active = np.array([rule.active for rule in rules], dtype=bool)
+
+class AlertEngine:
+    """向量化的价格/涨幅/量能预警
+
+    规则按字段分组，组内按股票和阈值排序存成数组。每次行情更新只取出发生变化的股票，
+    把它们的预警区间一次展开，用上一笔和这一笔的值与阈值做向量比较，只有穿越阈值的
+    预警触发；同一预警在 cooldown 秒内不重复触发，once=True 的预警触发后失效。
+    触发的事件写入 AlertEventStream，由 SSE 服务推送。
+    """
+    def __init__(self, store: RealtimeStore = None, stream: AlertEventStream = None):
+        self.store = store if store is not None else get_realtime_store()
+        self.stream = stream or AlertEventStream()
+        self._rules: Dict[int, AlertRule] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._dirty = True
+        self._symbols: List[str] = []
+        self._fields: Dict[str, _FieldIndex] = {}
+        self._last_values: Dict[str, np.ndarray] = {}
+        self._slot_key = None
+        self._slot_symbols = np.empty(0, dtype=np.int64)
+        self._version = 0
+
+    def add_alert(self, stock_code: str, field: str, direction: str, threshold: float,
+                  cooldown: float = 300.0, once: bool = False, message: str = '') -> int:
+        """添加预警，返回预警编号"""
+        if field not in ALERT_FIELDS:
+            raise ValueError(f"不支持的预警字段: {field}")
+        if direction not in ALERT_DIRECTIONS:
+            raise ValueError(f"不支持的穿越方向: {direction}")
+        with self._lock:
+            alert_id = next(self._ids)
+            self._rules[alert_id] = AlertRule(alert_id, stock_code, field, direction, float(threshold),
+                                              float(cooldown), bool(once), message)
+            self._dirty = True
+        return alert_id
+
+    def remove_alert(self, alert_id: int) -> bool:
+        """删除预警"""
+        with self._lock:
+            removed = self._rules.pop(alert_id, None) is not None
+            self._dirty = removed or self._dirty
+        return removed
+
+    def list_alerts(self, stock_code: Optional[str] = None) -> List[Dict]:
+        """全部（或某只股票的）预警"""
+        with self._lock:
+            self._sync_rules()
+            return [rule.to_dict() for rule in self._rules.values()
+                    if stock_code is None or rule.stock_code == stock_code]
+
+    def _sync_rules(self):
+        """把数组中的触发状态写回规则对象，调用方需持有 self._lock（数组由 evaluate 在锁内修改）"""
+        for index in self._fields.values():
+            for rule, fired, active in zip(index.rules, index.last_fired.tolist(), index.active.tolist()):
+                rule.last_fired = fired
+                rule.active = active
+
+    def _rebuild(self):
+        """规则变化后重建各字段的排序数组，保留每只股票上一次的值"""
+        self._sync_rules()
+        symbols = sorted({rule.stock_code for rule in self._rules.values()})
+        symbol_ids = {code: i for i, code in enumerate(symbols)}
+        old_ids = {code: i for i, code in enumerate(self._symbols)}
+        keep = [(symbol_ids[code], old_ids[code]) for code in symbols if code in old_ids]
+        new_rows = np.array([new for new, _ in keep], dtype=np.int64)
+        old_rows = np.array([old for _, old in keep], dtype=np.int64)
+
+        by_field: Dict[str, List[AlertRule]] = {}
+        for rule in self._rules.values():
+            by_field.setdefault(rule.field, []).append(rule)
+        self._fields = {field: _FieldIndex(rules, symbol_ids) for field, rules in by_field.items()}
+
+        last_values = {}
+        for field in ALERT_FIELDS:
+            values = np.full(len(symbols), np.nan)
+            if field in self._last_values and len(keep):
+                values[new_rows] = self._last_values[field][old_rows]
+            last_values[field] = values
+        self._symbols = symbols
+        self._last_values = last_values
+        self._slot_key = None
+        self._dirty = False
+
+    def _map_slots(self, frame: RealtimeFrame) -> np.ndarray:
+        """行情帧槽位 -> 预警股票编号（没有预警为 -1），股票数变化时才重算"""
+        key = (id(self._symbols), frame.count)
+        if key != self._slot_key:
+            symbol_ids = {code: i for i, code in enumerate(self._symbols)}
+            self._slot_symbols = np.fromiter((symbol_ids.get(code, -1) for code in frame.codes[:frame.count]),
+                                             dtype=np.int64, count=frame.count)
+            self._slot_key = key
+        return self._slot_symbols
+
+    def evaluate(self, rows: Sequence[Dict] = None, timestamp: Optional[float] = None) -> List[Dict]:
+        """采集器的接收者：检查自上次以来发生变化的股票，返回并发布触发的预警事件"""
+        now = time.time() if timestamp is None else timestamp
+        with self._lock:
+            if self._dirty:
+                self._rebuild()
+            frame = self.store.frame()
+            if frame.version == self._version or not self._fields:
+                self._version = frame.version
+                return []
+            slots = frame.changed_slots(self._version)
+            self._version = frame.version
+            symbols = self._map_slots(frame)[slots]
+            watched = symbols >= 0
+            slots, symbols = slots[watched], symbols[watched]
+
+            events = []
+            for field, index in self._fields.items():
+                events.extend(self._check_field(field, index, frame, slots, symbols, now))
+        if events:
+            self.stream.publish(events)
+        return events
+
+    def _check_field(self, field: str, index: _FieldIndex, frame: RealtimeFrame, slots: np.ndarray,
+                     symbols: np.ndarray, now: float) -> List[Dict]:
+        """一个字段的穿越检查"""
+        current = frame.columns[ALERT_FIELDS[field]][slots].astype(np.float64)
+        last = self._last_values[field]
+        previous = last[symbols]
+        last[symbols] = current
+
+        # 展开变化股票的预警区间：每只股票 [indptr[s], indptr[s + 1])
+        starts = index.indptr[symbols]
+        lengths = index.indptr[symbols + 1] - starts
+        total = int(lengths.sum())
+        if not total:
+            return []
+        owners = np.repeat(np.arange(len(symbols)), lengths)
+        candidates = starts[owners] + np.arange(total) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+        before = previous[owners]
+        after = current[owners]
+        thresholds = index.thresholds[candidates]
+        directions = index.directions[candidates]
+        crossed = np.where(directions > 0,
+                           (before < thresholds) & (after >= thresholds),
+                           (before > thresholds) & (after <= thresholds))
+        crossed &= ~np.isnan(before)
+        crossed &= index.active[candidates]
+        crossed &= now - index.last_fired[candidates] >= index.cooldowns[candidates]
+        hits = np.flatnonzero(crossed)
+        if not len(hits):
+            return []
+
+        fired = candidates[hits]
+        index.last_fired[fired] = now
+        events = []
+        for alert, owner in zip(fired.tolist(), owners[hits].tolist()):
+            rule = index.rules[alert]
+            if rule.once:
+                index.active[alert] = False
+            slot = slots[owner]
+            events.append({
+                'alert_id': rule.alert_id,
+                'stock_code': rule.stock_code,
+                'stock_name': frame.names[slot],
+                'field': field,
+                'direction': rule.direction,
+                'threshold': rule.threshold,
+                'value': float(current[owner]),
+                'prev_value': float(previous[owner]),
+                'message': rule.message,
+                'timestamp': now
+            })
+        return events
+
+_default_engine: Optional[AlertEngine] = None
+_default_lock = threading.Lock()
+
+def get_alert_engine() -> AlertEngine:
+    """进程内共享的预警引擎（采集器检查，API 管理规则和读取事件）"""
+    global _default_engine
+    with _default_lock:
+        if _default_engine is None:
+            _default_engine = AlertEngine()
+        return _default_engine
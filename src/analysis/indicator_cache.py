@@ -0,0 +1,155 @@
+import io
+import threading
+from typing import Dict, Optional, Sequence, Set, Tuple
+import logging
+
+import numpy as np
+
+from ..database.db_manager import STORED_FREQS, DatabaseManager, source_freq
+from ..database.lru_cache import ByteLRUCache, arrays_nbytes
+from .indicators import DEFAULT_PARAMS, IndicatorEngine, indicator_outputs
+from .resampler import BarResampler
+
+def _params_key(indicator: str, params: Optional[Sequence]) -> Tuple[tuple, str]:
+    """规范化指标参数，返回 (参数元组, 缓存键文本)"""
+    if indicator not in DEFAULT_PARAMS:
+        raise ValueError(f"不支持的指标: {indicator}")
+    if params is None:
+        params = DEFAULT_PARAMS[indicator]
+    elif isinstance(params, (int, float)):
+        params = (params,)
+    params = tuple(params)
+    return params, ','.join(str(p) for p in params)
+
+def _pack(series: Dict[str, np.ndarray]) -> bytes:
+    """指标序列 -> npz 二进制"""
+    buffer = io.BytesIO()
+    np.savez(buffer, **series)
+    return buffer.getvalue()
+
+def _unpack(payload: bytes) -> Dict[str, np.ndarray]:
+    """npz 二进制 -> 指标序列"""
+    with np.load(io.BytesIO(payload), allow_pickle=False) as data:
+        return {name: data[name] for name in data.files}
+
+class IndicatorCache:
+    """两级指标缓存：进程内按字节限额的 LRU + 数据库 indicator_cache 表
+
+    缓存键为 (股票代码, 频率, 指标, 参数)。K线写入时 DatabaseManager 在同一事务中
+    删除对应股票的持久化缓存，并在提交后通知本对象递增 (股票代码, 源K线表) 的代数；
+    内存缓存记录写入时的代数，代数不一致即为过期，命中内存缓存时不访问数据库。
+    内存层只感知本进程的写入，其他进程写入的K线在持久化层生效（缓存行已被删除），
+    需要时调用 invalidate 清除内存层。
+    """
+    def __init__(self, db: DatabaseManager = None, max_memory_bytes: int = 32 * 1024 * 1024,
+                 resampler: BarResampler = None):
+        self.db = db or DatabaseManager()
+        self.resampler = resampler or BarResampler(self.db)
+        # 值为 (代数, 指标序列)
+        self._memory = ByteLRUCache(max_memory_bytes, lambda entry: arrays_nbytes(entry[1]))
+        self._generations: Dict[Tuple[str, str], int] = {}
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'db_hits': 0, 'misses': 0}
+        self.db.add_bar_listener(self._on_bars_written)
+
+    def get(self, stock_code: str, freq: str, indicator: str,
+            params: Optional[Sequence] = None) -> Dict[str, np.ndarray]:
+        """获取指标序列，返回 time 及各输出列（只读数组）"""
+        params, params_text = _params_key(indicator, params)
+        key = (stock_code, freq, indicator, params_text)
+
+        # 先取代数再读数据：读取期间发生的写入会递增代数，读到的旧结果不会被当作有效缓存
+        generation = self._generation(stock_code, freq)
+        entry = self._memory.get(key)
+        if entry is not None and entry[0] == generation:
+            self._count('memory_hits')
+            return entry[1]
+
+        with self.db.read_connection() as conn:
+            row = conn.execute('''
+            SELECT payload FROM indicator_cache
+            WHERE stock_code = ? AND freq = ? AND indicator = ? AND params = ?
+            ''', key).fetchone()
+        if row is not None:
+            series = _unpack(row[0])
+            self._remember(key, generation, series)
+            self._count('db_hits')
+            return series
+
+        self._count('misses')
+        last_time = self._source_last_time(stock_code, freq)
+        series = self._compute(stock_code, freq, indicator, params)
+        self._persist(key, last_time, series)
+        self._remember(key, generation, series)
+        return series
+
+    def _generation(self, stock_code: str, freq: str) -> int:
+        """股票源K线的当前代数"""
+        with self._lock:
+            return self._generations.get((stock_code, source_freq(freq)), 0)
+
+    def _count(self, name: str):
+        with self._lock:
+            self.stats[name] += 1
+
+    def _source_last_time(self, stock_code: str, freq: str) -> Optional[int]:
+        """源K线最后一根的时间"""
+        return self.db.get_last_bar_time(stock_code, source_freq(freq))
+
+    def _compute(self, stock_code: str, freq: str, indicator: str, params: tuple) -> Dict[str, np.ndarray]:
+        """从K线历史计算单只股票的指标序列"""
+        if freq in STORED_FREQS:
+            bars = self.db.get_bars(stock_code, freq)
+        else:
+            bars = self.resampler.get_bars(stock_code, freq)
+        names = indicator_outputs(indicator, params)
+        if not len(bars['time']):
+            return {'time': np.array(bars['time']), **{name: np.empty(0) for name in names}}
+        engine = IndicatorEngine([stock_code], {indicator: params})
+        result = engine.compute(bars['high'][None, :], bars['low'][None, :], bars['close'][None, :])
+        series = {'time': np.array(bars['time'])}
+        for name in names:
+            series[name] = result[name][0]
+        return series
+
+    def _persist(self, key: tuple, last_time: Optional[int], series: Dict[str, np.ndarray]):
+        """写入持久化缓存；计算期间源K线有变化时不写入，避免保存过期结果"""
+        with self.db.write_connection() as conn:
+            try:
+                conn.execute('BEGIN IMMEDIATE')
+                if self._source_last_time(key[0], key[1]) == last_time:
+                    conn.execute('''
+                    INSERT OR REPLACE INTO indicator_cache
+                    (stock_code, freq, indicator, params, last_bar_time, payload, update_time)
+                    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ''', key + (last_time, _pack(series)))
+                else:
+                    logging.debug(f"指标计算期间K线已更新，跳过缓存: {key}")
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logging.error(f"保存指标缓存失败: {str(e)}")
+
+    def _remember(self, key: tuple, generation: int, series: Dict[str, np.ndarray]):
+        """放入内存缓存，缓存的数组设为只读；读取期间源K线已更新的结果不放入"""
+        for array in series.values():
+            array.flags.writeable = False
+        if self._generation(key[0], key[1]) == generation:
+            self._memory.put(key, (generation, series))
+
+    def _on_bars_written(self, data_type: str, codes: Set[str]):
+        """K线写入后递增代数并清除内存缓存（持久化缓存已在写入事务中删除）"""
+        with self._lock:
+            for code in codes:
+                self._generations[(code, data_type)] = self._generations.get((code, data_type), 0) + 1
+        self._memory.discard_if(lambda key: key[0] in codes and source_freq(key[1]) == data_type)
+
+    def invalidate(self, stock_code: Optional[str] = None):
+        """清除内存缓存，指定股票时只清除该股票（用于其他进程写入K线之后）"""
+        self._memory.discard_if(lambda key: stock_code is None or key[0] == stock_code)
+
+    def cache_stats(self) -> Dict:
+        """缓存统计"""
+        with self._lock:
+            stats = dict(self.stats)
+        return {**stats, 'entries': len(self._memory), 'bytes': self._memory.bytes}
@@ -0,0 +1,289 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+from ..database.db_manager import DatabaseManager
+
+# 默认参数，与通达信默认公式一致
+DEFAULT_PARAMS = {
+    'ma': (5, 10, 20, 60),
+    'macd': (12, 26, 9),
+    'kdj': (9, 3, 3),
+    'rsi': (6, 12, 24),
+    'boll': (20, 2)
+}
+
+# 全市场数据约定为二维数组（股票 × 时间），每只股票的数据右对齐，
+# 最后一列为最新K线，历史较短的股票左侧用 NaN 填充。
+
+def indicator_outputs(indicator: str, params: Sequence) -> List[str]:
+    """指标对应的输出序列名称"""
+    if indicator == 'ma':
+        return [f'ma{n}' for n in params]
+    if indicator == 'rsi':
+        return [f'rsi{n}' for n in params]
+    outputs = {
+        'macd': ['dif', 'dea', 'macd'],
+        'kdj': ['k', 'd', 'j'],
+        'boll': ['boll_mid', 'boll_upper', 'boll_lower']
+    }
+    if indicator not in outputs:
+        raise ValueError(f"不支持的指标: {indicator}")
+    return outputs[indicator]
+
+def align_right(series: Sequence[np.ndarray], length: int) -> np.ndarray:
+    """把每只股票的一维序列右对齐拼成二维数组"""
+    matrix = np.full((len(series), length), np.nan)
+    for row, values in enumerate(series):
+        values = np.asarray(values, dtype=np.float64)[-length:]
+        if len(values):
+            matrix[row, length - len(values):] = values
+    return matrix
+
+def load_matrix(db: DatabaseManager, codes: Sequence[str], data_type: str = 'daily',
+                length: int = 250) -> Dict[str, np.ndarray]:
+    """从K线表加载多只股票最近 length 根K线，返回 high/low/close 二维数组"""
+    highs, lows, closes = [], [], []
+    for code in codes:
+        bars = db.get_bars(code, data_type)
+        highs.append(bars['high'][-length:])
+        lows.append(bars['low'][-length:])
+        closes.append(bars['close'][-length:])
+    return {
+        'high': align_right(highs, length),
+        'low': align_right(lows, length),
+        'close': align_right(closes, length)
+    }
+
+def _rolling_sum(x: np.ndarray, n: int) -> Tuple[np.ndarray, np.ndarray]:
+    """沿时间轴的滚动求和及窗口内有效值个数"""
+    valid = ~np.isnan(x)
+    csum = np.cumsum(np.where(valid, x, 0.0), axis=1)
+    ccount = np.cumsum(valid, axis=1)
+    total = csum.copy()
+    count = ccount.copy()
+    total[:, n:] -= csum[:, :-n]
+    count[:, n:] -= ccount[:, :-n]
+    return total, count
+
+def ma(x: np.ndarray, n: int) -> np.ndarray:
+    """简单移动平均，不足 n 根为 NaN"""
+    total, count = _rolling_sum(x, n)
+    return np.where(count == n, total / n, np.nan)
+
+def std(x: np.ndarray, n: int) -> np.ndarray:
+    """滚动样本标准差（通达信 STD），不足 n 根为 NaN"""
+    total, count = _rolling_sum(x, n)
+    total_sq, _ = _rolling_sum(x * x, n)
+    variance = (total_sq - total * total / n) / (n - 1)
+    return np.where(count == n, np.sqrt(np.maximum(variance, 0.0)), np.nan)
+
+def hhv(x: np.ndarray, n: int) -> np.ndarray:
+    """n 周期最高值，不足 n 根时取已有数据"""
+    padded = np.concatenate([np.full((x.shape[0], n - 1), np.nan), x], axis=1)
+    return np.fmax.reduce(np.lib.stride_tricks.sliding_window_view(padded, n, axis=1), axis=2)
+
+def llv(x: np.ndarray, n: int) -> np.ndarray:
+    """n 周期最低值，不足 n 根时取已有数据"""
+    padded = np.concatenate([np.full((x.shape[0], n - 1), np.nan), x], axis=1)
+    return np.fmin.reduce(np.lib.stride_tricks.sliding_window_view(padded, n, axis=1), axis=2)
+
+def _smooth_step(prev: np.ndarray, x: np.ndarray, alpha: float) -> np.ndarray:
+    """指数平滑一步：prev 为空时以当前值为初值，当前值为空时保持不变"""
+    return np.where(np.isnan(prev), x,
+                    np.where(np.isnan(x), prev, alpha * x + (1 - alpha) * prev))
+
+def smooth(x: np.ndarray, alpha: float, seed: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """沿时间轴做指数平滑，所有股票同时计算；返回 (结果, 最后状态)"""
+    out = np.full_like(x, np.nan)
+    prev = np.full(x.shape[0], np.nan)
+    for t in range(x.shape[1]):
+        column = x[:, t]
+        if seed is not None:
+            prev = np.where(np.isnan(prev) & ~np.isnan(column), seed, prev)
+        prev = _smooth_step(prev, column, alpha)
+        out[:, t] = np.where(np.isnan(column), np.nan, prev)
+    return out, prev
+
+def _rsv(high_n: np.ndarray, low_n: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """未成熟随机值，最高等于最低时取0"""
+    spread = high_n - low_n
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(spread > 0, (close - low_n) / spread * 100, np.where(np.isnan(spread), np.nan, 0.0))
+
+def _rsi_value(up: np.ndarray, total: np.ndarray) -> np.ndarray:
+    """RSI = 上涨平均 / 绝对变动平均 × 100"""
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(total > 0, up / total * 100, np.nan)
+
+class IndicatorEngine:
+    """全市场技术指标引擎（MA、MACD、KDJ、RSI、BOLL）
+
+    compute() 在二维数组上一次性算出所有股票的完整指标序列，并保存每只股票的
+    递推状态（EMA、DEA、K/D、RSI 平滑值、最近几根K线的窗口）；之后 update()
+    只用新K线和这些状态计算最新值，计算量与历史长度无关。
+    """
+    def __init__(self, codes: Sequence[str], params: Optional[Dict] = None):
+        self.codes = list(codes)
+        self.index = {code: i for i, code in enumerate(self.codes)}
+        self.params = {**DEFAULT_PARAMS, **(params or {})}
+        self.window = max(max(self.params['ma']), self.params['boll'][0], self.params['kdj'][0])
+        self.state: Optional[Dict[str, np.ndarray]] = None
+        self.latest: Dict[str, np.ndarray] = {}
+
+    def compute(self, high: np.ndarray, low: np.ndarray, close: np.ndarray) -> Dict[str, np.ndarray]:
+        """批量计算完整指标序列（二维数组），并初始化增量状态"""
+        high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+        result = {}
+        state = {}
+
+        for n in self.params['ma']:
+            result[f'ma{n}'] = ma(close, n)
+
+        fast, slow, signal = self.params['macd']
+        ema_fast, state['ema_fast'] = smooth(close, 2 / (fast + 1))
+        ema_slow, state['ema_slow'] = smooth(close, 2 / (slow + 1))
+        result['dif'] = ema_fast - ema_slow
+        result['dea'], state['dea'] = smooth(result['dif'], 2 / (signal + 1))
+        result['macd'] = 2 * (result['dif'] - result['dea'])
+
+        n, m1, m2 = self.params['kdj']
+        rsv = _rsv(hhv(high, n), llv(low, n), close)
+        result['k'], state['k'] = smooth(rsv, 1 / m1, seed=50.0)
+        result['d'], state['d'] = smooth(result['k'], 1 / m2, seed=50.0)
+        result['j'] = 3 * result['k'] - 2 * result['d']
+
+        prev_close = np.concatenate([np.full((close.shape[0], 1), np.nan), close[:, :-1]], axis=1)
+        change = close - prev_close
+        for n in self.params['rsi']:
+            up, state[f'rsi_up{n}'] = smooth(np.maximum(change, 0), 1 / n)
+            total, state[f'rsi_abs{n}'] = smooth(np.abs(change), 1 / n)
+            result[f'rsi{n}'] = _rsi_value(up, total)
+
+        n, width = self.params['boll']
+        result['boll_mid'] = ma(close, n)
+        deviation = std(close, n)
+        result['boll_upper'] = result['boll_mid'] + width * deviation
+        result['boll_lower'] = result['boll_mid'] - width * deviation
+
+        # 增量计算需要的最近窗口
+        kdj_n = self.params['kdj'][0]
+        state['close_win'] = self._tail(close, self.window)
+        state['high_win'] = self._tail(high, kdj_n)
+        state['low_win'] = self._tail(low, kdj_n)
+
+        self.state = state
+        self.latest = {name: values[:, -1].copy() for name, values in result.items()}
+        logging.info(f"指标批量计算完成: {close.shape[0]} 只股票 × {close.shape[1]} 根K线")
+        return result
+
+    def _tail(self, x: np.ndarray, n: int) -> np.ndarray:
+        """取最后 n 列，不足时左侧补 NaN"""
+        tail = x[:, -n:]
+        if tail.shape[1] < n:
+            tail = np.concatenate([np.full((x.shape[0], n - tail.shape[1]), np.nan), tail], axis=1)
+        return tail.copy()
+
+    def update(self, high: np.ndarray, low: np.ndarray, close: np.ndarray,
+               final: bool = True) -> Dict[str, np.ndarray]:
+        """用一根新K线（每只股票一个值）增量更新指标
+
+        没有新K线的股票传 NaN，其指标和状态保持不变。final=False 表示盘中
+        尚未走完的K线：只返回最新值而不推进状态，同一根K线可以反复刷新。
+        """
+        if self.state is None:
+            self.state = self._empty_state()
+        high, low, close = (np.asarray(a, dtype=np.float64) for a in (high, low, close))
+        state = self.state
+        has_bar = ~np.isnan(close)
+        new_state = {}
+        result = {}
+
+        def shift(window: np.ndarray, value: np.ndarray) -> np.ndarray:
+            shifted = np.concatenate([window[:, 1:], value[:, None]], axis=1)
+            return np.where(has_bar[:, None], shifted, window)
+
+        close_win = shift(state['close_win'], close)
+        for n in self.params['ma']:
+            result[f'ma{n}'] = close_win[:, -n:].mean(axis=1)
+
+        fast, slow, signal = self.params['macd']
+        new_state['ema_fast'] = _smooth_step(state['ema_fast'], close, 2 / (fast + 1))
+        new_state['ema_slow'] = _smooth_step(state['ema_slow'], close, 2 / (slow + 1))
+        result['dif'] = new_state['ema_fast'] - new_state['ema_slow']
+        new_state['dea'] = _smooth_step(state['dea'], np.where(has_bar, result['dif'], np.nan),
+                                        2 / (signal + 1))
+        result['dea'] = new_state['dea']
+        result['macd'] = 2 * (result['dif'] - result['dea'])
+
+        n, m1, m2 = self.params['kdj']
+        high_win = shift(state['high_win'], high)
+        low_win = shift(state['low_win'], low)
+        rsv = np.where(has_bar, _rsv(np.fmax.reduce(high_win, axis=1),
+                                     np.fmin.reduce(low_win, axis=1), close), np.nan)
+        k_prev = np.where(np.isnan(state['k']) & has_bar, 50.0, state['k'])
+        new_state['k'] = _smooth_step(k_prev, rsv, 1 / m1)
+        d_prev = np.where(np.isnan(state['d']) & has_bar, 50.0, state['d'])
+        new_state['d'] = _smooth_step(d_prev, np.where(has_bar, new_state['k'], np.nan), 1 / m2)
+        result['k'] = new_state['k']
+        result['d'] = new_state['d']
+        result['j'] = 3 * result['k'] - 2 * result['d']
+
+        change = np.where(has_bar, close - state['close_win'][:, -1], np.nan)
+        for n in self.params['rsi']:
+            new_state[f'rsi_up{n}'] = _smooth_step(state[f'rsi_up{n}'], np.maximum(change, 0), 1 / n)
+            new_state[f'rsi_abs{n}'] = _smooth_step(state[f'rsi_abs{n}'], np.abs(change), 1 / n)
+            result[f'rsi{n}'] = _rsi_value(new_state[f'rsi_up{n}'], new_state[f'rsi_abs{n}'])
+
+        n, width = self.params['boll']
+        window = close_win[:, -n:]
+        result['boll_mid'] = window.mean(axis=1)
+        deviation = window.std(axis=1, ddof=1)
+        result['boll_upper'] = result['boll_mid'] + width * deviation
+        result['boll_lower'] = result['boll_mid'] - width * deviation
+
+        # 没有新K线的股票沿用上一次的指标值
+        if self.latest:
+            for name, values in result.items():
+                result[name] = np.where(has_bar, values, self.latest[name])
+
+        if final:
+            new_state['close_win'] = close_win
+            new_state['high_win'] = high_win
+            new_state['low_win'] = low_win
+            self.state = new_state
+            self.latest = result
+        return result
+
+    def _empty_state(self) -> Dict[str, np.ndarray]:
+        """没有历史数据时的初始状态"""
+        count = len(self.codes)
+        empty = lambda: np.full(count, np.nan)
+        state = {name: empty() for name in ('ema_fast', 'ema_slow', 'dea', 'k', 'd')}
+        for n in self.params['rsi']:
+            state[f'rsi_up{n}'] = empty()
+            state[f'rsi_abs{n}'] = empty()
+        kdj_n = self.params['kdj'][0]
+        state['close_win'] = np.full((count, self.window), np.nan)
+        state['high_win'] = np.full((count, kdj_n), np.nan)
+        state['low_win'] = np.full((count, kdj_n), np.nan)
+        return state
+
+    def get(self, code: str) -> Dict[str, float]:
+        """单只股票的最新指标"""
+        row = self.index[code]
+        return {name: float(values[row]) for name, values in self.latest.items()}
+
+    def update_from_quotes(self, quotes: List[Dict], final: bool = False) -> Dict[str, np.ndarray]:
+        """用采集器的行情字典（code/high/low/current）更新，未出现的股票保持不变"""
+        high = np.full(len(self.codes), np.nan)
+        low = np.full(len(self.codes), np.nan)
+        close = np.full(len(self.codes), np.nan)
+        for quote in quotes:
+            row = self.index.get(quote.get('code'))
+            if row is not None:
+                high[row] = quote['high']
+                low[row] = quote['low']
+                close[row] = quote['current']
+        return self.update(high, low, close, final)
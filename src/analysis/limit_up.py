@@ -0,0 +1,217 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+from ..database.bar_keys import pack_date
+from ..database.db_manager import DatabaseManager
+
+# 涨跌幅限制：科创板/创业板 20%，北交所 30%，其余 ST 5%、普通 10%
+STAR_PREFIXES = ('688', '689')
+CHINEXT_PREFIXES = ('300', '301')
+BEIJING_PREFIXES = ('8', '4', '92')
+
+# 种子计算回看的自然日数（足够覆盖长假和较长的连板）
+SEED_LOOKBACK_DAYS = 60
+
+def limit_ratio(stock_code: str, stock_name: str = '') -> float:
+    """按板块和是否 ST 返回涨停幅度"""
+    if stock_code.startswith(STAR_PREFIXES + CHINEXT_PREFIXES):
+        return 0.20
+    if stock_code.startswith(BEIJING_PREFIXES):
+        return 0.30
+    if 'ST' in (stock_name or '').upper():
+        return 0.05
+    return 0.10
+
+def limit_prices(prev_close, ratio):
+    """涨停价 = 前收盘 × (1 + 幅度)，四舍五入到分；支持标量和 NumPy 数组
+
+    先保留6位小数消除浮点误差（如 10.45 × 1.1 = 11.495000000000001），再按分四舍五入。
+    """
+    raw = np.round(np.asarray(prev_close, dtype=np.float64) * (1 + np.asarray(ratio)) * 100, 6)
+    return np.floor(raw + 0.5) / 100
+
+class SymbolLimitState:
+    """单只股票当日的涨停状态机：未涨停 -> 封板 <-> 开板"""
+    __slots__ = ('code', 'name', 'prev_close', 'limit_price', 'prev_continuous', 'prev_down',
+                 'sealed', 'first_time', 'breaks', 'change_percent')
+
+    def __init__(self, code: str, name: str, prev_close: float, limit_price: float,
+                 prev_continuous: int = 0, prev_down: bool = False):
+        self.code = code
+        self.name = name
+        self.prev_close = prev_close
+        self.limit_price = limit_price
+        self.prev_continuous = prev_continuous  # 截至上一交易日的连板数
+        self.prev_down = prev_down              # 上一交易日收阴，今日涨停即为反包
+        self.sealed = False
+        self.first_time: Optional[str] = None
+        self.breaks = 0
+        self.change_percent = 0.0
+
+    def update(self, price: float, moment: str) -> bool:
+        """处理一笔价格，状态有变化时返回 True"""
+        self.change_percent = (price - self.prev_close) / self.prev_close * 100
+        at_limit = price >= self.limit_price - 1e-6
+        if at_limit == self.sealed:
+            return False
+        if at_limit and self.first_time is None:
+            self.first_time = moment
+        elif not at_limit:
+            self.breaks += 1
+        self.sealed = at_limit
+        return True
+
+    def record(self, trade_date: str) -> Tuple:
+        """stock_limit_up 表的一行"""
+        continuous = self.prev_continuous + 1 if self.sealed else self.prev_continuous
+        return (self.code, self.name, round(self.change_percent, 2), continuous,
+                self.first_time, self.breaks, int(self.sealed and self.prev_down), trade_date)
+
+def seed_from_daily(codes: np.ndarray, opens: np.ndarray, closes: np.ndarray,
+                    ratios: np.ndarray) -> Dict[str, Tuple[int, bool, float]]:
+    """一次向量化计算所有股票截至最后一天的连板数、最后一天是否收阴以及最后收盘价
+
+    输入按 (股票代码, 日期) 排序的日线列；ratios 为每行所属股票的涨停幅度。
+    """
+    if not len(codes):
+        return {}
+    starts = np.flatnonzero(np.concatenate(([True], codes[1:] != codes[:-1])))
+    ends = np.append(starts[1:], len(codes)) - 1
+
+    prev_close = np.concatenate(([np.nan], closes[:-1]))
+    prev_close[starts] = np.nan  # 每只股票的第一天没有前收盘
+    with np.errstate(invalid='ignore'):
+        is_limit = closes >= limit_prices(prev_close, ratios) - 1e-6
+    is_limit &= ~np.isnan(prev_close)
+
+    # 每组中最后一个非涨停日的位置，连板数 = 组末位置 - 该位置
+    index = np.arange(len(codes))
+    group_floor = np.repeat(starts - 1, ends - starts + 1)
+    last_break = np.maximum.reduceat(np.where(is_limit, group_floor, index), starts)
+    continuous = ends - last_break
+
+    prev_down = closes[ends] < opens[ends]
+    return {code: (int(count), bool(down), float(close))
+            for code, count, down, close in zip(codes[ends].tolist(), continuous.tolist(),
+                                                prev_down.tolist(), closes[ends].tolist())}
+
+class LimitUpEngine:
+    """盘中涨停跟踪
+
+    prepare() 每天执行一次：一条查询取出所有股票最近的日线，向量化算出截至昨日的连板数，
+    并按前收盘和板块规则算出精确涨停价。之后每笔行情只更新对应股票的状态机，
+    状态有变化的股票在同一事务中写入 stock_limit_up。
+    """
+    def __init__(self, db: DatabaseManager = None, persist: bool = True, trade_date: Optional[str] = None):
+        """trade_date 为空时跟随系统日期跨日；回放历史行情时传入回放的交易日"""
+        self.db = db or DatabaseManager()
+        self.persist = persist
+        self.fixed_date = trade_date
+        self.trade_date: Optional[str] = None
+        self.names: Dict[str, str] = {}
+        self.seeds: Dict[str, Tuple[int, bool, float]] = {}
+        self.states: Dict[str, SymbolLimitState] = {}
+
+    def prepare(self, trade_date: Optional[str] = None):
+        """准备某个交易日的涨停价和连板种子"""
+        self.trade_date = trade_date or date.today().isoformat()
+        self.states = {}
+        self.names = self.db.get_bar_symbols('daily')
+        start = (datetime.strptime(self.trade_date, '%Y-%m-%d')
+                 - timedelta(days=SEED_LOOKBACK_DAYS)).strftime('%Y-%m-%d')
+        with self.db.read_connection() as conn:
+            if self.db.is_compact_schema():
+                # 紧凑结构直接按整数日期范围读取，不经过兼容视图的日期格式化
+                rows = conn.execute('''
+                SELECT s.stock_code, b.trade_date, b.open_price, b.close_price
+                FROM bar_daily b JOIN stock_symbol s ON s.symbol_id = b.symbol_id
+                WHERE b.trade_date >= ? AND b.trade_date < ?
+                ORDER BY s.stock_code, b.trade_date
+                ''', (pack_date(start), pack_date(self.trade_date))).fetchall()
+            else:
+                rows = conn.execute('''
+                SELECT stock_code, trade_date, open_price, close_price FROM stock_daily
+                WHERE trade_date >= ? AND trade_date < ?
+                ORDER BY stock_code, trade_date
+                ''', (start, self.trade_date)).fetchall()
+
+        if rows:
+            codes, _, opens, closes = (np.array(column) for column in zip(*rows))
+            ratio_by_code = {code: limit_ratio(code, self.names.get(code, '')) for code in np.unique(codes).tolist()}
+            ratios = np.array([ratio_by_code[code] for code in codes.tolist()])
+            self.seeds = seed_from_daily(codes, opens.astype(np.float64), closes.astype(np.float64), ratios)
+        else:
+            self.seeds = {}
+        seeded = sum(1 for value in self.seeds.values() if value[0])
+        logging.info(f"涨停跟踪准备完成: {self.trade_date}, {len(self.seeds)} 只股票, 昨日涨停 {seeded} 只")
+
+    def _state(self, row: Dict) -> Optional[SymbolLimitState]:
+        """取得（必要时创建）股票的状态机，涨停价只在当天第一次出现时计算
+
+        行情和日线种子都给不出正的前收盘时返回 None，该股票不跟踪（否则涨停价为 0，
+        任何价格都会被当成封板）。
+        """
+        code = row['code']
+        state = self.states.get(code)
+        if state is None:
+            name = row.get('name') or self.names.get(code, '')
+            continuous, prev_down, last_close = self.seeds.get(code, (0, False, 0.0))
+            prev_close = row.get('prev_close') or last_close
+            if not prev_close or prev_close <= 0:
+                return None
+            state = SymbolLimitState(code, name, prev_close,
+                                     float(limit_prices(prev_close, limit_ratio(code, name))),
+                                     continuous, prev_down)
+            self.states[code] = state
+        return state
+
+    def process(self, rows: Sequence[Dict], timestamp: Optional[float] = None) -> List[Tuple]:
+        """处理一批行情（采集器的变化行），返回状态有变化的 stock_limit_up 记录"""
+        moment = datetime.fromtimestamp(timestamp) if timestamp else datetime.now()
+        trade_date = self.fixed_date or moment.strftime('%Y-%m-%d')
+        if self.trade_date != trade_date:
+            self.prepare(trade_date)
+        default_time = moment.strftime('%H:%M:%S')
+
+        changed = []
+        for row in rows:
+            state = self._state(row)
+            if state is None:
+                continue
+            if state.update(row['current'], row.get('time') or default_time):
+                changed.append(state.record(self.trade_date))
+        if changed and self.persist:
+            self._save(changed)
+        return changed
+
+    def _save(self, records: List[Tuple]):
+        """写入或更新当日的涨停记录"""
+        with self.db.write_connection() as conn:
+            try:
+                conn.executemany('''
+                INSERT INTO stock_limit_up (
+                    stock_code, stock_name, change_percent, continuous_limit_up,
+                    first_limit_up_time, break_limit_up_times, rebound_limit_up, date
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(stock_code, date) DO UPDATE SET
+                    stock_name = excluded.stock_name,
+                    change_percent = excluded.change_percent,
+                    continuous_limit_up = excluded.continuous_limit_up,
+                    first_limit_up_time = excluded.first_limit_up_time,
+                    break_limit_up_times = excluded.break_limit_up_times,
+                    rebound_limit_up = excluded.rebound_limit_up
+                ''', records)
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logging.error(f"保存涨停数据失败: {str(e)}")
+
+    def get_limit_ups(self, sealed_only: bool = True) -> List[Dict]:
+        """当日涨停（或曾经涨停）的股票"""
+        keys = ('stock_code', 'stock_name', 'change_percent', 'continuous_limit_up',
+                'first_limit_up_time', 'break_limit_up_times', 'rebound_limit_up', 'date')
+        return [dict(zip(keys, state.record(self.trade_date))) for state in self.states.values()
+                if state.sealed or (not sealed_only and state.first_time)]
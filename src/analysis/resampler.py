@@ -0,0 +1,173 @@
+import re
+from datetime import date, timedelta
+from typing import Dict, Optional, Set, Tuple, Union
+import logging
+
+import numpy as np
+
+from ..database.bar_keys import to_bar_time
+from ..database.db_manager import DatabaseManager
+from ..database.lru_cache import ByteLRUCache, arrays_nbytes
+from .trading_session import bucket_end_minute, session_minute, session_minute_to_hhmm
+
+# 支持的周期：N分钟(如 5min/15min/30min/60min)、日线、周线、月线
+_MINUTE_FREQ = re.compile(r'^(\d+)min$')
+CALENDAR_FREQS = ('daily', 'weekly', 'monthly')
+
+def parse_freq(freq: str) -> Tuple[str, int]:
+    """解析周期字符串，返回 (类型, 分钟数)"""
+    match = _MINUTE_FREQ.match(freq)
+    if match:
+        period = int(match.group(1))
+        if not 1 <= period <= 240:
+            raise ValueError(f"不支持的分钟周期: {freq}")
+        return 'minute', period
+    if freq in CALENDAR_FREQS:
+        return freq, 0
+    raise ValueError(f"不支持的K线周期: {freq}")
+
+def _source_type(freq: str) -> str:
+    """重采样的源K线表：分钟周期为1分钟K线，日/周/月线为日线"""
+    return '1min' if parse_freq(freq)[0] == 'minute' else 'daily'
+
+def _date_parts(dates: np.ndarray):
+    """YYYYMMDD 整数数组 -> datetime64[D] 数组"""
+    years = dates // 10000
+    months = dates // 100 % 100
+    days = dates % 100
+    return ((years - 1970).astype('datetime64[Y]').astype('datetime64[M]')
+            + (months - 1)).astype('datetime64[D]') + (days - 1)
+
+def _group_keys(times: np.ndarray, freq: str) -> np.ndarray:
+    """计算每根源K线所属分组的键（同时也是分钟周期的输出时间）"""
+    kind, period = parse_freq(freq)
+    dates = times // 10000
+    if kind == 'minute':
+        end_minute = bucket_end_minute(session_minute(times % 10000), period)
+        return dates * 10000 + session_minute_to_hhmm(end_minute)
+    if kind == 'daily':
+        return dates
+    if kind == 'weekly':
+        # 1970-01-01 是星期四，+3 后以星期一作为一周的开始
+        epoch_days = _date_parts(dates).astype(np.int64)
+        return (epoch_days + 3) // 7
+    return dates // 100
+
+def resample(bars: Dict[str, np.ndarray], freq: str) -> Dict[str, np.ndarray]:
+    """把按时间升序排列的1分钟K线（或周/月线的源日线）聚合为更大周期
+
+    分组边界通过相邻键比较一次求出，开高低收量额都用 reduceat 向量化计算。
+    分钟周期的时间为K线结束时间；日/周/月线的时间为该周期最后一个交易日（HHMM 为 0）。
+    结果另含 first_time 列，记录每根K线第一根源K线的时间。
+    """
+    times = np.asarray(bars['time'])
+    if not len(times):
+        empty = {field: np.asarray(array)[:0] for field, array in bars.items()}
+        empty['first_time'] = times[:0]
+        return empty
+
+    keys = _group_keys(times, freq)
+    starts = np.flatnonzero(np.concatenate(([True], keys[1:] != keys[:-1])))
+    ends = np.append(starts[1:], len(times)) - 1
+
+    kind, _ = parse_freq(freq)
+    if kind == 'minute':
+        out_times = keys[starts]
+    else:
+        out_times = times[ends] // 10000 * 10000
+    return {
+        'time': out_times,
+        'open': np.asarray(bars['open'])[starts],
+        'high': np.maximum.reduceat(np.asarray(bars['high']), starts),
+        'low': np.minimum.reduceat(np.asarray(bars['low']), starts),
+        'close': np.asarray(bars['close'])[ends],
+        'volume': np.add.reduceat(np.asarray(bars['volume']), starts),
+        'amount': np.add.reduceat(np.asarray(bars['amount']), starts),
+        'first_time': times[starts]
+    }
+
+def _expand_range(freq: str, start: Optional[int], end: Optional[int]) -> Tuple[Optional[int], Optional[int]]:
+    """把查询区间扩展到完整的周期边界，避免首尾K线只聚合了一部分"""
+    kind, _ = parse_freq(freq)
+    if start is not None:
+        day = _to_date(start // 10000)
+        if kind == 'weekly':
+            day -= timedelta(days=day.weekday())
+        elif kind == 'monthly':
+            day = day.replace(day=1)
+        start = int(day.strftime('%Y%m%d')) * 10000
+    if end is not None:
+        day = _to_date(end // 10000)
+        if kind == 'weekly':
+            day += timedelta(days=6 - day.weekday())
+        elif kind == 'monthly':
+            day = day.replace(day=28) + timedelta(days=4)
+            day -= timedelta(days=day.day)
+        end = int(day.strftime('%Y%m%d')) * 10000 + 9999
+    return start, end
+
+def _to_date(value: int) -> date:
+    """YYYYMMDD 整数 -> date"""
+    return date(value // 10000, value // 100 % 100, value % 100)
+
+class BarResampler:
+    """按需重采样，结果带缓存
+
+    分钟周期由1分钟K线聚合，周线和月线由日线聚合，1分钟K线和日线直接读表。
+    缓存键包含源数据最后一根K线的时间，导入新数据后自动失效；缓存按占用字节数做 LRU 淘汰。
+    """
+    def __init__(self, db: DatabaseManager = None, max_cache_bytes: int = 64 * 1024 * 1024):
+        self.db = db or DatabaseManager()
+        self._cache = ByteLRUCache(max_cache_bytes, arrays_nbytes)
+        self.db.add_bar_listener(self._on_bars_written)
+
+    def get_bars(self, stock_code: str, freq: str, start: Union[int, str, None] = None,
+                 end: Union[int, str, None] = None) -> Dict[str, np.ndarray]:
+        """查询任意周期的K线，返回与 DatabaseManager.get_bars 相同的列数组"""
+        data_type = _source_type(freq)
+        if freq == data_type:
+            return self.db.get_bars(stock_code, freq, start, end)
+
+        start_key = to_bar_time(start)
+        end_key = to_bar_time(end, end=True)
+        last_source = self.db.get_last_bar_time(stock_code, data_type)
+        cache_key = (stock_code, freq, start_key, end_key, last_source)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        source_start, source_end = _expand_range(freq, start_key, end_key)
+        source = self.db.get_bars(stock_code, data_type, source_start, source_end)
+        result = resample(source, freq)
+
+        # 只保留与查询区间有重叠的K线（日/周/月线的时间精确到日）
+        mask = np.ones(len(result['time']), dtype=bool)
+        if start_key is not None:
+            if parse_freq(freq)[0] != 'minute':
+                start_key = start_key // 10000 * 10000
+            mask &= result['time'] >= start_key
+        if end_key is not None:
+            mask &= result['first_time'] <= end_key
+        bars = {field: array[mask] for field, array in result.items() if field != 'first_time'}
+
+        self._put(cache_key, bars)
+        return bars
+
+    def _put(self, key: tuple, bars: Dict[str, np.ndarray]):
+        """写入缓存，缓存的数组会返回给多个调用方，设为只读"""
+        for array in bars.values():
+            array.flags.writeable = False
+        self._cache.put(key, bars)
+
+    def invalidate(self, stock_code: Optional[str] = None):
+        """清除缓存，指定股票时只清除该股票"""
+        self._cache.discard_if(lambda key: stock_code is None or key[0] == stock_code)
+        logging.debug(f"重采样缓存已清除: {stock_code or '全部'}")
+
+    def _on_bars_written(self, data_type: str, codes: Set[str]):
+        """源K线写入后清除相关股票的缓存（覆盖同一时间的K线不会改变缓存键）"""
+        self._cache.discard_if(lambda key: key[0] in codes and _source_type(key[1]) == data_type)
+
+    def cache_stats(self) -> Dict:
+        """缓存统计"""
+        return self._cache.stats()
@@ -0,0 +1,169 @@
+import threading
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..database.db_manager import DatabaseManager
+from ..database.realtime_store import RealtimeFrame, RealtimeStore, get_realtime_store
+from ..database.sector_index import SectorIndex, get_sector_index
+
+# 板块榜单的排序字段
+SORT_FIELDS = ('avg_change', 'amount', 'net_amount', 'up_ratio')
+
+class SectorBoard:
+    """某一行情版本的全部板块统计（只读），各列按板块行号排列"""
+    def __init__(self, version: int, computed_at: float, index: SectorIndex, columns: Dict[str, np.ndarray],
+                 leader_codes: List[Optional[str]], leader_names: List[Optional[str]]):
+        self.version = version
+        self.computed_at = computed_at
+        self.index = index
+        self.columns = columns
+        self.leader_codes = leader_codes
+        self.leader_names = leader_names
+
+    def ranked(self, sort: str = 'avg_change') -> np.ndarray:
+        """按指定字段降序排列的板块行号，没有行情的板块排在最后"""
+        if sort not in SORT_FIELDS:
+            raise ValueError(f"不支持的排序字段: {sort}")
+        values = self.columns[sort]
+        return np.lexsort((-np.nan_to_num(values, nan=0.0), np.isnan(values)))
+
+    def records(self, sector_type: Optional[str] = None, limit: Optional[int] = None,
+                sort: str = 'avg_change') -> List[Dict]:
+        """排好序的板块榜单"""
+        order = self.ranked(sort)
+        if sector_type is not None:
+            order = order[self.index.sector_types[order] == sector_type]
+        if limit is not None:
+            order = order[:limit]
+        values = {name: array[order].tolist() for name, array in self.columns.items()}
+        records = []
+        for i, row in enumerate(order.tolist()):
+            record = {'sector_code': self.index.sector_codes[row],
+                      'sector_name': self.index.sector_names[row],
+                      'sector_type': self.index.sector_types[row],
+                      'leader_code': self.leader_codes[row],
+                      'leader_name': self.leader_names[row]}
+            for name, column in values.items():
+                value = column[i]
+                record[name] = None if value != value else value
+            records.append(record)
+        return records
+
+class SectorAggregator:
+    """实时板块统计
+
+    板块成分来自 CSR 稀疏矩阵形式的 SectorIndex，每次行情更新时把全市场的涨跌幅、成交额
+    按成分展开成一个向量，用 np.bincount 一次求出所有板块的平均涨幅、涨跌家数、成交额、
+    资金净额（上涨股成交额 - 下跌股成交额）和领涨股，相当于一次稀疏矩阵乘向量。
+    """
+    def __init__(self, db: DatabaseManager = None, store: RealtimeStore = None,
+                 index: Optional[SectorIndex] = None):
+        self.db = db or DatabaseManager()
+        self.store = store if store is not None else get_realtime_store()
+        self.fixed_index = index
+        self._board: Optional[SectorBoard] = None
+        self._slot_key = None
+        self._slots: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    @property
+    def index(self) -> SectorIndex:
+        """使用的板块索引，默认是共享索引（SectorLoader 导入后自动替换）"""
+        return self.fixed_index or get_sector_index(self.db)
+
+    def _stock_slots(self, index: SectorIndex, frame: RealtimeFrame) -> np.ndarray:
+        """索引中的股票 -> 行情帧的槽位（没有行情为 -1），槽位只增不减，股票数变化时才重算"""
+        key = (id(index), frame.count)
+        if key != self._slot_key:
+            positions = {code: slot for slot, code in enumerate(frame.codes)}
+            self._slots = np.fromiter((positions.get(code, -1) for code in index.stock_codes),
+                                      dtype=np.int64, count=index.stock_count)
+            self._slot_key = key
+        return self._slots
+
+    def compute(self, frame: Optional[RealtimeFrame] = None) -> SectorBoard:
+        """按给定（默认当前）行情帧计算全部板块"""
+        index = self.index
+        frame = frame or self.store.frame()
+        sectors = index.sector_count
+
+        slots = self._stock_slots(index, frame)
+        quoted = slots >= 0
+        quoted[quoted] = frame.slot_versions[slots[quoted]] > 0
+        safe = np.where(quoted, slots, 0)
+        change = np.where(quoted, frame.columns['change_percent'][safe], np.nan)
+        amount = np.where(quoted, frame.columns['amount'][safe], 0.0)
+
+        # 按成分展开后按板块行号求和
+        rows = index.entry_sectors
+        entry_change = change[index.indices]
+        valid = ~np.isnan(entry_change)
+        filled = np.where(valid, entry_change, 0.0)
+        entry_amount = amount[index.indices]
+        sign = np.sign(filled)
+
+        count = np.bincount(rows, weights=valid, minlength=sectors)
+        up = np.bincount(rows, weights=sign > 0, minlength=sectors)
+        down = np.bincount(rows, weights=sign < 0, minlength=sectors)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            columns = {
+                'avg_change': np.bincount(rows, weights=filled, minlength=sectors) / count,
+                'stock_count': count,
+                'up_count': up,
+                'down_count': down,
+                'flat_count': count - up - down,
+                'up_ratio': up / count,
+                'amount': np.bincount(rows, weights=entry_amount, minlength=sectors),
+                'net_amount': np.bincount(rows, weights=entry_amount * sign, minlength=sectors),
+                'leader_change': np.full(sectors, np.nan)
+            }
+        for name in ('stock_count', 'up_count', 'down_count', 'flat_count'):
+            columns[name] = columns[name].astype(np.int64)
+
+        # 领涨股：每个板块的最大涨幅，再取第一个等于最大值的成分
+        leader_codes: List[Optional[str]] = [None] * sectors
+        leader_names: List[Optional[str]] = [None] * sectors
+        starts = index.indptr[:-1]
+        nonempty = starts < index.indptr[1:]
+        if nonempty.any():
+            ranked = np.where(valid, entry_change, -np.inf)
+            best = np.full(sectors, -np.inf)
+            best[nonempty] = np.maximum.reduceat(ranked, starts[nonempty])
+            hits = np.flatnonzero(valid & (ranked == best[rows]))
+            leader_rows, first = np.unique(rows[hits], return_index=True)
+            leaders = index.indices[hits[first]]
+            columns['leader_change'][leader_rows] = change[leaders]
+            for row, stock in zip(leader_rows.tolist(), leaders.tolist()):
+                leader_codes[row] = index.stock_codes[stock]
+                leader_names[row] = frame.names[slots[stock]]
+
+        return SectorBoard(frame.version, time.time(), index, columns, leader_codes, leader_names)
+
+    def update(self, rows: Sequence[Dict] = None, timestamp: Optional[float] = None) -> SectorBoard:
+        """采集器的接收者：行情版本变化时重新计算并发布板块榜单"""
+        with self._lock:
+            frame = self.store.frame()
+            board = self._board
+            if board is None or board.version != frame.version or board.index is not self.index:
+                board = self.compute(frame)
+                self._board = board
+            return board
+
+    def get_board(self, sector_type: Optional[str] = None, limit: Optional[int] = None,
+                  sort: str = 'avg_change') -> List[Dict]:
+        """当前的板块榜单"""
+        board = self._board or self.update()
+        return board.records(sector_type, limit, sort)
+
+_default_aggregator: Optional[SectorAggregator] = None
+_default_lock = threading.Lock()
+
+def get_sector_aggregator(db: DatabaseManager = None) -> SectorAggregator:
+    """进程内共享的板块统计（采集器计算，API 读取）"""
+    global _default_aggregator
+    with _default_lock:
+        if _default_aggregator is None:
+            _default_aggregator = SectorAggregator(db)
+        return _default_aggregator
@@ -0,0 +1,49 @@
+import numpy as np
+
+# A股连续竞价时段：上午 9:30-11:30，下午 13:00-15:00，共240分钟
+MORNING_OPEN = 9 * 60 + 30
+MORNING_CLOSE = 11 * 60 + 30
+AFTERNOON_OPEN = 13 * 60
+AFTERNOON_CLOSE = 15 * 60
+MORNING_MINUTES = MORNING_CLOSE - MORNING_OPEN
+SESSION_MINUTES = MORNING_MINUTES + (AFTERNOON_CLOSE - AFTERNOON_OPEN)
+
+def session_minute(hhmm):
+    """K线结束时间(HHMM) -> 当日第几分钟(1..240)
+
+    分钟K线按结束时间标记（0931 为第1根，1130 为第120根，1301 为第121根，
+    1500 为第240根）；集合竞价时段归入第1根，午休归入上午最后一根，
+    收盘后归入最后一根。支持标量和 NumPy 数组。
+    """
+    hhmm = np.asarray(hhmm)
+    minutes = hhmm // 100 * 60 + hhmm % 100
+    index = np.where(minutes <= MORNING_CLOSE,
+                     minutes - MORNING_OPEN,
+                     minutes - AFTERNOON_OPEN + MORNING_MINUTES)
+    index = np.where((minutes > MORNING_CLOSE) & (minutes <= AFTERNOON_OPEN), MORNING_MINUTES, index)
+    return np.clip(index, 1, SESSION_MINUTES)
+
+def session_minute_to_hhmm(index):
+    """当日第几分钟(1..240) -> K线结束时间(HHMM)"""
+    index = np.asarray(index)
+    minutes = np.where(index <= MORNING_MINUTES,
+                       MORNING_OPEN + index,
+                       AFTERNOON_OPEN + index - MORNING_MINUTES)
+    return minutes // 60 * 100 + minutes % 60
+
+def bucket_end_minute(index, period: int):
+    """第几分钟所属的N分钟K线的结束分钟，K线不跨越午休"""
+    index = np.asarray(index)
+    morning = np.minimum(-(-index // period) * period, MORNING_MINUTES)
+    afternoon = MORNING_MINUTES + np.minimum(-(-(index - MORNING_MINUTES) // period) * period,
+                                             SESSION_MINUTES - MORNING_MINUTES)
+    return np.where(index <= MORNING_MINUTES, morning, afternoon)
+
+def tick_session_minute(hhmm):
+    """行情时间(HHMM，按所在分钟取整) -> 所属1分钟K线的序号(1..240)
+
+    09:30:xx 的成交属于 0931 这根K线，即所在分钟的下一分钟为K线结束时间。
+    """
+    hhmm = np.asarray(hhmm)
+    minutes = hhmm // 100 * 60 + hhmm % 100 + 1
+    return session_minute(minutes // 60 * 100 + minutes % 60)
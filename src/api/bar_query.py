@@ -0,0 +1,110 @@
+import threading
+import time
+from typing import Dict, Optional, Set, Tuple, Union
+
+import numpy as np
+
+from ..analysis.resampler import BarResampler, parse_freq
+from ..database.bar_keys import to_bar_time
+from ..database.db_manager import DatabaseManager, source_freq
+from ..database.lru_cache import ByteLRUCache
+from .serialization import encode_table
+
+# 单页K线数量的默认值和上限
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
+
+BAR_RECORD_FIELDS = ('time', 'open', 'high', 'low', 'close', 'volume', 'amount')
+
+class BarQueryService:
+    """/api/bars 的查询层：键集分页、ETag 和已封闭区间的响应缓存
+
+    1分钟、5分钟和日线直接按K线表主键分页读取，其余周期由 BarResampler 聚合后在内存中分页
+    （周线和月线来自日线，其余分钟周期来自1分钟K线）。
+    ETag 由源数据最后一根K线的时间和本进程内的写入代数组成，客户端带 If-None-Match 时
+    只需一次主键索引查找就能返回 304。新K线只会追加在最后一根之后，所以有下一页的页面、
+    以及结束时间早于最后一根K线的区间不会再变化，这类响应序列化后放入按字节淘汰的 LRU 缓存；
+    覆盖写入历史K线时由写入监听器清除对应股票的缓存。
+    """
+    def __init__(self, db: DatabaseManager = None, resampler: BarResampler = None,
+                 max_cache_bytes: int = 32 * 1024 * 1024):
+        self.db = db or DatabaseManager()
+        self.resampler = resampler or BarResampler(self.db)
+        self.epoch = int(time.time())
+        self._generations: Dict[Tuple[str, str], int] = {}
+        self._cache = ByteLRUCache(max_cache_bytes)
+        self._lock = threading.Lock()
+        self.db.add_bar_listener(self._on_bars_written)
+
+    @staticmethod
+    def source_type(freq: str) -> str:
+        """周期对应的源K线表，ETag 和缓存失效都以它为准"""
+        parse_freq(freq)
+        return source_freq(freq)
+
+    def etag(self, stock_code: str, freq: str, fmt: str = 'json') -> str:
+        """当前数据版本在某个响应格式下的 ETag 值（不含引号）"""
+        data_type = self.source_type(freq)
+        last_time = self.db.get_last_bar_time(stock_code, data_type)
+        generation = self._generations.get((data_type, stock_code), 0)
+        return f"{last_time or 0}-{self.epoch}-{generation}-{fmt}"
+
+    def get_page(self, stock_code: str, freq: str, start: Union[int, str, None] = None,
+                 end: Union[int, str, None] = None, after: Optional[int] = None,
+                 limit: int = DEFAULT_PAGE_SIZE, fmt: str = 'json') -> bytes:
+        """一页K线的响应体（格式见 encode_table），next 为下一页的 after，没有下一页时为 null"""
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise ValueError(f"limit 必须在 1 到 {MAX_PAGE_SIZE} 之间")
+        data_type = self.source_type(freq)
+        start_key = to_bar_time(start)
+        end_key = to_bar_time(end, end=True)
+        # start 换算成开区间的 after，与翻页游标取较晚者
+        if start_key is not None:
+            after = start_key - 1 if after is None else max(after, start_key - 1)
+
+        cache_key = (stock_code, freq, start_key, after, end_key, limit, fmt)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # 多取一根判断是否还有下一页
+        if data_type == freq:
+            bars = self.db.get_bar_page(stock_code, freq, after, end_key, limit + 1)
+        else:
+            # 重采样结果按原始区间缓存，翻页在内存中按时间定位
+            bars = self.resampler.get_bars(stock_code, freq, start_key, end_key)
+            lo = 0 if after is None else int(np.searchsorted(bars['time'], after, 'right'))
+            bars = {field: array[lo:lo + limit + 1] for field, array in bars.items()}
+        has_next = len(bars['time']) > limit
+        if has_next:
+            bars = {field: array[:limit] for field, array in bars.items()}
+
+        count = len(bars['time'])
+        next_after = int(bars['time'][-1]) if has_next else None
+        payload = encode_table({field: bars[field] for field in BAR_RECORD_FIELDS}, fmt,
+                               {'stock_code': stock_code, 'freq': freq, 'count': count, 'next': next_after}, 'bars')
+
+        if self._is_closed(stock_code, freq, data_type, end_key, has_next):
+            self._cache.put(cache_key, payload)
+        return payload
+
+    def _is_closed(self, stock_code: str, freq: str, data_type: str, end_key: Optional[int],
+                   has_next: bool) -> bool:
+        """页面内容是否已经固定：后面还有K线，或区间结束早于最后一根K线（重采样周期的最后一根可能还在形成，只看前者）"""
+        if has_next:
+            return True
+        if end_key is None or data_type != freq:
+            return False
+        last_time = self.db.get_last_bar_time(stock_code, data_type)
+        return last_time is not None and end_key < last_time
+
+    def _on_bars_written(self, data_type: str, codes: Set[str]):
+        """K线写入后推进写入代数，并清除受影响股票的缓存页"""
+        with self._lock:
+            for code in codes:
+                self._generations[(data_type, code)] = self._generations.get((data_type, code), 0) + 1
+        self._cache.discard_if(lambda key: key[0] in codes and self.source_type(key[1]) == data_type)
+
+    def cache_stats(self) -> Dict:
+        """缓存统计"""
+        return self._cache.stats()
@@ -0,0 +1,181 @@
+import json
+import math
+import struct
+import threading
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import orjson
+except ImportError:  # 未安装时使用标准库 json
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # 未安装时不提供 MessagePack 格式
+    msgpack = None
+
+# 响应格式 -> 媒体类型
+MEDIA_TYPES = {
+    'json': 'application/json',
+    'columns': 'application/vnd.stock.columns+json',
+    'msgpack': 'application/msgpack',
+    'packed': 'application/vnd.stock.packed'
+}
+
+# 可以放进 SSE 文本帧的格式
+TEXT_FORMATS = ('json', 'columns')
+
+def available_formats() -> Tuple[str, ...]:
+    """当前环境支持的响应格式"""
+    return tuple(fmt for fmt in MEDIA_TYPES if fmt != 'msgpack' or msgpack is not None)
+
+def _default(value):
+    """标准库 json 不认识的 numpy 类型"""
+    if isinstance(value, np.ndarray):
+        return _finite(value.tolist())
+    if isinstance(value, np.generic):
+        return _finite(value.item())
+    raise TypeError(f"无法序列化的类型: {type(value).__name__}")
+
+def _finite(value):
+    """把 NaN/inf 换成 None（与 orjson 一致输出 null），递归处理字典、列表和 numpy 数组"""
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: _finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(item) for item in value]
+    if isinstance(value, (np.ndarray, np.generic)):
+        return _default(value)
+    return value
+
+def dumps(data) -> bytes:
+    """序列化为 UTF-8 JSON，NaN 和 inf 输出为 null
+
+    安装了 orjson 时用 orjson，否则用标准库 json：先把非有限浮点数换成 None，
+    并以 allow_nan=False 保证不会输出浏览器无法解析的 NaN。
+    """
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(_finite(data), ensure_ascii=False, separators=(',', ':'),
+                      default=_default, allow_nan=False).encode('utf-8')
+
+def negotiate(accept: Optional[str], requested: Optional[str] = None) -> str:
+    """按 ?format= 或 Accept 头选择响应格式，都没有匹配时为 json"""
+    formats = available_formats()
+    if requested:
+        if requested not in formats:
+            raise ValueError(f"不支持的响应格式: {requested}")
+        return requested
+    best, best_q = 'json', 0.0
+    for part in (accept or '').split(','):
+        media, *params = [item.strip() for item in part.split(';')]
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip() == 'q':
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        for fmt in formats:
+            if MEDIA_TYPES[fmt] == media and q > best_q:
+                best, best_q = fmt, q
+    return best
+
+def _as_list(values) -> list:
+    return values.tolist() if isinstance(values, np.ndarray) else list(values)
+
+def encode_table(columns: Dict[str, Sequence], fmt: str = 'json', meta: Optional[Dict] = None,
+                 key: str = 'rows') -> bytes:
+    """把列数据编码为响应体
+
+    meta 是顶层的附加字段，表格放在 key 下：json 为逐行字典；columns 和 msgpack 为
+    {"fields": [...], "values": [[第一列], [第二列], ...]}，字段名只出现一次；packed 见 pack_columns。
+    """
+    body = dict(meta or {})
+    if fmt == 'packed':
+        return pack_columns(columns, body)
+    fields = list(columns)
+    values = [_as_list(columns[field]) for field in fields]
+    if fmt == 'json':
+        body[key] = [dict(zip(fields, row)) for row in zip(*values)]
+        return dumps(body)
+    body[key] = {'fields': fields, 'values': values}
+    if fmt == 'columns':
+        return dumps(body)
+    if fmt == 'msgpack' and msgpack is not None:
+        return msgpack.packb(body, use_bin_type=True)
+    raise ValueError(f"不支持的响应格式: {fmt}")
+
+def pack_columns(columns: Dict[str, Sequence], meta: Optional[Dict] = None) -> bytes:
+    """紧凑二进制格式：数值列按小端原始字节存放，可在浏览器中直接构造 TypedArray
+
+    结构为 4 字节小端头长度 + JSON 头 + 数据区。头中 count 为行数，fields 为列顺序，
+    columns 列出每个数值列的 name/dtype/offset（相对数据区，8 字节对齐），strings 为字符串列，
+    其余为 meta 字段；头部用空格补齐，使数据区也从 8 字节边界开始。
+    """
+    header = dict(meta or {})
+    header['count'] = 0
+    header['fields'] = list(columns)
+    header['columns'] = []
+    header['strings'] = {}
+    blocks = []
+    offset = 0
+    for name, values in columns.items():
+        if not isinstance(values, np.ndarray) or values.dtype.kind not in 'biuf':
+            header['strings'][name] = _as_list(values)
+            header['count'] = len(header['strings'][name])
+            continue
+        array = np.ascontiguousarray(values, dtype=values.dtype.newbyteorder('<'))
+        header['count'] = len(array)
+        header['columns'].append({'name': name, 'dtype': array.dtype.str, 'offset': offset})
+        data = array.tobytes()
+        padding = -len(data) % 8
+        blocks.append(data + b'\0' * padding)
+        offset += len(data) + padding
+    encoded = dumps(header)
+    encoded += b' ' * (-(len(encoded) + 4) % 8)
+    return struct.pack('<I', len(encoded)) + encoded + b''.join(blocks)
+
+def unpack_columns(payload: bytes) -> Tuple[Dict, Dict[str, object]]:
+    """pack_columns 的逆过程，返回 (头部, 列数据)"""
+    length, = struct.unpack_from('<I', payload)
+    header = json.loads(payload[4:4 + length])
+    start = 4 + length
+    numeric = {column['name']: column for column in header['columns']}
+    columns: Dict[str, object] = {}
+    for name in header['fields']:
+        if name in numeric:
+            columns[name] = np.frombuffer(payload, dtype=numeric[name]['dtype'], count=header['count'],
+                                          offset=start + numeric[name]['offset'])
+        else:
+            columns[name] = header['strings'][name]
+    return header, columns
+
+class PayloadCache:
+    """按数据版本缓存序列化好的响应体，版本前进时丢弃旧版本的全部结果"""
+    def __init__(self):
+        self._version = None
+        self._payloads: Dict[object, bytes] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, version: int, key, build: Callable[[], bytes]) -> bytes:
+        """取 (版本, key) 的响应体，没有时调用 build 生成"""
+        with self._lock:
+            if version == self._version and key in self._payloads:
+                self.hits += 1
+                return self._payloads[key]
+            self.misses += 1
+        payload = build()
+        with self._lock:
+            if self._version is None or version > self._version:
+                self._version = version
+                self._payloads = {}
+            if version == self._version:
+                self._payloads[key] = payload
+        return payload
@@ -1,40 +1,115 @@
-from flask import Flask, Response
+from flask import Flask, Response, request
+from ..analysis.alerts import get_alert_engine
+from ..analysis.sector_board import get_sector_aggregator
 from ..database.db_manager import DatabaseManager
-import json
-import time
+from ..data_collector.bar_aggregator import get_bar_aggregator
+from ..database.realtime_store import get_realtime_store
+from .bar_query import DEFAULT_PAGE_SIZE, BarQueryService
+from .serialization import MEDIA_TYPES, PayloadCache, dumps, encode_table, negotiate
 
+# 实时推送 /api/realtime 由 stream_server（端口 5001）提供，这里只有请求-响应接口
 app = Flask(__name__)
 db = DatabaseManager()
+store = get_realtime_store()
+bars = get_bar_aggregator(db)
+sectors = get_sector_aggregator(db)
+alerts = get_alert_engine()
+bar_query = BarQueryService(db)
+# 全市场快照按行情版本和格式缓存序列化结果
+snapshots = PayloadCache()
 
-def generate_sse_data():
-    while True:
-        # 获取实时数据
-        data = db.get_realtime_data()
-        
-        # 格式化为SSE消息
-        yield f"data: {json.dumps(data)}\n\n"
-        
-        # 每秒更新一次
-        time.sleep(1)
-
-@app.route('/api/realtime')
-def sse_stream():
-    return Response(
-        generate_sse_data(),
-        mimetype='text/event-stream',
-        headers={
-            'Cache-Control': 'no-cache',
-            'Connection': 'keep-alive',
-            'Access-Control-Allow-Origin': '*'
-        }
-    )
+def json_response(data) -> Response:
+    return Response(dumps(data), mimetype=MEDIA_TYPES['json'])
+
+def quote_snapshot(fmt: str) -> bytes:
+    """当前全市场行情的响应体，同一版本同一格式只序列化一次"""
+    frame = store.frame()
+
+    def build() -> bytes:
+        return encode_table(frame.column_data(frame.changed_slots()), fmt, {'version': frame.version})
+    return snapshots.get(frame.version, fmt, build)
 
 @app.route('/api/stock/<stock_code>')
 def get_stock_detail(stock_code):
-    data = db.get_stock_detail(stock_code)
+    data = store.get_latest(stock_code)
     if data:
-        return json.dumps(data)
+        data['ticks'] = store.get_ticks(stock_code)
+        data['forming_bars'] = bars.get_forming_bars(stock_code)
+        return json_response(data)
     return {'error': 'Stock not found'}, 404
 
+@app.route('/api/bars/<stock_code>')
+def get_bars(stock_code):
+    # 历史K线：?freq=daily&start=2024-01-01&end=2024-06-30&limit=1000，翻页时带上一页返回的 after=next
+    # 响应格式由 Accept 头或 ?format=json|columns|msgpack|packed 决定
+    freq = request.args.get('freq', 'daily')
+    try:
+        fmt = negotiate(request.headers.get('Accept'), request.args.get('format'))
+        etag = bar_query.etag(stock_code, freq, fmt)
+        # 数据没有变化时直接返回 304，不查询K线
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(bar_query.get_page(stock_code, freq, request.args.get('start'),
+                                                   request.args.get('end'), request.args.get('after', type=int),
+                                                   request.args.get('limit', DEFAULT_PAGE_SIZE, type=int), fmt),
+                                mimetype=MEDIA_TYPES[fmt])
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Vary'] = 'Accept'
+    return response
+
+@app.route('/api/quotes')
+def get_quotes():
+    # 全市场行情快照，格式协商同 /api/bars
+    try:
+        fmt = negotiate(request.headers.get('Accept'), request.args.get('format'))
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    response = Response(quote_snapshot(fmt), mimetype=MEDIA_TYPES[fmt])
+    response.headers['Vary'] = 'Accept'
+    return response
+
+@app.route('/api/sectors')
+def get_sector_board():
+    # 板块榜单：?type=concept&limit=50&sort=avg_change
+    try:
+        limit = request.args.get('limit', type=int)
+        data = sectors.get_board(request.args.get('type'), limit, request.args.get('sort', 'avg_change'))
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    return json_response(data)
+
+@app.route('/api/alerts', methods=['GET'])
+def list_alerts():
+    return json_response(alerts.list_alerts(request.args.get('code')))
+
+@app.route('/api/alerts', methods=['POST'])
+def add_alert():
+    # {"stock_code": "600000", "field": "price", "direction": "above", "threshold": 10.5, "cooldown": 300}
+    data = request.get_json(silent=True) or {}
+    try:
+        alert_id = alerts.add_alert(data['stock_code'], data['field'], data['direction'], data['threshold'],
+                                    data.get('cooldown', 300.0), data.get('once', False), data.get('message', ''))
+    except KeyError as e:
+        return {'error': f'缺少参数: {e.args[0]}'}, 400
+    except (TypeError, ValueError) as e:
+        return {'error': str(e)}, 400
+    return {'alert_id': alert_id}, 201
+
+@app.route('/api/alerts/<int:alert_id>', methods=['DELETE'])
+def remove_alert(alert_id):
+    if alerts.remove_alert(alert_id):
+        return {'alert_id': alert_id}
+    return {'error': 'Alert not found'}, 404
+
+@app.route('/api/alerts/events')
+def get_alert_events():
+    # 增量读取触发的预警：?since=上次收到的最大 seq
+    seq, events = alerts.stream.since(request.args.get('since', 0, type=int))
+    return json_response({'seq': seq, 'events': events})
+
 def start_server():
     app.run(host='0.0.0.0', port=5000, debug=True) 
\ No newline at end of file
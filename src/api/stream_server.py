@@ -0,0 +1,492 @@
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, FrozenSet, List, Optional, Set, Tuple
+from urllib.parse import parse_qs
+
+import numpy as np
+
+from ..analysis.alerts import AlertEngine, get_alert_engine
+from ..database.db_manager import DatabaseManager
+from ..database.realtime_store import (DERIVED_COLUMNS, REALTIME_COLUMNS, RealtimeFrame, RealtimeStore,
+                                       get_realtime_store)
+from ..database.sector_index import get_sector_index
+from .serialization import TEXT_FORMATS, dumps, encode_table
+
+# 推送给浏览器的响应头
+SSE_HEADERS = (
+    'HTTP/1.1 200 OK\r\n'
+    'Content-Type: text/event-stream; charset=utf-8\r\n'
+    'Cache-Control: no-cache\r\n'
+    'Connection: keep-alive\r\n'
+    'Access-Control-Allow-Origin: *\r\n'
+    '\r\n'
+).encode()
+
+def error_response(status: str, message: str) -> bytes:
+    """一个完整的 JSON 错误响应"""
+    body = dumps({'error': message})
+    return (
+        f'HTTP/1.1 {status}\r\n'
+        'Content-Type: application/json; charset=utf-8\r\n'
+        f'Content-Length: {len(body)}\r\n'
+        'Access-Control-Allow-Origin: *\r\n'
+        'Connection: close\r\n'
+        '\r\n'
+    ).encode() + body
+
+NOT_FOUND = error_response('404 Not Found', 'Not found')
+REQUEST_TIMEOUT = error_response('408 Request Timeout', 'Request timeout')
+HEADERS_TOO_LARGE = error_response('431 Request Header Fields Too Large', 'Request header fields too large')
+
+# 心跳注释行，防止代理和浏览器断开空闲连接
+HEARTBEAT = b': ping\n\n'
+
+# 可以订阅的字段（stock_code 总是包含）
+STREAM_FIELDS = ('stock_name',) + tuple(name for name, _, _ in REALTIME_COLUMNS) + DERIVED_COLUMNS
+
+def sse_message(data: bytes, event: Optional[str] = None, event_id: Optional[str] = None) -> bytes:
+    """拼装一条 SSE 消息，data 为单行的 UTF-8 JSON"""
+    prefix = f"event: {event}\n" if event else ''
+    if event_id is not None:
+        prefix += f"id: {event_id}\n"
+    return f"{prefix}data: ".encode('utf-8') + data + b'\n\n'
+
+def delta_records(previous: Optional[RealtimeFrame], frame: RealtimeFrame, slots: np.ndarray) -> List[Dict]:
+    """slots 中各股票相对上一帧发生变化的字段；新出现的股票给出全部字段"""
+    if previous is None:
+        return frame.records(slots)
+    known = slots < previous.count
+    changed = {}
+    for name, array in frame.columns.items():
+        old = previous.columns[name]
+        mask = ~known.copy()
+        mask[known] = array[slots[known]] != old[slots[known]]
+        changed[name] = (mask, array[slots].tolist())
+    records = []
+    for i, slot in enumerate(slots.tolist()):
+        record = {'stock_code': frame.codes[slot]}
+        if not known[i]:
+            record['stock_name'] = frame.names[slot]
+        for name, (mask, values) in changed.items():
+            if mask[i]:
+                record[name] = values[i]
+        records.append(record)
+    return records
+
+class StreamFilter:
+    """一个连接的订阅条件
+
+    codes 为股票代码与板块成分（经 SectorIndex 展开）的并集，None 表示全市场；
+    fields 为字段投影，None 表示全部字段；fmt 为快照的形状（json 逐行或 columns 按列）。
+    股票条件编译为按行情槽位的位图，新股票出现时只检查新增的槽位；每次更新只在变化的槽位上取位图，
+    不需要遍历全市场。
+    """
+    def __init__(self, codes: Optional[FrozenSet[str]] = None, fields: Optional[Tuple[str, ...]] = None,
+                 fmt: str = 'json'):
+        self.codes = codes
+        self.fields = fields
+        self.fmt = fmt
+        self.key = (codes, fields, fmt)
+        self._mask = np.zeros(0, dtype=bool)
+        # 事件循环线程（新连接补发）和线程池（增量、快照）都会扩展位图
+        self._lock = threading.Lock()
+
+    @property
+    def is_full(self) -> bool:
+        return self.codes is None and self.fields is None
+
+    @classmethod
+    def from_query(cls, query: str, resolve_sectors: Callable[[List[str]], Set[str]]) -> 'StreamFilter':
+        """解析 codes=600000,000001&sectors=880001&fields=current_price,change_percent&format=columns"""
+        params = parse_qs(query)
+
+        def values(name: str) -> List[str]:
+            return [value for item in params.get(name, []) for value in item.split(',') if value]
+
+        codes = set(values('codes'))
+        sectors = values('sectors')
+        if sectors:
+            codes |= resolve_sectors(sectors)
+        fields = set(values('fields'))
+        unknown = fields - set(STREAM_FIELDS)
+        if unknown:
+            raise ValueError(f"不支持的字段: {', '.join(sorted(unknown))}")
+        fmt = (values('format') or ['json'])[0]
+        if fmt not in TEXT_FORMATS:
+            raise ValueError(f"不支持的推送格式: {fmt}")
+        return cls(frozenset(codes) if codes or sectors else None,
+                   tuple(field for field in STREAM_FIELDS if field in fields) if fields else None, fmt)
+
+    def mask(self, frame: RealtimeFrame) -> Optional[np.ndarray]:
+        """按行情槽位的订阅位图，全市场订阅返回 None"""
+        if self.codes is None:
+            return None
+        with self._lock:
+            mask = self._mask
+            if len(mask) < frame.count:
+                # 槽位只增不减，只需判断新增的股票；换成新数组，已返回的位图不会被修改
+                extended = np.zeros(frame.count, dtype=bool)
+                extended[:len(mask)] = mask
+                for slot in range(len(mask), frame.count):
+                    extended[slot] = frame.codes[slot] in self.codes
+                self._mask = mask = extended
+        return mask
+
+    def select(self, frame: RealtimeFrame, slots: np.ndarray) -> Optional[np.ndarray]:
+        """slots 中属于订阅范围的位置，全市场订阅返回 None"""
+        mask = self.mask(frame)
+        if mask is None:
+            return None
+        return np.flatnonzero(mask[slots])
+
+    def project(self, records: List[Dict]) -> List[Dict]:
+        """字段投影，投影后没有字段的记录被丢弃"""
+        if self.fields is None:
+            return records
+        projected = []
+        for record in records:
+            row = {field: record[field] for field in self.fields if field in record}
+            if row:
+                row['stock_code'] = record['stock_code']
+                projected.append(row)
+        return projected
+
+    def accepts(self, stock_code: str) -> bool:
+        return self.codes is None or stock_code in self.codes
+
+class StreamGroup:
+    """订阅条件相同的连接共用一份序列化结果和快照缓存"""
+    def __init__(self, stream_filter: StreamFilter):
+        self.filter = stream_filter
+        self.subscribers: Set['Subscriber'] = set()
+        self.snapshot: Tuple[int, Optional[bytes]] = (-1, None)
+        # 正在生成的快照 (版本, 任务)，同一版本的并发订阅共用一次序列化
+        self.snapshot_task: Tuple[int, Optional[asyncio.Task]] = (-1, None)
+
+class RequestRejected(Exception):
+    """请求头没有按时读完或超过上限，response 为要写回的错误响应"""
+    def __init__(self, response: bytes):
+        super().__init__(response)
+        self.response = response
+
+class Subscriber:
+    """一个 SSE 连接的待发送队列，队列满说明客户端跟不上，直接断开让其用 Last-Event-ID 重连"""
+    def __init__(self, writer: asyncio.StreamWriter, queue_size: int, group: StreamGroup):
+        self.writer = writer
+        self.queue: asyncio.Queue = asyncio.Queue(queue_size)
+        self.group = group
+        self.closed = False
+        # 连接时先发送的内容：补发的增量，或需要全量快照的行情帧
+        self.backlog: List[bytes] = []
+        self.snapshot_frame: Optional[RealtimeFrame] = None
+
+    def send(self, payload: bytes):
+        if self.closed:
+            return
+        try:
+            self.queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            # 连接协程此时卡在 drain 上，中断连接使其退出
+            self.closed = True
+            self.writer.transport.abort()
+
+class Broadcaster:
+    """唯一的生产者：每个行情版本只计算一次增量，每组订阅条件只序列化一次，
+    把同一份字节放入该组所有订阅者的队列
+
+    事件 id 为 "启动纪元:行情版本"，版本单调递增。最近 history 个增量保存在环形缓冲中：
+    客户端带 Last-Event-ID 重连时，只要缓冲还覆盖它的版本就只补发缺少的增量，
+    否则（首次连接、服务重启、落后太多）先发送全量快照。快照按组和版本缓存，只在有新连接时生成。
+    有订阅条件的组没有相关变化时不发送增量。
+    线程池中只做计算和序列化，版本、环形缓冲、快照缓存和统计只在事件循环线程中修改。
+    """
+    def __init__(self, store: RealtimeStore = None, alerts: AlertEngine = None, interval: float = 0.5,
+                 queue_size: int = 64, heartbeat: float = 15.0, history: int = 600, db: DatabaseManager = None):
+        self.store = store if store is not None else get_realtime_store()
+        self.alerts = alerts if alerts is not None else get_alert_engine()
+        self.db = db
+        self.interval = interval
+        self.queue_size = queue_size
+        self.heartbeat = heartbeat
+        self.epoch = int(time.time())
+        self.groups: Dict[tuple, StreamGroup] = {}
+        self.frame: Optional[RealtimeFrame] = None
+        self.version = 0
+        # (基准版本, 版本, 变化的槽位, 对应的增量记录)
+        self.ring: Deque[Tuple[int, int, np.ndarray, List[Dict]]] = deque(maxlen=history)
+        self.alert_seq = self.alerts.stream.last_seq
+        self.stats = {'messages': 0, 'bytes_serialized': 0, 'snapshots': 0, 'resumes': 0,
+                      'dropped_clients': 0}
+
+    def event_id(self, version: int) -> str:
+        return f"{self.epoch}:{version}"
+
+    def _parse_event_id(self, event_id: Optional[str]) -> Optional[int]:
+        """Last-Event-ID -> 版本号，不是本次启动产生的 id 返回 None"""
+        epoch, _, version = (event_id or '').partition(':')
+        if epoch != str(self.epoch) or not version.isdigit():
+            return None
+        return int(version)
+
+    def resolve_sectors(self, sector_codes: List[str]) -> Set[str]:
+        """板块代码 -> 成分股代码"""
+        index = get_sector_index(self.db)
+        return {index.stock_codes[stock] for sector in sector_codes for stock in index.stock_rows(sector).tolist()}
+
+    def subscribe(self, writer: asyncio.StreamWriter, last_event_id: Optional[str] = None,
+                  stream_filter: Optional[StreamFilter] = None) -> Subscriber:
+        """登记新连接，并决定先补发增量还是发送全量快照"""
+        stream_filter = stream_filter or StreamFilter()
+        group = self.groups.get(stream_filter.key)
+        if group is None:
+            group = self.groups[stream_filter.key] = StreamGroup(stream_filter)
+        subscriber = Subscriber(writer, self.queue_size, group)
+        version = self._parse_event_id(last_event_id)
+        if version is not None and version <= self.version and (
+                version == self.version or (self.ring and self.ring[0][0] <= version)):
+            for entry in self.ring:
+                if entry[1] > version:
+                    payload = self._encode_delta_for(group, self.frame, entry)
+                    if payload is not None:
+                        self.stats['bytes_serialized'] += len(payload)
+                        subscriber.backlog.append(payload)
+            self.stats['resumes'] += 1
+        elif self.frame is not None:
+            subscriber.snapshot_frame = self.frame
+        group.subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber):
+        group = subscriber.group
+        group.subscribers.discard(subscriber)
+        if not group.subscribers and self.groups.get(group.filter.key) is group:
+            del self.groups[group.filter.key]
+
+    def publish(self, group: StreamGroup, payload: bytes):
+        """把同一份消息放入组内所有订阅者队列"""
+        self.stats['messages'] += 1
+        for subscriber in list(group.subscribers):
+            subscriber.send(payload)
+            if subscriber.closed:
+                self.stats['dropped_clients'] += 1
+                group.subscribers.discard(subscriber)
+
+    def _encode_snapshot(self, group: StreamGroup, frame: RealtimeFrame) -> bytes:
+        """某组在某个版本的全量快照（在线程池中执行）"""
+        slots = frame.changed_slots()
+        positions = group.filter.select(frame, slots)
+        if positions is not None:
+            slots = slots[positions]
+        data = frame.column_data(slots)
+        if group.filter.fields is not None:
+            data = {name: data[name] for name in ('stock_code',) + group.filter.fields}
+        return sse_message(encode_table(data, group.filter.fmt, {'version': frame.version}),
+                           'snapshot', self.event_id(frame.version))
+
+    async def snapshot(self, group: StreamGroup, frame: RealtimeFrame) -> bytes:
+        """组在某个版本的快照，未缓存时在线程池中生成，不阻塞事件循环；同一版本只生成一次"""
+        version, payload = group.snapshot
+        if version == frame.version:
+            return payload
+        version, task = group.snapshot_task
+        if version != frame.version:
+            task = asyncio.ensure_future(self._build_snapshot(group, frame))
+            group.snapshot_task = (frame.version, task)
+        # 一个订阅者断开时不取消其他订阅者正在等待的生成任务
+        return await asyncio.shield(task)
+
+    async def _build_snapshot(self, group: StreamGroup, frame: RealtimeFrame) -> bytes:
+        try:
+            payload = await asyncio.get_running_loop().run_in_executor(None, self._encode_snapshot, group, frame)
+        finally:
+            if group.snapshot_task[0] == frame.version:
+                group.snapshot_task = (-1, None)
+        self.stats['snapshots'] += 1
+        self.stats['bytes_serialized'] += len(payload)
+        if frame.version > group.snapshot[0]:
+            group.snapshot = (frame.version, payload)
+        return payload
+
+    def _encode_delta_for(self, group: StreamGroup, frame: RealtimeFrame,
+                          entry: Tuple[int, int, np.ndarray, List[Dict]]) -> Optional[bytes]:
+        """按组的订阅条件序列化一个增量，有条件的组没有相关变化时返回 None"""
+        base, version, slots, records = entry
+        stream_filter = group.filter
+        if not stream_filter.is_full:
+            positions = stream_filter.select(frame, slots)
+            if positions is not None:
+                records = [records[i] for i in positions.tolist()]
+            records = stream_filter.project(records)
+            if not records:
+                return None
+        return sse_message(dumps({'version': version, 'base': base, 'rows': records}),
+                           'delta', self.event_id(version))
+
+    def _encode_delta(self, previous: Optional[RealtimeFrame], base: int, groups: List[StreamGroup]):
+        """计算相对 previous（版本 base）的增量，并为各组序列化（在线程池中执行）"""
+        frame = self.store.frame()
+        if frame.version == base:
+            return None
+        slots = frame.changed_slots(base)
+        entry = (base, frame.version, slots, delta_records(previous, frame, slots))
+        payloads = {group: self._encode_delta_for(group, frame, entry) for group in groups}
+        return frame, entry, payloads
+
+    def _encode_alerts(self) -> Optional[List[Dict]]:
+        """新触发的预警"""
+        self.alert_seq, events = self.alerts.stream.since(self.alert_seq)
+        return events or None
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        idle = 0.0
+        while True:
+            delta = await loop.run_in_executor(None, self._encode_delta, self.frame, self.version,
+                                               list(self.groups.values()))
+            if delta is not None:
+                frame, entry, payloads = delta
+                # 在事件循环线程中切换版本，与 subscribe 不会交错
+                self.ring.append(entry)
+                self.frame = frame
+                self.version = frame.version
+                for group in list(self.groups.values()):
+                    # 序列化期间新建的组在这里补上
+                    payload = payloads[group] if group in payloads else self._encode_delta_for(group, frame, entry)
+                    if payload is not None:
+                        self.stats['bytes_serialized'] += len(payload)
+                        self.publish(group, payload)
+                idle = 0.0
+            events = self._encode_alerts()
+            if events is not None:
+                for group in list(self.groups.values()):
+                    selected = [event for event in events if group.filter.accepts(event['stock_code'])]
+                    if selected:
+                        self.publish(group, sse_message(dumps(selected), 'alert'))
+                idle = 0.0
+            idle += self.interval
+            if idle >= self.heartbeat:
+                for group in list(self.groups.values()):
+                    self.publish(group, HEARTBEAT)
+                idle = 0.0
+            await asyncio.sleep(self.interval)
+
+class StreamServer:
+    """基于 asyncio.start_server 的 SSE 服务，一个进程可以维持数千个推送连接
+
+    只处理 GET /api/realtime，其余接口仍由 Flask 提供。每个连接只是一个协程，
+    先写出快照或补发的增量，再从自己的队列取出广播者已经序列化好的字节写出。
+    订阅参数：codes（股票代码）、sectors（板块代码）、fields（字段），多个值用逗号分隔；
+    format=columns 时快照按列发送（字段名只出现一次），增量仍为逐行的变化字段。
+    请求头须在 request_timeout 秒内读完，行数和字节数有上限，慢速或超大的请求不会占住连接。
+    """
+    def __init__(self, host: str = '0.0.0.0', port: int = 5001, broadcaster: Broadcaster = None,
+                 request_timeout: float = 10.0, max_header_lines: int = 100, max_header_bytes: int = 16384):
+        self.host = host
+        self.port = port
+        self.broadcaster = broadcaster or Broadcaster()
+        self.request_timeout = request_timeout
+        self.max_header_lines = max_header_lines
+        self.max_header_bytes = max_header_bytes
+        self.server: Optional[asyncio.AbstractServer] = None
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        """读取请求行和请求头，返回 (方法, 路径, 查询串, 请求头)
+
+        超时抛出带 408 响应的 RequestRejected，请求头超过行数或字节数上限时为 431。
+        """
+        try:
+            request_line, headers = await asyncio.wait_for(self._read_head(reader), self.request_timeout)
+        except asyncio.TimeoutError:
+            raise RequestRejected(REQUEST_TIMEOUT)
+        parts = request_line.split()
+        if len(parts) < 2:
+            return None, None, '', headers
+        path, _, query = parts[1].partition('?')
+        return parts[0], path, query, headers
+
+    async def _read_head(self, reader: asyncio.StreamReader) -> Tuple[str, Dict[str, str]]:
+        """逐行读取请求行和请求头，累计行数和字节数"""
+        lines = []
+        size = 0
+        while True:
+            try:
+                line = await reader.readline()
+            except ValueError:
+                # 单行超过 StreamReader 的缓冲上限
+                raise RequestRejected(HEADERS_TOO_LARGE)
+            size += len(line)
+            if size > self.max_header_bytes:
+                raise RequestRejected(HEADERS_TOO_LARGE)
+            line = line.decode('latin-1').strip()
+            if not line:
+                break
+            lines.append(line)
+            # 第一行是请求行，其后才是请求头
+            if len(lines) > self.max_header_lines + 1:
+                raise RequestRejected(HEADERS_TOO_LARGE)
+        headers = {}
+        for line in lines[1:]:
+            name, _, value = line.partition(':')
+            headers[name.strip().lower()] = value.strip()
+        return (lines[0] if lines else ''), headers
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        subscriber = None
+        try:
+            try:
+                method, path, query, headers = await self._read_request(reader)
+            except RequestRejected as e:
+                writer.write(e.response)
+                await writer.drain()
+                return
+            if method != 'GET' or path != '/api/realtime':
+                writer.write(NOT_FOUND)
+                await writer.drain()
+                return
+            try:
+                stream_filter = StreamFilter.from_query(query, self.broadcaster.resolve_sectors)
+            except ValueError as e:
+                writer.write(error_response('400 Bad Request', str(e)))
+                await writer.drain()
+                return
+            writer.write(SSE_HEADERS)
+            subscriber = self.broadcaster.subscribe(writer, headers.get('last-event-id'), stream_filter)
+            if subscriber.snapshot_frame is not None:
+                writer.write(await self.broadcaster.snapshot(subscriber.group, subscriber.snapshot_frame))
+            for payload in subscriber.backlog:
+                writer.write(payload)
+            subscriber.backlog = []
+            await writer.drain()
+            while not subscriber.closed:
+                payload = await subscriber.queue.get()
+                writer.write(payload)
+                await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            if subscriber is not None:
+                self.broadcaster.unsubscribe(subscriber)
+            writer.close()
+
+    async def serve(self):
+        self.server = await asyncio.start_server(self.handle, self.host, self.port, backlog=4096,
+                                                 limit=self.max_header_bytes)
+        logging.info(f"SSE 推送服务已启动: {self.host}:{self.port}")
+        producer = asyncio.create_task(self.broadcaster.run())
+        try:
+            async with self.server:
+                await self.server.serve_forever()
+        finally:
+            producer.cancel()
+
+    def run(self):
+        asyncio.run(self.serve())
+
+def start_stream_server(host: str = '0.0.0.0', port: int = 5001) -> threading.Thread:
+    """在后台线程中运行 SSE 推送服务"""
+    thread = threading.Thread(target=StreamServer(host, port).run, name='sse-stream', daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,143 @@
+import os
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from ..analysis.trading_session import SESSION_MINUTES, session_minute_to_hhmm
+
+# 通达信导出文件的头部：第一行为 代码 名称 周期 复权类型，第二行为列名
+PERIOD_NAMES = {
+    'daily': '日线',
+    '5min': '5分钟线',
+    '1min': '1分钟线'
+}
+COLUMN_LINES = {
+    'daily': '      日期\t    开盘\t    最高\t    最低\t    收盘\t    成交量\t    成交额',
+    '5min': '      日期\t    时间\t    开盘\t    最高\t    最低\t    收盘\t    成交量\t    成交额',
+    '1min': '      日期\t    时间\t    开盘\t    最高\t    最低\t    收盘\t    成交量\t    成交额'
+}
+FOOTER_LINE = '数据来源:通达信'
+
+# 板块文件名与 SectorLoader 中的类型映射一致
+SECTOR_FILES = ('地区板块.txt', '风格板块.txt', '概念板块.txt', '行业板块.txt', '指数板块.txt')
+
+# 各市场代码前缀：(文件名前缀, 代码开头, 占比)
+MARKETS = (
+    ('SH', '600', 0.35),
+    ('SH', '688', 0.1),
+    ('SZ', '000', 0.25),
+    ('SZ', '300', 0.25),
+    ('BJ', '830', 0.05)
+)
+
+_NAME_CHARS = '华中国东方新科技电子生物医药能源银行证券地产汽车化工材料信息通讯'
+
+def trading_days(start: date, count: int) -> List[date]:
+    """从 start 起的 count 个工作日（不考虑节假日）"""
+    days = []
+    day = start
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day += timedelta(days=1)
+    return days
+
+def make_stocks(count: int, seed: int = 0) -> List[Tuple[str, str, str]]:
+    """生成 (市场, 股票代码, 股票名称) 列表，名称为 GBK 可编码的中文"""
+    rng = np.random.default_rng(seed)
+    stocks = []
+    for market, prefix, share in MARKETS:
+        for i in range(max(1, int(round(count * share)))):
+            code = f"{prefix}{i:03d}"
+            name = ''.join(rng.choice(list(_NAME_CHARS), 4))
+            stocks.append((market, code, name))
+    return stocks[:count]
+
+def _bar_times(data_type: str) -> np.ndarray:
+    """一个交易日内的K线时间（HHMM），日线为空"""
+    if data_type == 'daily':
+        return np.zeros(1, dtype=np.int64)
+    step = 5 if data_type == '5min' else 1
+    return session_minute_to_hhmm(np.arange(step, SESSION_MINUTES + 1, step))
+
+def write_bar_file(path: str, stock: Tuple[str, str, str], data_type: str,
+                   days: List[date], rng: np.random.Generator) -> int:
+    """写入一只股票的通达信格式K线文件，返回数据行数"""
+    _, code, name = stock
+    times = _bar_times(data_type)
+    count = len(days) * len(times)
+
+    # 随机游走价格，保证 最低 <= 开盘/收盘 <= 最高
+    close = np.round(np.maximum(rng.uniform(5, 50) * np.exp(np.cumsum(rng.normal(0, 0.002, count))), 0.01), 2)
+    open_ = np.round(np.concatenate(([close[0]], close[:-1])), 2)
+    high = np.round(np.maximum(open_, close) * (1 + rng.uniform(0, 0.003, count)), 2)
+    low = np.round(np.minimum(open_, close) * (1 - rng.uniform(0, 0.003, count)), 2)
+    volume = rng.integers(100, 100000, count) * 100
+    amount = np.round(volume * close, 2)
+
+    lines = [f"{code} {name} {PERIOD_NAMES[data_type]} 不复权", COLUMN_LINES[data_type]]
+    row = 0
+    for day in days:
+        day_text = day.strftime('%Y/%m/%d')
+        for hhmm in times:
+            prices = f"{open_[row]:.2f}\t{high[row]:.2f}\t{low[row]:.2f}\t{close[row]:.2f}\t{volume[row]}\t{amount[row]:.2f}"
+            if data_type == 'daily':
+                lines.append(f"{day_text}\t{prices}")
+            else:
+                lines.append(f"{day_text}\t{hhmm:04d}\t{prices}")
+            row += 1
+    lines.append(FOOTER_LINE)
+
+    with open(path, 'w', encoding='gbk', newline='\r\n') as f:
+        f.write('\n'.join(lines))
+        f.write('\n')
+    return count
+
+def generate_tdx_data(root: str, stock_count: int = 100,
+                      day_counts: Optional[Dict[str, int]] = None,
+                      start: date = date(2023, 1, 3), seed: int = 0) -> Dict[str, int]:
+    """生成通达信K线导出目录 root/daily、root/5min、root/1min，返回各类型的数据行数
+
+    day_counts 指定各周期生成的交易日数，例如 {'daily': 250, '5min': 20, '1min': 5}。
+    """
+    day_counts = day_counts or {'daily': 250, '5min': 20, '1min': 5}
+    stocks = make_stocks(stock_count, seed)
+    rng = np.random.default_rng(seed)
+    all_days = trading_days(start, max(day_counts.values()))
+    totals = {}
+    for data_type, day_count in day_counts.items():
+        directory = os.path.join(root, data_type)
+        os.makedirs(directory, exist_ok=True)
+        days = all_days[-day_count:]
+        totals[data_type] = 0
+        for stock in stocks:
+            path = os.path.join(directory, f"{stock[0]}#{stock[1]}.txt")
+            totals[data_type] += write_bar_file(path, stock, data_type, days, rng)
+        logging.info(f"生成{data_type}数据: {len(stocks)} 个文件, {totals[data_type]} 行")
+    return totals
+
+def generate_sector_data(root: str, stock_count: int = 100, sectors_per_file: int = 50,
+                         stocks_per_sector: int = 30, seed: int = 0) -> int:
+    """生成板块文件（制表符分隔：板块代码、板块名称、股票代码、股票名称），返回成分股记录数"""
+    stocks = make_stocks(stock_count, seed)
+    rng = np.random.default_rng(seed + 1)
+    os.makedirs(root, exist_ok=True)
+    total = 0
+    sector_code = 880001
+    for filename in SECTOR_FILES:
+        lines = []
+        for i in range(sectors_per_file):
+            sector_name = f"{filename[:2]}{''.join(rng.choice(list(_NAME_CHARS), 2))}{i}"
+            size = min(stocks_per_sector, len(stocks))
+            for index in rng.choice(len(stocks), size, replace=False):
+                _, code, name = stocks[index]
+                lines.append(f"{sector_code}\t{sector_name}\t{code}\t{name}")
+            sector_code += 1
+            total += size
+        with open(os.path.join(root, filename), 'w', encoding='gbk', newline='\r\n') as f:
+            f.write('\n'.join(lines))
+            f.write('\n')
+    logging.info(f"生成板块数据: {len(SECTOR_FILES)} 个文件, {total} 条成分股记录")
+    return total
@@ -0,0 +1,269 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import logging
+
+# 添加项目根目录到 Python 路径
+project_dir = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, project_dir)
+
+from src.analysis.resampler import BarResampler
+from src.benchmark.data_generator import generate_sector_data, generate_tdx_data, make_stocks
+from src.data_collector.history_loader import HistoryLoader
+from src.data_collector.quote_source import ReplayQuoteSource
+from src.data_collector.sector_loader import SectorLoader
+from src.database.bar_keys import unpack_date
+from src.database.db_manager import BAR_TABLES, DatabaseManager
+from src.database.models import init_database
+from src.database.realtime_persister import RealtimePersister
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块
+    resource = None
+
+def peak_rss_kb() -> Optional[int]:
+    """当前进程及已结束子进程的峰值常驻内存（KB）"""
+    if resource is None:
+        return None
+    usage = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # macOS 返回字节，Linux 返回 KB
+    return usage // 1024 if sys.platform == 'darwin' else usage
+
+def db_size(db_path: str) -> int:
+    """数据库文件及 WAL 文件的总大小"""
+    return sum(os.path.getsize(path) for path in (db_path, db_path + '-wal')
+               if os.path.exists(path))
+
+def git_commit() -> Optional[str]:
+    """当前代码版本"""
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=project_dir,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return None
+
+class Benchmark:
+    """基于生成数据的性能基准：导入、查询、实时写入各阶段的吞吐量、峰值内存和数据库大小"""
+    def __init__(self, work_dir: str, stock_count: int, day_counts: Dict[str, int],
+                 sectors_per_file: int, bulk: bool, seed: int = 0):
+        self.work_dir = work_dir
+        self.data_root = os.path.join(work_dir, 'tdx')
+        self.sector_root = os.path.join(work_dir, 'sectors')
+        self.stock_count = stock_count
+        self.day_counts = day_counts
+        self.sectors_per_file = sectors_per_file
+        self.bulk = bulk
+        self.seed = seed
+        self.results: List[Dict] = []
+        self.db: Optional[DatabaseManager] = None
+
+    def measure(self, phase: str, func: Callable[[], int]) -> Dict:
+        """执行一个阶段，func 返回处理的行数"""
+        start = time.perf_counter()
+        rows = func()
+        elapsed = max(time.perf_counter() - start, 1e-9)
+        result = {
+            'phase': phase,
+            'rows': rows,
+            'seconds': round(elapsed, 4),
+            'rows_per_sec': round(rows / elapsed, 1),
+            'peak_rss_kb': peak_rss_kb(),
+            'db_size_bytes': db_size(self.db.db_path) if self.db else 0
+        }
+        self.results.append(result)
+        logging.info(f"{phase}: {rows} 行, {elapsed:.2f} 秒, {result['rows_per_sec']:.0f} 行/秒, "
+                     f"峰值内存 {result['peak_rss_kb']} KB, 数据库 {result['db_size_bytes']} 字节")
+        return result
+
+    def run(self) -> List[Dict]:
+        """依次执行所有阶段"""
+        self.measure('generate_bars', lambda: sum(generate_tdx_data(
+            self.data_root, self.stock_count, self.day_counts, seed=self.seed).values()))
+        self.measure('generate_sectors', lambda: generate_sector_data(
+            self.sector_root, self.stock_count, self.sectors_per_file, seed=self.seed))
+
+        db_path = os.path.join(self.work_dir, 'benchmark.db')
+        init_database(db_path)
+        self.db = DatabaseManager(db_path)
+        loader = HistoryLoader({data_type: os.path.join(self.data_root, data_type)
+                                for data_type in self.day_counts}, self.db)
+
+        for data_type in self.day_counts:
+            self.measure(f'import_{data_type}', lambda: self._import(loader, data_type))
+        # 数据未变化时的增量导入：只比对文件清单，按检查的文件数计
+        for data_type in self.day_counts:
+            self.measure(f'reimport_{data_type}', lambda: self._reimport(loader, data_type))
+
+        sector_loader = SectorLoader(self.sector_root, self.db)
+        self.measure('import_sectors', lambda: self._import_sectors(sector_loader))
+
+        for data_type in self.day_counts:
+            self.measure(f'query_{data_type}', lambda: self._query(data_type))
+        if '1min' in self.day_counts:
+            self.measure('resample_15min', self._resample)
+            self.measure('replay_1min', self._replay)
+        self.measure('realtime_write', self._realtime_write)
+        return self.results
+
+    def _count(self, table: str) -> int:
+        """表的行数"""
+        with self.db.read_connection() as conn:
+            return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+    def _import(self, loader: HistoryLoader, data_type: str) -> int:
+        """导入一种K线，返回新增行数"""
+        before = self._count(BAR_TABLES[data_type])
+        if self.bulk:
+            loader.bulk_load(data_type)
+        else:
+            loader._load_data_files(data_type)
+        return self._count(BAR_TABLES[data_type]) - before
+
+    def _reimport(self, loader: HistoryLoader, data_type: str) -> int:
+        """重复导入未变化的数据，返回检查的文件数"""
+        self._import(loader, data_type)
+        return len(loader._list_data_files(data_type))
+
+    def _import_sectors(self, sector_loader: SectorLoader) -> int:
+        """导入板块文件，返回成分股记录数"""
+        sector_loader.load_all_sectors()
+        return self._count('stock_sector_relation')
+
+    def _query(self, data_type: str, count: int = 200) -> int:
+        """随机股票的全区间K线查询，返回读取的行数"""
+        stocks = make_stocks(self.stock_count, self.seed)
+        rng = random.Random(self.seed)
+        rows = 0
+        for _ in range(count):
+            code = rng.choice(stocks)[1]
+            rows += len(self.db.get_bars(code, data_type)['time'])
+            self.db.get_last_bar_time(code, data_type)
+        return rows
+
+    def _resample(self) -> int:
+        """1分钟K线重采样为15分钟（不命中缓存），返回源数据行数"""
+        resampler = BarResampler(self.db)
+        rows = 0
+        for _, code, _ in make_stocks(self.stock_count, self.seed):
+            resampler.get_bars(code, '15min')
+            rows += len(self.db.get_bars(code, '1min')['time'])
+        return rows
+
+    def _replay(self) -> int:
+        """不限速回放最后一个交易日的1分钟行情，返回产出的行情条数"""
+        last_time = max(self.db.get_last_bar_time(code, '1min') or 0
+                        for _, code, _ in make_stocks(self.stock_count, self.seed))
+        source = ReplayQuoteSource.from_history(self.db, unpack_date(last_time // 10000), speed=None)
+        rows = 0
+        with source:
+            while True:
+                snapshot = source.read_snapshot()
+                if snapshot is None:
+                    break
+                rows += len(snapshot)
+        return rows
+
+    def _realtime_write(self, rounds: int = 20) -> int:
+        """模拟全市场实时行情经后写队列批量写入分区表，返回写入行数"""
+        stocks = make_stocks(self.stock_count, self.seed)
+        rng = random.Random(self.seed)
+        persister = RealtimePersister(self.db)
+        for _ in range(rounds):
+            persister.submit([{'code': code, 'name': name, 'current': round(rng.uniform(5, 50), 2),
+                               'prev_close': 10.0, 'volume': rng.randint(100, 10 ** 7)}
+                              for _, code, name in stocks])
+        rows = 0
+        while persister.queue_depth():
+            rows += persister.flush()
+        return rows
+
+    def record(self) -> Dict:
+        """本次运行的完整记录"""
+        return {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'scale': {
+                'stocks': self.stock_count,
+                'days': self.day_counts,
+                'sectors_per_file': self.sectors_per_file,
+                'bulk': self.bulk
+            },
+            'results': self.results
+        }
+
+def load_previous(results_file: str, scale: Dict) -> Optional[Dict]:
+    """结果文件中相同规模的上一次运行"""
+    if not os.path.exists(results_file):
+        return None
+    previous = None
+    with open(results_file, encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                record = json.loads(line)
+                if record.get('scale') == scale:
+                    previous = record
+    return previous
+
+def compare(previous: Dict, current: Dict):
+    """输出与上一次运行的吞吐量对比"""
+    before = {r['phase']: r for r in previous['results']}
+    logging.info(f"与 {previous['timestamp']} ({previous.get('commit')}) 对比:")
+    for result in current['results']:
+        old = before.get(result['phase'])
+        if not old or not old['rows_per_sec']:
+            continue
+        change = (result['rows_per_sec'] / old['rows_per_sec'] - 1) * 100
+        logging.info(f"  {result['phase']}: {old['rows_per_sec']:.0f} -> "
+                     f"{result['rows_per_sec']:.0f} 行/秒 ({change:+.1f}%)")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="股票数据导入与查询性能基准")
+    parser.add_argument('--stocks', type=int, default=100, help="股票数量")
+    parser.add_argument('--daily-days', type=int, default=250, help="日线交易日数")
+    parser.add_argument('--5min-days', dest='min5_days', type=int, default=20, help="5分钟线交易日数")
+    parser.add_argument('--1min-days', dest='min1_days', type=int, default=5, help="1分钟线交易日数")
+    parser.add_argument('--sectors', type=int, default=50, help="每个板块文件的板块数")
+    parser.add_argument('--bulk', action='store_true', help="使用多进程批量导入")
+    parser.add_argument('--work-dir', help="生成数据和数据库的目录（默认临时目录，结束后删除）")
+    parser.add_argument('--results', default=os.path.join(project_dir, 'benchmark_results.jsonl'),
+                        help="结果追加写入的 JSON Lines 文件")
+    parser.add_argument('--seed', type=int, default=0)
+    return parser.parse_args()
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    args = parse_args()
+    day_counts = {'daily': args.daily_days, '5min': args.min5_days, '1min': args.min1_days}
+    day_counts = {data_type: days for data_type, days in day_counts.items() if days > 0}
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='stock_bench_')
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        benchmark = Benchmark(work_dir, args.stocks, day_counts, args.sectors, args.bulk, args.seed)
+        benchmark.run()
+        record = benchmark.record()
+        previous = load_previous(args.results, record['scale'])
+        if previous:
+            compare(previous, record)
+        with open(args.results, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        logging.info(f"结果已写入: {args.results}")
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+if __name__ == "__main__":
+    main()
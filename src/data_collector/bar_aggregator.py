@@ -0,0 +1,196 @@
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+from ..analysis.trading_session import (SESSION_MINUTES, bucket_end_minute, session_minute_to_hhmm,
+                                        tick_session_minute)
+from ..database.bar_keys import pack_time, unpack_time
+from ..database.db_manager import DatabaseManager
+
+# 实时合成的K线周期（分钟数），与 stock_1min/stock_5min 表对应
+LIVE_PERIODS = {'1min': 1, '5min': 5}
+
+class FormingBar:
+    """正在形成的一根K线"""
+    __slots__ = ('bucket', 'name', 'open', 'high', 'low', 'close', 'volume', 'amount')
+
+    def __init__(self, bucket: int, name: str, price: float, volume: float, amount: float):
+        self.bucket = bucket
+        self.name = name
+        self.open = self.high = self.low = self.close = price
+        self.volume = volume
+        self.amount = amount
+
+    def add(self, price: float, volume: float, amount: float):
+        if price > self.high:
+            self.high = price
+        if price < self.low:
+            self.low = price
+        self.close = price
+        self.volume += volume
+        self.amount += amount
+
+class BarAggregator:
+    """由采集器的行情快照实时合成1分钟/5分钟K线
+
+    快照中的成交量、成交额是当日累计值，与同一股票上一次的差值计入当前K线；
+    行情时间按 trading_session 的规则映射到K线（0931 为第一根，午休和收盘后的成交
+    归入前一根）。市场时间跨过K线边界时，上一根K线全部完成，按周期批量写入
+    stock_1min/stock_5min；正在形成的K线可随时通过 get_forming 读取。
+    """
+    def __init__(self, db: DatabaseManager = None, periods: Optional[Dict[str, int]] = None,
+                 auto_flush: bool = True, trade_date: Optional[str] = None):
+        """trade_date 为空时跟随系统日期跨日；回放历史行情时传入回放的交易日"""
+        self.db = db or DatabaseManager()
+        self.periods = dict(periods or LIVE_PERIODS)
+        self.auto_flush = auto_flush
+        self.fixed_date = trade_date
+        self.trade_date: Optional[str] = None
+        self._forming: Dict[str, Dict[str, FormingBar]] = {freq: {} for freq in self.periods}
+        self._completed: Dict[str, List[Tuple]] = {freq: [] for freq in self.periods}
+        self._last_totals: Dict[str, Tuple[float, float]] = {}
+        self._minutes: Dict[str, int] = {}
+        # 每个分钟序号在各周期中所属K线的结束分钟
+        self._buckets = [{freq: int(bucket_end_minute(minute, period)) for freq, period in self.periods.items()}
+                         for minute in range(SESSION_MINUTES + 1)]
+        self._market_minute = 0
+        self._lock = threading.Lock()
+        self.stats = {'ticks': 0, 'bars_completed': 0, 'bars_written': 0, 'flushes': 0}
+
+    def _minute(self, time_text: str) -> int:
+        """行情时间 -> 所属1分钟K线的序号，同一时间只计算一次"""
+        minute = self._minutes.get(time_text)
+        if minute is None:
+            minute = int(tick_session_minute(pack_time(time_text)))
+            self._minutes[time_text] = minute
+        return minute
+
+    def update(self, rows: Sequence[Dict], timestamp: Optional[float] = None):
+        """处理一批变化的行情（采集器的接收者）"""
+        moment = datetime.fromtimestamp(time.time() if timestamp is None else timestamp)
+        trade_date = self.fixed_date or moment.strftime('%Y-%m-%d')
+        default_time = moment.strftime('%H:%M:%S')
+        with self._lock:
+            if trade_date != self.trade_date:
+                self._start_day(trade_date)
+
+            latest = self._market_minute
+            forming = self._forming
+            totals = self._last_totals
+            for row in rows:
+                total_volume = row.get('volume') or 0
+                if not total_volume:
+                    continue  # 当日还没有成交
+                code = row['code']
+                minute = self._minute(row.get('time') or default_time)
+                total_amount = row.get('amount') or 0
+                last = totals.get(code)
+                if last is None:
+                    # 盘中才开始采集时没有之前的累计值，第一次只记录基准
+                    volume, amount = (total_volume, total_amount) if minute == 1 else (0, 0)
+                elif total_volume < last[0]:
+                    volume, amount = total_volume, total_amount
+                else:
+                    volume, amount = total_volume - last[0], total_amount - last[1]
+                totals[code] = (total_volume, total_amount)
+                if minute > latest:
+                    latest = minute
+                # 晚到的行情计入当前仍在形成的K线，已完成的K线不再修改
+                buckets = self._buckets[max(minute, self._market_minute)]
+
+                price = row['current']
+                for freq, bars in forming.items():
+                    bucket = buckets[freq]
+                    bar = bars.get(code)
+                    if bar is None or bar.bucket != bucket:
+                        if bar is not None:
+                            self._complete(freq, code, bar)
+                        bars[code] = FormingBar(bucket, row.get('name', ''), price, volume, amount)
+                    else:
+                        bar.add(price, volume, amount)
+                self.stats['ticks'] += 1
+
+            if latest > self._market_minute:
+                self._market_minute = latest
+                self._close_bars(latest)
+        if self.auto_flush and any(self._completed.values()):
+            self.flush()
+
+    def _start_day(self, trade_date: str):
+        """跨日：上一交易日的K线全部完成，累计值清零"""
+        if self.trade_date is not None:
+            self._close_bars(None)
+        self.trade_date = trade_date
+        self._last_totals.clear()
+        self._minutes.clear()
+        self._market_minute = 0
+
+    def _close_bars(self, minute: Optional[int]):
+        """市场时间到达 minute 后，结束分钟早于它所在K线的都已完成；minute 为 None 时全部完成"""
+        for freq, bars in self._forming.items():
+            current = None if minute is None else self._buckets[minute][freq]
+            for code in [code for code, bar in bars.items() if current is None or bar.bucket < current]:
+                self._complete(freq, code, bars.pop(code))
+
+    def _complete(self, freq: str, code: str, bar: FormingBar):
+        """把完成的K线放入待写队列"""
+        trade_time = unpack_time(session_minute_to_hhmm(bar.bucket))
+        self._completed[freq].append((code, bar.name, self.trade_date, trade_time, bar.open, bar.high,
+                                      bar.low, bar.close, bar.volume, bar.amount))
+        self.stats['bars_completed'] += 1
+
+    def flush(self) -> int:
+        """把已完成的K线按周期各用一个事务写入数据库，返回写入根数"""
+        with self._lock:
+            pending = {freq: rows for freq, rows in self._completed.items() if rows}
+            self._completed = {freq: [] for freq in self.periods}
+        written = 0
+        for freq, rows in pending.items():
+            try:
+                self.db.save_bar_batch(freq, rows)
+                written += len(rows)
+            except Exception as e:
+                logging.error(f"保存实时{freq}K线失败: {str(e)}")
+                with self._lock:
+                    self._completed[freq][:0] = rows
+        if pending:
+            self.stats['bars_written'] += written
+            self.stats['flushes'] += 1
+        return written
+
+    def finish(self) -> int:
+        """收盘或停止采集时，把正在形成的K线也作为完成的K线写入"""
+        with self._lock:
+            self._close_bars(None)
+        return self.flush()
+
+    def get_forming(self, stock_code: str, freq: str = '1min') -> Optional[Dict]:
+        """正在形成的K线（time 为 YYYYMMDDHHMM 格式的结束时间）"""
+        bar = self._forming.get(freq, {}).get(stock_code)
+        if bar is None:
+            return None
+        day = int(self.trade_date.replace('-', ''))
+        return {'time': day * 10000 + int(session_minute_to_hhmm(bar.bucket)), 'open': bar.open,
+                'high': bar.high, 'low': bar.low, 'close': bar.close,
+                'volume': bar.volume, 'amount': bar.amount}
+
+    def get_forming_bars(self, stock_code: str) -> Dict[str, Optional[Dict]]:
+        """各周期正在形成的K线"""
+        return {freq: self.get_forming(stock_code, freq) for freq in self.periods}
+
+    def get_stats(self) -> Dict:
+        return {**self.stats, 'forming': len(self._forming.get('1min', {})),
+                'pending': sum(len(rows) for rows in self._completed.values())}
+
+_default_aggregator: Optional[BarAggregator] = None
+_default_lock = threading.Lock()
+
+def get_bar_aggregator(db: DatabaseManager = None) -> BarAggregator:
+    """进程内共享的实时K线合成器（采集器写入，API 读取）"""
+    global _default_aggregator
+    with _default_lock:
+        if _default_aggregator is None:
+            _default_aggregator = BarAggregator(db)
+        return _default_aggregator
@@ -0,0 +1,146 @@
+import logging
+from datetime import date, time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# 文件前两行为头部信息和列名
+HEADER_LINES = 2
+
+# 每个数据块的行数
+DEFAULT_CHUNK_SIZE = 10000
+
+# 每行字段数：日期、(时间、)开盘、最高、最低、收盘、成交量、成交额
+FIELD_COUNTS = {
+    'daily': 7,
+    '5min': 8,
+    '1min': 8
+}
+
+# 日期/时间解析缓存：同一批文件中不同的日期和时间只有几千个
+_date_cache: Dict[bytes, str] = {}
+_time_cache: Dict[bytes, str] = {}
+
+def parse_date(raw: bytes) -> str:
+    """解析日期 2024/02/13 -> 2024-02-13，结果缓存"""
+    value = _date_cache.get(raw)
+    if value is None:
+        year, month, day = raw.strip().split(b'/')
+        value = date(int(year), int(month), int(day)).isoformat()
+        _date_cache[raw] = value
+    return value
+
+def parse_time(raw: bytes) -> str:
+    """解析时间 0931 -> 09:31:00，结果缓存"""
+    value = _time_cache.get(raw)
+    if value is None:
+        hour, minute = divmod(int(raw), 100)
+        value = time(hour, minute).strftime('%H:%M:00')
+        _time_cache[raw] = value
+    return value
+
+def parse_header(first_line: str) -> Optional[Dict]:
+    """解析文件头部信息"""
+    try:
+        # 格式：股票代码 股票名称 数据类型 复权类型
+        parts = first_line.strip().split()
+        return {
+            'stock_code': parts[0],
+            'stock_name': parts[1],
+            'data_type': parts[2],  # "1分钟线"/"5分钟线"/"日线"
+            'adjust_type': parts[3]  # "不复权"
+        }
+    except Exception as e:
+        logging.error(f"解析文件头部失败: {first_line}, 错误: {str(e)}")
+        return None
+
+class BarFileParser:
+    """通达信K线导出文件的流式解析器
+
+    直接在 GBK 字节流上逐行解析（数据行只含 ASCII），按块产出与
+    K线表列顺序一致的元组，股票代码和名称在所有行之间共享同一对象。
+    """
+    def __init__(self, file_path: str, data_type: str, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 start_offset: int = 0):
+        self.file_path = file_path
+        self.data_type = data_type
+        self.chunk_size = chunk_size
+        self.start_offset = start_offset  # 大于0时只解析该字节偏移之后追加的行
+        self.header = None
+        self.rows_parsed = 0
+        self.rows_failed = 0
+        self.end_offset = start_offset  # 最后一条有效数据行结束处的字节偏移
+        self.last_row = None
+
+    def iter_chunks(self) -> Iterator[List[Tuple]]:
+        """逐块产出K线元组"""
+        with open(self.file_path, 'rb') as f:
+            self.header = parse_header(f.readline().decode('gbk', errors='replace'))
+            if not self.header:
+                return
+            if self.start_offset:
+                f.seek(self.start_offset)
+            else:
+                for _ in range(HEADER_LINES - 1):
+                    f.readline()
+            offset = f.tell()
+
+            parse_row = self._daily_row if self.data_type == 'daily' else self._min_row
+            field_count = FIELD_COUNTS[self.data_type]
+            chunk = []
+            for line in f:
+                offset += len(line)
+                parts = line.split(b'\t')
+                if len(parts) != field_count:  # 跳过空行和末尾的"数据来源"行
+                    continue
+                try:
+                    chunk.append(parse_row(parts))
+                except Exception as e:
+                    self.rows_failed += 1
+                    logging.error(f"解析行数据失败: {line!r}, 错误: {str(e)}")
+                    continue
+                self.end_offset = offset
+                if len(chunk) >= self.chunk_size:
+                    self._emit(chunk)
+                    yield chunk
+                    chunk = []
+            if chunk:
+                self._emit(chunk)
+                yield chunk
+
+    def _emit(self, chunk: List[Tuple]):
+        """记录已产出的行数和最后一行"""
+        self.rows_parsed += len(chunk)
+        self.last_row = chunk[-1]
+
+    def iter_rows(self) -> Iterator[Tuple]:
+        """逐行产出K线元组"""
+        for chunk in self.iter_chunks():
+            yield from chunk
+
+    def _daily_row(self, parts: List[bytes]) -> Tuple:
+        """日线行：日期、开盘、最高、最低、收盘、成交量、成交额"""
+        return (
+            self.header['stock_code'],
+            self.header['stock_name'],
+            _date_cache.get(parts[0]) or parse_date(parts[0]),
+            float(parts[1]),
+            float(parts[2]),
+            float(parts[3]),
+            float(parts[4]),
+            int(float(parts[5])),  # 处理科学计数法
+            float(parts[6])
+        )
+
+    def _min_row(self, parts: List[bytes]) -> Tuple:
+        """分钟线行：日期、时间、开盘、最高、最低、收盘、成交量、成交额"""
+        return (
+            self.header['stock_code'],
+            self.header['stock_name'],
+            _date_cache.get(parts[0]) or parse_date(parts[0]),
+            _time_cache.get(parts[1]) or parse_time(parts[1]),
+            float(parts[2]),
+            float(parts[3]),
+            float(parts[4]),
+            float(parts[5]),
+            int(float(parts[6])),
+            float(parts[7])
+        )
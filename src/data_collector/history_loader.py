@@ -1,152 +1,180 @@
 import os
-from datetime import datetime
+import time
+from multiprocessing import Pool
 import logging
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from ..database.db_manager import DatabaseManager
+from .import_manifest import ImportPlan
 
-class HistoryLoader:
-    def __init__(self):
-        self.db = DatabaseManager()
-        self.data_paths = {
-            'daily': 'E:\\ztdatabase\\bendi\\20240213-1',
-            '5min': 'E:\\ztdatabase\\bendi\\5min',
-            '1min': 'E:\\ztdatabase\\bendi\\1min'
+def _parse_file_worker(task: Tuple[str, str, Optional[Dict], bool]) \
+        -> Tuple[str, Optional[List[Tuple]], Optional[Dict], Optional[str]]:
+    """在子进程中按导入计划解析单个文件，返回按列顺序排列的元组和新的清单记录"""
+    data_type, file_path, entry, incremental = task
+    try:
+        plan = ImportPlan(file_path, data_type, entry, incremental)
+        if plan.action == ImportPlan.SKIP:
+            return file_path, None, None, None
+        parser = plan.parser()
+        rows = list(parser.iter_rows())
+        if parser.header is None:
+            return file_path, None, None, "文件头部解析失败"
+        return file_path, rows, plan.manifest_entry(parser), None
+    except Exception as e:
+        return file_path, None, None, str(e)
+
+class ImportProgress:
+    """导入进度与吞吐量统计"""
+    def __init__(self, data_type: str, total_files: int, report_interval: float = 5.0):
+        self.data_type = data_type
+        self.total_files = total_files
+        self.report_interval = report_interval
+        self.files_done = 0
+        self.files_skipped = 0
+        self.files_failed = 0
+        self.rows = 0
+        self.start_time = time.perf_counter()
+        self._last_report = self.start_time
+    
+    def update(self, files: int = 0, rows: int = 0, failed: int = 0, skipped: int = 0):
+        """累加进度，到达汇报间隔时输出日志"""
+        self.files_done += files
+        self.files_skipped += skipped
+        self.files_failed += failed
+        self.rows += rows
+        now = time.perf_counter()
+        if now - self._last_report >= self.report_interval:
+            self._last_report = now
+            self.report()
+    
+    def summary(self) -> Dict:
+        """返回当前统计结果"""
+        elapsed = max(time.perf_counter() - self.start_time, 1e-9)
+        return {
+            'data_type': self.data_type,
+            'total_files': self.total_files,
+            'files_done': self.files_done,
+            'files_skipped': self.files_skipped,
+            'files_failed': self.files_failed,
+            'rows': self.rows,
+            'elapsed': elapsed,
+            'rows_per_sec': self.rows / elapsed,
+            'files_per_sec': self.files_done / elapsed
         }
     
+    def report(self):
+        """输出进度日志"""
+        s = self.summary()
+        logging.info(
+            f"{self.data_type}导入进度: {s['files_done']}/{s['total_files']} 文件, "
+            f"{s['rows']} 行, 未变化 {s['files_skipped']}, 失败 {s['files_failed']}, "
+            f"{s['rows_per_sec']:.0f} 行/秒, {s['files_per_sec']:.1f} 文件/秒"
+        )
+
+# 默认的通达信导出目录
+DEFAULT_DATA_PATHS = {
+    'daily': 'E:\\ztdatabase\\bendi\\20240213-1',
+    '5min': 'E:\\ztdatabase\\bendi\\5min',
+    '1min': 'E:\\ztdatabase\\bendi\\1min'
+}
+
+class HistoryLoader:
+    def __init__(self, data_paths: Optional[Dict[str, str]] = None, db: DatabaseManager = None):
+        """data_paths 可覆盖部分或全部类型的数据目录"""
+        self.db = db or DatabaseManager()
+        self.data_paths = {**DEFAULT_DATA_PATHS, **(data_paths or {})}
+    
     def _parse_stock_code(self, filename: str) -> str:
         """从文件名解析股票代码"""
         # 格式：BJ#/SH#/SZ# + 股票代码 + .txt
         return filename.split('#')[1].split('.')[0]
     
-    def _parse_file_header(self, first_line: str) -> Dict:
-        """解析文件头部信息"""
-        try:
-            # 格式：股票代码 股票名称 数据类型 复权类型
-            parts = first_line.strip().split()
-            return {
-                'stock_code': parts[0],
-                'stock_name': parts[1],
-                'data_type': parts[2],  # "1分钟线"/"5分钟线"/"日线"
-                'adjust_type': parts[3]  # "不复权"
-            }
-        except Exception as e:
-            logging.error(f"解析文件头部失败: {first_line}, 错误: {str(e)}")
-            return None
+    def load_history_data(self, bulk: bool = False, incremental: bool = True, **bulk_options):
+        """加载所有历史数据
+
+        bulk=True 时使用多进程批量导入模式；incremental=True 时根据导入清单
+        跳过未变化的文件，只导入追加的尾部数据。
+        """
+        for data_type in ('daily', '5min', '1min'):
+            if bulk:
+                self.bulk_load(data_type, incremental=incremental, **bulk_options)
+            else:
+                self._load_data_files(data_type, incremental)
     
-    def _parse_daily_data(self, lines: List[str]) -> List[Dict]:
-        """解析日线数据"""
-        data = []
-        # 解析文件头部
-        header = self._parse_file_header(lines[0])
-        if not header:
-            return data
-        
-        # 从第三行开始解析数据（跳过头部信息和列名）
-        for line in lines[2:]:
-            try:
-                parts = line.strip().split('\t')
-                if len(parts) != 7:  # 日期、开盘、最高、最低、收盘、成交量、成交额
-                    continue
-                    
-                data.append({
-                    'stock_code': header['stock_code'],  # 添加股票代码
-                    'stock_name': header['stock_name'],  # 添加股票名称
-                    'trade_date': datetime.strptime(parts[0].strip(), '%Y/%m/%d').date(),
-                    'open_price': float(parts[1]),
-                    'high_price': float(parts[2]),
-                    'low_price': float(parts[3]),
-                    'close_price': float(parts[4]),
-                    'volume': int(float(parts[5])),  # 处理科学计数法
-                    'amount': float(parts[6])
-                })
-            except Exception as e:
-                logging.error(f"解析行数据失败: {line}, 错误: {str(e)}")
-                continue
-        return data
+    def _list_data_files(self, data_type: str) -> List[str]:
+        """列出指定类型的数据文件（绝对路径，作为导入清单的键）"""
+        path = os.path.abspath(self.data_paths[data_type])
+        return [os.path.join(path, name) for name in sorted(os.listdir(path))
+                if name.endswith('.txt')]
     
-    def _parse_min_data(self, lines: List[str]) -> List[Dict]:
-        """解析分钟线数据"""
-        data = []
-        # 解析文件头部
-        header = self._parse_file_header(lines[0])
-        if not header:
-            return data
+    def bulk_load(self, data_type: str, incremental: bool = True, workers: Optional[int] = None,
+                  files_per_txn: int = 200, rows_per_txn: int = 500000,
+                  fast_pragmas: bool = True, defer_indexes: bool = True,
+                  report_interval: float = 5.0) -> Dict:
+        """批量导入模式：进程池并行解析文件，主进程作为唯一写入者按批提交事务"""
+        file_paths = self._list_data_files(data_type)
+        manifest = self.db.get_import_manifest(data_type)
+        progress = ImportProgress(data_type, len(file_paths), report_interval)
+        logging.info(f"开始批量导入{data_type}数据，路径: {self.data_paths[data_type]}, 文件数: {len(file_paths)}")
         
-        # 从第三行开始解析数据（跳过头部信息和列名）
-        for line in lines[2:]:
-            try:
-                parts = line.strip().split('\t')
-                if len(parts) != 8:  # 日期、时间、开盘、最高、最低、收盘、成交量、成交额
+        tasks = [(data_type, file_path, manifest.get(file_path), incremental) for file_path in file_paths]
+        with self.db.bulk_load_session(data_type, fast_pragmas, defer_indexes), \
+                Pool(processes=workers) as pool:
+            batch = []
+            batch_manifests = []
+            for file_path, rows, entry, error in pool.imap_unordered(_parse_file_worker, tasks, chunksize=4):
+                if error:
+                    logging.error(f"处理文件失败: {os.path.basename(file_path)}, 错误: {error}")
+                    progress.update(failed=1)
+                    continue
+                if entry is None:
+                    progress.update(skipped=1)
                     continue
-                    
-                date_str = parts[0].strip()
-                time_str = parts[1].strip()
                 
-                # 将日期和时间转换为字符串格式
-                trade_date = datetime.strptime(date_str, '%Y/%m/%d').strftime('%Y-%m-%d')
-                trade_time = datetime.strptime(time_str, '%H%M').strftime('%H:%M:00')
+                batch.extend(rows)
+                batch_manifests.append(entry)
                 
-                data.append({
-                    'stock_code': header['stock_code'],
-                    'stock_name': header['stock_name'],
-                    'trade_date': trade_date,  # 使用字符串格式
-                    'trade_time': trade_time,  # 使用字符串格式
-                    'open_price': float(parts[2]),
-                    'high_price': float(parts[3]),
-                    'low_price': float(parts[4]),
-                    'close_price': float(parts[5]),
-                    'volume': int(float(parts[6])),
-                    'amount': float(parts[7])
-                })
-            except Exception as e:
-                logging.error(f"解析行数据失败: {line}, 错误: {str(e)}")
-                continue
-        return data
-    
-    def load_history_data(self):
-        """加载所有历史数据"""
-        # 加载日线数据
-        self._load_data_files('daily')
-        
-        # 加载5分钟数据
-        self._load_data_files('5min')
+                # 多个文件合并到一个事务中提交，清单记录与数据同时提交
+                if len(batch_manifests) >= files_per_txn or len(batch) >= rows_per_txn:
+                    self.db.save_bar_batch(data_type, batch, batch_manifests)
+                    progress.update(files=len(batch_manifests), rows=len(batch))
+                    batch = []
+                    batch_manifests = []
+            
+            if batch_manifests:
+                self.db.save_bar_batch(data_type, batch, batch_manifests)
+                progress.update(files=len(batch_manifests), rows=len(batch))
         
-        # 加载1分钟数据
-        self._load_data_files('1min')
+        progress.report()
+        return progress.summary()
     
-    def _load_data_files(self, data_type: str):
+    def _load_data_files(self, data_type: str, incremental: bool = True):
         """加载指定类型的数据文件"""
-        path = self.data_paths[data_type]
-        logging.info(f"开始加载{data_type}数据，路径: {path}")
+        logging.info(f"开始加载{data_type}数据，路径: {self.data_paths[data_type]}")
+        manifest = self.db.get_import_manifest(data_type)
         
-        for filename in os.listdir(path):
+        for file_path in self._list_data_files(data_type):
+            filename = os.path.basename(file_path)
             try:
-                if not filename.endswith('.txt'):
+                plan = ImportPlan(file_path, data_type, manifest.get(file_path), incremental)
+                if plan.action == ImportPlan.SKIP:
+                    logging.debug(f"文件未变化，跳过: {filename}")
                     continue
-                    
-                file_path = os.path.join(path, filename)
                 
-                with open(file_path, 'r', encoding='gbk') as f:
-                    lines = f.readlines()
-                    
-                if len(lines) < 3:  # 至少需要头部信息、列名和一行数据
+                # 流式解析，executemany 直接消费行迭代器，不生成中间字典
+                parser = plan.parser()
+                self.db.save_imported_file(data_type, parser.iter_rows(),
+                                           lambda: plan.manifest_entry(parser))
+                
+                if parser.header is None:
+                    logging.warning(f"文件头部无效: {filename}")
+                    continue
+                if not parser.rows_parsed and plan.action == ImportPlan.FULL:
                     logging.warning(f"文件内容不完整: {filename}")
                     continue
-                    
-                if data_type == 'daily':
-                    data = self._parse_daily_data(lines)
-                    if data:
-                        self.db.save_daily_data(data)
-                else:
-                    data = self._parse_min_data(lines)
-                    if data:
-                        if data_type == '5min':
-                            self.db.save_5min_data(data)
-                        else:
-                            self.db.save_1min_data(data)
                         
-                logging.info(f"成功加载{data_type}数据: {filename}, 数据条数: {len(data)}")
+                mode = '增量' if plan.action == ImportPlan.TAIL else '全量'
+                logging.info(f"成功加载{data_type}数据({mode}): {filename}, 数据条数: {parser.rows_parsed}")
                 
             except Exception as e:
                 logging.error(f"处理文件失败: {filename}, 错误: {str(e)}")
-                continue 
\ No newline at end of file
+                continue
\ No newline at end of file
@@ -0,0 +1,98 @@
+import hashlib
+import os
+from typing import Dict, Optional
+
+from .bar_parser import BarFileParser
+
+# 读取文件计算哈希时的块大小
+HASH_BLOCK_SIZE = 1 << 20
+
+def hash_file_range(file_path: str, end: int, start: int = 0, hasher=None):
+    """计算文件 [start, end) 字节范围的哈希，可在已有哈希对象上继续累加"""
+    hasher = hasher if hasher is not None else hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start
+        while remaining > 0:
+            block = f.read(min(HASH_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            hasher.update(block)
+            remaining -= len(block)
+    return hasher
+
+class ImportPlan:
+    """单个文件的导入计划：跳过、只导入尾部追加部分或全量导入"""
+    SKIP = 'skip'
+    TAIL = 'tail'
+    FULL = 'full'
+
+    def __init__(self, file_path: str, data_type: str, entry: Optional[Dict] = None,
+                 incremental: bool = True):
+        self.file_path = file_path
+        self.data_type = data_type
+        self.entry = entry
+        stat = os.stat(file_path)
+        self.file_size = stat.st_size
+        self.file_mtime = stat.st_mtime_ns
+        self.start_offset = 0
+        self._prefix_hasher = None
+        self.action = self._decide(incremental)
+
+    def _decide(self, incremental: bool) -> str:
+        """对比清单记录决定导入方式"""
+        entry = self.entry
+        if not incremental or not entry or not entry.get('data_offset'):
+            return self.FULL
+
+        # 大小和修改时间都没变，认为文件未变化
+        if entry['file_size'] == self.file_size and entry['file_mtime'] == self.file_mtime:
+            return self.SKIP
+
+        # 已导入部分的内容必须不变，否则说明文件被重新导出，需要全量导入
+        offset = entry['data_offset']
+        if self.file_size < offset:
+            return self.FULL
+        hasher = hash_file_range(self.file_path, offset)
+        if hasher.hexdigest() != entry['content_hash']:
+            return self.FULL
+
+        self.start_offset = offset
+        self._prefix_hasher = hasher
+        return self.TAIL
+
+    def parser(self) -> BarFileParser:
+        """按计划创建解析器"""
+        return BarFileParser(self.file_path, self.data_type, start_offset=self.start_offset)
+
+    def manifest_entry(self, parser: BarFileParser) -> Dict:
+        """解析完成后生成新的清单记录"""
+        end_offset = parser.end_offset
+        last_row = parser.last_row
+        if self._prefix_hasher is not None:
+            # 尾部导入：在已校验的前缀哈希上继续累加
+            hasher = hash_file_range(self.file_path, end_offset, self.start_offset,
+                                     self._prefix_hasher.copy())
+        else:
+            hasher = hash_file_range(self.file_path, end_offset)
+
+        previous = self.entry if self.action == self.TAIL else {}
+        if last_row is None:
+            last_bar_date = previous.get('last_bar_date')
+            last_bar_time = previous.get('last_bar_time')
+        else:
+            last_bar_date = last_row[2]
+            last_bar_time = last_row[3] if self.data_type != 'daily' else None
+
+        return {
+            'file_path': self.file_path,
+            'data_type': self.data_type,
+            'stock_code': parser.header['stock_code'] if parser.header else None,
+            'file_size': self.file_size,
+            'file_mtime': self.file_mtime,
+            'content_hash': hasher.hexdigest(),
+            'data_offset': end_offset,
+            'last_bar_date': last_bar_date,
+            'last_bar_time': last_bar_time,
+            'row_count': previous.get('row_count', 0) + parser.rows_parsed
+        }
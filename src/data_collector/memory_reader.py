@@ -1,13 +1,16 @@
 import ctypes
 from ctypes import wintypes
+from typing import Dict, List
 import win32process
 import win32api
 import win32con
+from .snapshot_decoder import FIRST_ROW_OFFSET, SnapshotDecoder
 
 class MemoryReader:
-    def __init__(self):
+    def __init__(self, decoder: SnapshotDecoder = None):
         self.process_handle = None
-        self.base_address = None
+        self.base_address = 0  # 行情列表地址 = 基址 + FIRST_ROW_OFFSET
+        self.decoder = decoder or SnapshotDecoder()
         
     def open_process(self, process_name="tdxw.exe"):
         # 获取进程ID
@@ -27,41 +30,31 @@ class MemoryReader:
             
     def read_memory(self, address, size):
         buffer = ctypes.create_string_buffer(size)
-        bytes_read = ctypes.c_ulong(0)
+        bytes_read = ctypes.c_size_t(0)
         
-        ctypes.windll.kernel32.ReadProcessMemory(
-            self.process_handle,
-            address,
+        ok = ctypes.windll.kernel32.ReadProcessMemory(
+            int(self.process_handle),
+            ctypes.c_void_p(address),
             buffer,
             size,
             ctypes.byref(bytes_read)
         )
+        if not ok:
+            raise OSError(f"读取内存失败: 地址 {address:#x}, 长度 {size}")
         
-        return buffer.raw
+        return buffer.raw[:bytes_read.value]
         
-    def get_stock_data(self, row_index=0):
-        # 基础地址偏移
-        base_offsets = {
-            'code': 0xF3B919,
-            'volume': 0xF3B940,
-            'high': 0xF3B92C,
-            'current': 0xF3B934,
-            'open': 0xF3B928,
-            'low': 0xF3B930,
-            'prev_close': 0xF3B924,
-            'current_volume': 0xF3B944,
-            'sell_price': 0xF3B984,
-            'buy_volume': 0xF3B970,
-            'sell_volume': 0xF3B998
-        }
+    def read_snapshot_block(self, row_count: int, first_row: int = 0) -> bytes:
+        """一次读取连续 row_count 行的原始内存（可保存为转储文件离线解码）"""
+        address = self.base_address + FIRST_ROW_OFFSET + first_row * self.decoder.row_size
+        return self.read_memory(address, self.decoder.block_size(row_count))
         
-        # 计算行偏移
-        row_offset = row_index * 0x144  # 假设每行偏移为0x144
+    def read_snapshot(self, row_count: int) -> List[Dict]:
+        """读取前 row_count 行行情，一次系统调用加一次解码"""
+        block = self.read_snapshot_block(row_count)
+        return self.decoder.to_dicts(self.decoder.decode(block, row_count))
         
-        stock_data = {}
-        for field, offset in base_offsets.items():
-            address = self.base_address + offset + row_offset
-            data = self.read_memory(address, 4)  # 假设每个字段为4字节
-            stock_data[field] = int.from_bytes(data, byteorder='little')
-            
-        return stock_data 
\ No newline at end of file
+    def get_stock_data(self, row_index=0) -> Dict:
+        """读取单行行情（字段布局见 snapshot_decoder.SNAPSHOT_FIELDS）"""
+        block = self.read_snapshot_block(1, row_index)
+        return self.decoder.to_dicts(self.decoder.decode(block, 1))[0]
\ No newline at end of file
@@ -0,0 +1,227 @@
+import json
+import time
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import logging
+
+import numpy as np
+
+from ..analysis.trading_session import SESSION_MINUTES, session_minute, session_minute_to_hhmm
+from ..database.bar_keys import pack_date
+from ..database.db_manager import DatabaseManager
+from .snapshot_decoder import SnapshotDecoder
+
+# 快照中每只股票一个字典，至少包含 code/current/open/high/low/prev_close/volume，
+# 回放源另外提供 name/amount/time
+Snapshot = List[Dict]
+
+class QuoteSource:
+    """实时行情源接口
+
+    open() 准备资源，read_snapshot() 返回当前全市场快照，没有更多数据时返回 None，
+    close() 释放资源。timestamp 为最近一次快照的行情时刻（Unix 时间戳）：实时源是读取时的
+    系统时间，回放源是被回放的历史时刻。采集器只依赖这个接口，不关心数据来自通达信内存还是回放。
+    """
+    timestamp: Optional[float] = None
+
+    def open(self):
+        pass
+
+    def read_snapshot(self) -> Optional[Snapshot]:
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class MemoryQuoteSource(QuoteSource):
+    """从运行中的通达信终端（tdxw.exe）内存读取行情，仅支持 Windows
+
+    一次读取 row_count 行（默认覆盖全市场），代码无效的行（列表末尾之后的内存）被丢弃。
+    """
+    def __init__(self, row_count: int = 6000, process_name: str = "tdxw.exe",
+                 base_address: Optional[int] = None, decoder: Optional[SnapshotDecoder] = None):
+        self.row_count = row_count
+        self.process_name = process_name
+        self.base_address = base_address
+        self.decoder = decoder
+        self.reader = None
+
+    def open(self):
+        # memory_reader 依赖 pywin32，只在真正使用时导入
+        from .memory_reader import MemoryReader
+        self.reader = MemoryReader(self.decoder)
+        self.reader.open_process(self.process_name)
+        if self.base_address is not None:
+            self.reader.base_address = self.base_address
+
+    def read_snapshot(self) -> Optional[Snapshot]:
+        self.timestamp = time.time()
+        return [row for row in self.reader.read_snapshot(self.row_count)
+                if len(row['code']) == 6 and row['code'].isdigit()]
+
+class ReplayQuoteSource(QuoteSource):
+    """按原始时间间隔回放快照序列，speed 为回放倍速
+
+    speed=1 按真实节奏回放，speed=1000 把一个交易日压缩到约15秒；
+    speed=None 不等待，用于测量下游的最大吞吐量。
+    """
+    MAX_SPEED = 1000
+
+    def __init__(self, frames: Iterable[Tuple[float, Snapshot]], speed: Optional[float] = 1.0):
+        if speed is not None and not 0 < speed <= self.MAX_SPEED:
+            raise ValueError(f"回放倍速应在 (0, {self.MAX_SPEED}] 之间: {speed}")
+        self.frames = frames
+        self.speed = speed
+        self.frames_played = 0
+        self._iterator: Optional[Iterator[Tuple[float, Snapshot]]] = None
+        self._first_ts = None
+        self._start = None
+
+    def open(self):
+        self._iterator = iter(self.frames)
+        self._first_ts = None
+        self.frames_played = 0
+        self.timestamp = None
+
+    def read_snapshot(self) -> Optional[Snapshot]:
+        if self._iterator is None:
+            self.open()
+        try:
+            ts, snapshot = next(self._iterator)
+        except StopIteration:
+            return None
+
+        if self._first_ts is None:
+            self._first_ts = ts
+            self._start = time.perf_counter()
+        elif self.speed is not None:
+            # 按回放起点计算目标时刻，等待误差不会累积
+            delay = self._start + (ts - self._first_ts) / self.speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+        self.frames_played += 1
+        self.timestamp = ts
+        return snapshot
+
+    @classmethod
+    def from_file(cls, path: str, speed: Optional[float] = 1.0) -> 'ReplayQuoteSource':
+        """回放 save_snapshots 录制的 JSON Lines 文件（每行 {"ts": 时间戳, "quotes": [...]}）"""
+        def frames():
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        record = json.loads(line)
+                        yield record['ts'], record['quotes']
+        return cls(frames(), speed)
+
+    @classmethod
+    def from_history(cls, db: DatabaseManager, trade_date: str, codes: Optional[Sequence[str]] = None,
+                     speed: Optional[float] = 1.0) -> 'ReplayQuoteSource':
+        """把某个交易日的1分钟K线还原为每分钟一次的全市场快照"""
+        return cls(HistoryFrames(db, trade_date, codes), speed)
+
+def save_snapshots(path: str, frames: Iterable[Tuple[float, Snapshot]]) -> int:
+    """把快照序列录制为 JSON Lines 文件，返回帧数"""
+    count = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        for ts, snapshot in frames:
+            f.write(json.dumps({'ts': ts, 'quotes': snapshot}, ensure_ascii=False) + '\n')
+            count += 1
+    return count
+
+class HistoryFrames:
+    """由1分钟K线生成的快照序列
+
+    每只股票的K线按交易分钟对齐到 (股票 × 240) 数组，累计成交量、日内最高最低用
+    NumPy 一次算好，回放时再逐分钟生成字典，全市场一天的数据不会同时展开成字典。
+    """
+    def __init__(self, db: DatabaseManager, trade_date: str, codes: Optional[Sequence[str]] = None):
+        self.db = db
+        self.trade_date = trade_date
+        self._load(codes)
+
+    def _load(self, codes: Optional[Sequence[str]]):
+        """加载当日1分钟K线和前收盘价"""
+        symbols = self.db.get_bar_symbols('1min')
+        if codes is not None:
+            symbols = {code: symbols.get(code, '') for code in codes}
+        day = pack_date(self.trade_date)
+        prev_start = int((date(day // 10000, day // 100 % 100, day % 100)
+                          - timedelta(days=30)).strftime('%Y%m%d'))
+
+        shape = (len(symbols), SESSION_MINUTES)
+        close = np.full(shape, np.nan)
+        open_ = np.full(shape, np.nan)
+        high = np.full(shape, np.nan)
+        low = np.full(shape, np.nan)
+        volume = np.zeros(shape, dtype=np.int64)
+        amount = np.zeros(shape)
+        prev_close = np.full(len(symbols), np.nan)
+        self.codes = []
+        self.names = []
+        row = 0
+        for code, name in symbols.items():
+            bars = self.db.get_bars(code, '1min', day, day)
+            if not len(bars['time']):
+                continue
+            minutes = session_minute(bars['time'] % 10000) - 1
+            close[row, minutes] = bars['close']
+            open_[row, minutes] = bars['open']
+            high[row, minutes] = bars['high']
+            low[row, minutes] = bars['low']
+            volume[row, minutes] = bars['volume']
+            amount[row, minutes] = bars['amount']
+            previous = self.db.get_bars(code, 'daily', prev_start, day - 1)
+            prev_close[row] = previous['close'][-1] if len(previous['close']) else bars['open'][0]
+            self.codes.append(code)
+            self.names.append(name)
+            row += 1
+
+        count = row
+        close, open_, high, low = close[:count], open_[:count], high[:count], low[:count]
+        # 没有成交的分钟沿用上一分钟的价格
+        filled = np.where(np.isnan(close), 0, np.arange(SESSION_MINUTES))
+        np.maximum.accumulate(filled, axis=1, out=filled)
+        rows = np.arange(count)[:, None]
+        self.current = close[rows, filled]
+        first = np.argmax(~np.isnan(open_), axis=1)
+        self.open = open_[np.arange(count), first]
+        self.high = np.fmax.accumulate(high, axis=1)
+        self.low = np.fmin.accumulate(low, axis=1)
+        self.volume = np.cumsum(volume[:count], axis=1)
+        self.amount = np.cumsum(amount[:count], axis=1)
+        self.minute_volume = volume[:count]
+        self.prev_close = prev_close[:count]
+        logging.info(f"回放数据加载完成: {self.trade_date}, {count} 只股票")
+
+    def __iter__(self) -> Iterator[Tuple[float, Snapshot]]:
+        day = datetime.strptime(self.trade_date, '%Y-%m-%d')
+        for minute in range(SESSION_MINUTES):
+            hhmm = int(session_minute_to_hhmm(minute + 1))
+            moment = day.replace(hour=hhmm // 100, minute=hhmm % 100)
+            # 快照取在这一分钟结束前，行情时间属于这根K线（如 09:30:59 属于 0931）
+            quote_time = (moment - timedelta(seconds=1)).strftime('%H:%M:%S')
+            current = self.current[:, minute]
+            snapshot = []
+            for i in np.flatnonzero(~np.isnan(current)):
+                snapshot.append({
+                    'code': self.codes[i],
+                    'name': self.names[i],
+                    'time': quote_time,
+                    'current': float(current[i]),
+                    'open': float(self.open[i]),
+                    'high': float(self.high[i, minute]),
+                    'low': float(self.low[i, minute]),
+                    'prev_close': float(self.prev_close[i]),
+                    'volume': int(self.volume[i, minute]),
+                    'amount': float(self.amount[i, minute]),
+                    'current_volume': int(self.minute_volume[i, minute])
+                })
+            yield moment.timestamp(), snapshot
@@ -1,12 +1,13 @@
 import os
 from typing import Dict, List, Tuple
 from src.database.db_manager import DatabaseManager
+from src.database.sector_index import rebuild_sector_index
 import logging
 
 class SectorLoader:
-    def __init__(self, data_path: str = "E:\\ztdatabase\\bankuaiDATA"):
+    def __init__(self, data_path: str = "E:\\ztdatabase\\bankuaiDATA", db: DatabaseManager = None):
         self.data_path = data_path
-        self.db = DatabaseManager()
+        self.db = db or DatabaseManager()
         self.sector_type_map = {
             "地区板块.txt": "region",
             "风格板块.txt": "style",
@@ -26,6 +27,9 @@ class SectorLoader:
                     logging.info(f"成功处理文件: {filename}")
                 except Exception as e:
                     logging.error(f"处理文件失败: {filename}, 错误: {str(e)}")
+        # 导入完成后重建内存中的板块索引
+        index = rebuild_sector_index(self.db)
+        logging.info(f"板块索引已更新: {index.sector_count} 个板块, {index.stock_count} 只股票")
     
     def _process_sector_file(self, file_path: str, sector_type: str):
         """处理单个板块文件"""
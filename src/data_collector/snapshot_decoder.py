@@ -0,0 +1,78 @@
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+# 通达信行情列表在内存中按行连续存放，每行 0x144 字节
+ROW_SIZE = 0x144
+
+# 第一行起始地址（即第一行 code 字段）相对进程基址的偏移
+FIRST_ROW_OFFSET = 0xF3B919
+
+# 行内字段布局：(字段名, 相对行首的偏移, 类型)
+# 类型使用 NumPy 类型字符串：'S6' 为6字节ASCII代码，'<f4' 为小端4字节浮点，'<u4' 为小端4字节无符号整数
+SNAPSHOT_FIELDS: Tuple[Tuple[str, int, str], ...] = (
+    ('code', 0x00, 'S6'),
+    ('prev_close', 0x0B, '<f4'),
+    ('open', 0x0F, '<f4'),
+    ('high', 0x13, '<f4'),
+    ('low', 0x17, '<f4'),
+    ('current', 0x1B, '<f4'),
+    ('volume', 0x27, '<u4'),
+    ('current_volume', 0x2B, '<u4'),
+    ('buy_volume', 0x57, '<u4'),
+    ('sell_price', 0x6B, '<f4'),
+    ('sell_volume', 0x7F, '<u4')
+)
+
+BufferLike = Union[bytes, bytearray, memoryview]
+
+class SnapshotDecoder:
+    """把连续的行情内存块一次性解码为 NumPy 结构化数组
+
+    字段布局由 (字段名, 偏移, 类型) 表声明，field_types 可以单独覆盖某些字段的类型
+    （例如把价格改为 '<u4' 整数）。解码只依赖字节数据，不依赖 Windows，
+    可以直接用于保存下来的内存转储。
+    """
+    def __init__(self, fields: Sequence[Tuple[str, int, str]] = SNAPSHOT_FIELDS,
+                 row_size: int = ROW_SIZE, field_types: Optional[Dict[str, str]] = None):
+        field_types = field_types or {}
+        self.fields = tuple((name, offset, field_types.get(name, dtype)) for name, offset, dtype in fields)
+        self.row_size = row_size
+        for name, offset, dtype in self.fields:
+            if offset < 0 or offset + np.dtype(dtype).itemsize > row_size:
+                raise ValueError(f"字段超出行范围: {name} 偏移 {offset:#x} 类型 {dtype}")
+        self.dtype = np.dtype({
+            'names': [name for name, _, _ in self.fields],
+            'formats': [dtype for _, _, dtype in self.fields],
+            'offsets': [offset for _, offset, _ in self.fields],
+            'itemsize': row_size
+        })
+        self._text_fields = [name for name, _, dtype in self.fields if np.dtype(dtype).kind == 'S']
+        self._float_fields = [name for name, _, dtype in self.fields if np.dtype(dtype).kind == 'f']
+
+    def block_size(self, rows: int) -> int:
+        """读取 rows 行需要的字节数"""
+        return rows * self.row_size
+
+    def decode(self, buffer: BufferLike, rows: Optional[int] = None) -> np.ndarray:
+        """解码内存块，返回结构化数组（直接引用 buffer，不复制）"""
+        available = memoryview(buffer).nbytes // self.row_size
+        rows = available if rows is None else min(rows, available)
+        return np.frombuffer(buffer, dtype=self.dtype, count=rows)
+
+    def to_columns(self, records: np.ndarray) -> Dict[str, np.ndarray]:
+        """结构化数组 -> 各字段的列数组，文本字段解码为字符串，浮点字段转为双精度"""
+        columns = {name: records[name] for name in self.dtype.names}
+        for name in self._text_fields:
+            columns[name] = np.char.decode(np.char.strip(records[name], b'\x00 '), 'ascii', 'replace')
+        # 单精度价格转为双精度并保留3位小数，避免 10.2 变成 10.199999809
+        for name in self._float_fields:
+            columns[name] = np.round(records[name].astype(np.float64), 3)
+        return columns
+
+    def to_dicts(self, records: np.ndarray) -> List[Dict]:
+        """结构化数组 -> 采集器使用的行情字典列表"""
+        columns = self.to_columns(records)
+        names = list(columns)
+        values = [columns[name].tolist() for name in names]
+        return [dict(zip(names, row)) for row in zip(*values)]
@@ -1,61 +1,155 @@
-from datetime import datetime
-from .memory_reader import MemoryReader
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+import logging
+from .quote_source import MemoryQuoteSource, QuoteSource, Snapshot
+from .bar_aggregator import BarAggregator, get_bar_aggregator
+from ..analysis.alerts import AlertEngine, get_alert_engine
+from ..analysis.limit_up import LimitUpEngine
+from ..analysis.sector_board import SectorAggregator, get_sector_aggregator
 from ..database.db_manager import DatabaseManager
+from ..database.realtime_persister import RealtimePersister
+from ..database.realtime_store import RealtimeStore, get_realtime_store
+
+class ChangeDetector:
+    """记住每只股票上一次的价格和成交量，只放行发生变化的行"""
+    def __init__(self, fields=('current', 'volume')):
+        self.fields = fields
+        self._last: Dict[str, tuple] = {}
+
+    def filter(self, snapshot: Snapshot) -> Snapshot:
+        """返回与上一次快照相比有变化（或新出现）的行"""
+        changed = []
+        last = self._last
+        fields = self.fields
+        for row in snapshot:
+            key = tuple(row[field] for field in fields)
+            code = row['code']
+            if last.get(code) != key:
+                last[code] = key
+                changed.append(row)
+        return changed
+
+    def reset(self):
+        self._last.clear()
 
 class StockCollector:
-    def __init__(self):
-        self.memory_reader = MemoryReader()
-        self.db = DatabaseManager()
+    def __init__(self, source: QuoteSource = None, db: DatabaseManager = None,
+                 interval: float = 1.0, sinks: Optional[List[Callable[[Snapshot, float], None]]] = None,
+                 store: RealtimeStore = None, persister: RealtimePersister = None,
+                 limit_up: LimitUpEngine = None, bars: BarAggregator = None,
+                 sectors: SectorAggregator = None, alerts: AlertEngine = None):
+        """source 默认读取通达信内存中的全市场行情，也可以传入回放源
         
+        interval 为采集周期（秒），为 0 时不等待，由行情源自身控制节奏（如回放源）。
+        sinks 接收每个周期中发生变化的行，默认更新进程内实时行情表，并交给后写队列
+        批量写入数据库（采集周期不等待磁盘），同时更新板块榜单、检查预警、跟踪涨停并实时合成分钟K线。
+        接收者以 (变化行, 快照时刻) 调用，回放时快照时刻是历史时间而不是系统时间。
+        """
+        self.source = source or MemoryQuoteSource()
+        self.db = db or DatabaseManager()
+        self.store = store if store is not None else get_realtime_store()
+        self.persister = persister or RealtimePersister(self.db)
+        self.limit_up = limit_up or LimitUpEngine(self.db)
+        self.bars = bars or get_bar_aggregator(self.db)
+        # 使用共享实时行情表时板块统计和预警也共享，供 API 读取
+        self.sectors = sectors or (get_sector_aggregator(self.db) if store is None
+                                   else SectorAggregator(self.db, self.store))
+        self.alerts = alerts or (get_alert_engine() if store is None else AlertEngine(self.store))
+        self.interval = interval
+        self.sinks = (list(sinks) if sinks is not None
+                      else [self.store.update, self.sectors.update, self.alerts.evaluate,
+                            self.persister.submit, self.limit_up.process, self.bars.update])
+        self.detector = ChangeDetector()
+        self._stop_event = threading.Event()
+        self.stats = {
+            'ticks': 0,
+            'overruns': 0,
+            'skipped_ticks': 0,
+            'rows_read': 0,
+            'rows_changed': 0,
+            'last_duration': 0.0,
+            'max_duration': 0.0
+        }
+    
+    def add_sink(self, sink: Callable[[Snapshot, float], None]):
+        """添加变化行的接收者"""
+        self.sinks.append(sink)
+    
+    def stop(self):
+        """停止采集循环（当前周期结束后退出）"""
+        self._stop_event.set()
+    
     def start_collecting(self):
+        """按固定节奏循环采集，直到调用 stop() 或行情源没有更多数据
+
+        下一次采集的时刻按 起点 + n × 周期 计算，处理耗时不会累积成漂移；
+        某个周期处理超时后，已经错过的时刻直接跳过并计入 overruns/skipped_ticks。
+        """
+        self._stop_event.clear()
         try:
-            self.memory_reader.open_process()
-            
-            with self.db.get_connection() as conn:
-                cursor = conn.cursor()
-                
-                # 收集前80行数据
-                for row in range(80):
-                    stock_data = self.memory_reader.get_stock_data(row)
-                    self._save_to_database(cursor, stock_data)
-                    
-                conn.commit()
-                    
+            self.source.open()
         except Exception as e:
-            print(f"数据收集错误: {str(e)}")
-            
-    def _save_to_database(self, cursor, stock_data):
-        # 计算涨跌幅等数据
-        change_amount = stock_data['current'] - stock_data['prev_close']
-        change_percent = (change_amount / stock_data['prev_close']) * 100
+            logging.error(f"打开行情源失败: {str(e)}")
+            return
         
-        # 更新实时数据
-        stock_data['change_percent'] = change_percent
-        stock_data['change_amount'] = change_amount
-        self.db.update_stock_realtime(stock_data)
-        
-        # 检查是否涨停
-        if change_percent >= 9.9:  # 可以根据不同市场调整涨停判断标准
-            self.db.update_limit_up(
-                stock_data['code'],
-                stock_data.get('name', ''),
-                change_percent
-            )
+        if self.persister.submit in self.sinks:
+            self.persister.start()
+        next_tick = time.perf_counter()
+        try:
+            while not self._stop_event.is_set():
+                started = time.perf_counter()
+                if not self.collect_once():
+                    logging.info("行情源没有更多数据，采集结束")
+                    break
+                duration = time.perf_counter() - started
+                self.stats['last_duration'] = duration
+                self.stats['max_duration'] = max(self.stats['max_duration'], duration)
+                
+                if not self.interval:
+                    continue
+                next_tick += self.interval
+                now = time.perf_counter()
+                if now > next_tick:
+                    missed = int((now - next_tick) // self.interval) + 1
+                    self.stats['overruns'] += 1
+                    self.stats['skipped_ticks'] += missed - 1
+                    next_tick += (missed - 1) * self.interval
+                    logging.warning(f"采集周期超时: 耗时 {duration:.3f} 秒, 跳过 {missed - 1} 个周期")
+                    if missed > 1:
+                        continue
+                self._stop_event.wait(max(next_tick - time.perf_counter(), 0))
+        finally:
+            self.source.close()
+            self.persister.stop()
+            if self.bars.update in self.sinks:
+                self.bars.finish()
+    
+    def collect_once(self) -> bool:
+        """采集一次快照并把变化的行交给各接收者，行情源结束时返回 False"""
+        try:
+            snapshot = self.source.read_snapshot()
+        except Exception as e:
+            logging.error(f"数据收集错误: {str(e)}")
+            return True
+        if snapshot is None:
+            return False
         
-        cursor.execute('''
-        INSERT INTO stock_realtime (
-            stock_code, current_price, open_price, high_price, 
-            low_price, volume, prev_close, change_percent, 
-            change_amount
-        ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (
-            stock_data['code'],
-            stock_data['current'],
-            stock_data['open'],
-            stock_data['high'],
-            stock_data['low'],
-            stock_data['volume'],
-            stock_data['prev_close'],
-            change_percent,
-            change_amount
-        )) 
\ No newline at end of file
+        timestamp = self.source.timestamp
+        if timestamp is None:
+            timestamp = time.time()
+        changed = self.detector.filter(snapshot)
+        self.stats['ticks'] += 1
+        self.stats['rows_read'] += len(snapshot)
+        self.stats['rows_changed'] += len(changed)
+        if changed:
+            for sink in self.sinks:
+                try:
+                    sink(changed, timestamp)
+                except Exception as e:
+                    logging.error(f"行情处理失败: {getattr(sink, '__name__', sink)}: {str(e)}")
+        return True
+    
+    def get_stats(self) -> Dict:
+        """采集统计，含写入队列深度"""
+        return {**self.stats, 'persist_queue_depth': self.persister.queue_depth()}
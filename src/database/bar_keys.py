@@ -0,0 +1,58 @@
+from typing import Dict, Optional, Union
+
+# 整数打包格式：日期 YYYYMMDD，时间 HHMM，K线时间 YYYYMMDDHHMM（日线 HHMM 为 0）
+
+_date_cache: Dict[str, int] = {}
+_time_cache: Dict[str, int] = {}
+
+def pack_date(trade_date: str) -> int:
+    """'2024-02-13' -> 20240213，结果缓存"""
+    value = _date_cache.get(trade_date)
+    if value is None:
+        value = int(str(trade_date)[:10].replace('-', '').replace('/', ''))
+        _date_cache[trade_date] = value
+    return value
+
+def pack_time(trade_time: Optional[str]) -> int:
+    """'09:31:00' -> 931，空值为 0，结果缓存"""
+    if not trade_time:
+        return 0
+    value = _time_cache.get(trade_time)
+    if value is None:
+        parts = str(trade_time).split(':')
+        value = int(parts[0]) * 100 + int(parts[1])
+        _time_cache[trade_time] = value
+    return value
+
+def pack_bar_time(trade_date: str, trade_time: Optional[str] = None) -> int:
+    """日期和时间 -> YYYYMMDDHHMM"""
+    return pack_date(trade_date) * 10000 + pack_time(trade_time)
+
+def unpack_date(value: int) -> str:
+    """20240213 -> '2024-02-13'"""
+    value = int(value)
+    return f"{value // 10000:04d}-{value // 100 % 100:02d}-{value % 100:02d}"
+
+def unpack_time(value: int) -> str:
+    """931 -> '09:31:00'"""
+    value = int(value)
+    return f"{value // 100:02d}:{value % 100:02d}:00"
+
+def to_bar_time(value: Union[int, str, None], end: bool = False) -> Optional[int]:
+    """把查询边界转换为 YYYYMMDDHHMM
+
+    支持整数、'2024-02-13'、'2024-02-13 09:31' 等格式；只给日期时，
+    作为结束边界会扩展到当天最后一分钟。
+    """
+    if value is None:
+        return None
+    if isinstance(value, int):
+        # 8位整数视为日期
+        if value < 100000000:
+            return value * 10000 + (9999 if end else 0)
+        return value
+    text = str(value).strip()
+    if ' ' in text or 'T' in text:
+        date_part, time_part = text.replace('T', ' ').split(' ', 1)
+        return pack_bar_time(date_part, time_part)
+    return pack_date(text) * 10000 + (9999 if end else 0)
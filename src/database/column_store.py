@@ -0,0 +1,161 @@
+import os
+import threading
+from typing import Dict, Iterable, Optional, Tuple, Union
+import logging
+
+import numpy as np
+
+from .bar_keys import pack_bar_time, to_bar_time
+
+# 每个字段一个定长二进制文件，time 为 YYYYMMDDHHMM 打包整数
+BAR_FIELDS = {
+    'time': np.dtype('<i8'),
+    'open': np.dtype('<f8'),
+    'high': np.dtype('<f8'),
+    'low': np.dtype('<f8'),
+    'close': np.dtype('<f8'),
+    'volume': np.dtype('<i8'),
+    'amount': np.dtype('<f8')
+}
+
+FREQUENCIES = ('daily', '5min', '1min')
+
+class ColumnarBarStore:
+    """内存映射的列式K线存储
+
+    目录结构为 root/频率/股票代码/字段.bin，每个文件是按时间升序排列的定长数组。
+    查询通过 np.memmap 映射文件并用二分查找定位区间，返回的是映射内存上的切片，不做复制。
+    """
+    def __init__(self, root: str):
+        self.root = root
+        self._maps: Dict[Tuple[str, str], Tuple[int, Dict[str, np.memmap]]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _symbol_dir(self, code: str, freq: str) -> str:
+        """股票代码对应的目录"""
+        if freq not in FREQUENCIES:
+            raise ValueError(f"不支持的K线频率: {freq}")
+        return os.path.join(self.root, freq, code)
+
+    def _row_count(self, directory: str) -> int:
+        """各字段文件的公共行数（写入中断时以最短的文件为准）"""
+        counts = []
+        for field, dtype in BAR_FIELDS.items():
+            path = os.path.join(directory, f"{field}.bin")
+            counts.append(os.path.getsize(path) // dtype.itemsize if os.path.exists(path) else 0)
+        return min(counts)
+
+    def _open(self, code: str, freq: str) -> Dict[str, np.ndarray]:
+        """映射股票的全部字段文件，文件长度变化时重新映射"""
+        directory = self._symbol_dir(code, freq)
+        count = self._row_count(directory)
+        key = (freq, code)
+        cached = self._maps.get(key)
+        if cached is not None and cached[0] == count:
+            return cached[1]
+
+        if count == 0:
+            arrays = {field: np.empty(0, dtype) for field, dtype in BAR_FIELDS.items()}
+        else:
+            arrays = {
+                field: np.memmap(os.path.join(directory, f"{field}.bin"), dtype=dtype,
+                                 mode='r', shape=(count,))
+                for field, dtype in BAR_FIELDS.items()
+            }
+        self._maps[key] = (count, arrays)
+        return arrays
+
+    def get_bars(self, code: str, freq: str, start: Union[int, str, None] = None,
+                 end: Union[int, str, None] = None) -> Dict[str, np.ndarray]:
+        """查询 [start, end] 区间的K线，返回各字段的零拷贝视图"""
+        arrays = self._open(code, freq)
+        times = arrays['time']
+        lo = 0 if start is None else int(np.searchsorted(times, to_bar_time(start), 'left'))
+        hi = len(times) if end is None else int(np.searchsorted(times, to_bar_time(end, end=True), 'right'))
+        return {field: array[lo:hi] for field, array in arrays.items()}
+
+    def last_time(self, code: str, freq: str) -> Optional[int]:
+        """最后一根K线的时间"""
+        times = self._open(code, freq)['time']
+        return int(times[-1]) if len(times) else None
+
+    def symbols(self, freq: str) -> list:
+        """已存储的股票代码"""
+        directory = os.path.join(self.root, freq)
+        return sorted(os.listdir(directory)) if os.path.isdir(directory) else []
+
+    def append(self, code: str, freq: str, columns: Dict[str, np.ndarray]):
+        """追加一只股票的K线
+
+        时间都晚于已有数据时直接追加到文件末尾；否则合并排序后重写，
+        相同时间的K线以新数据为准。
+        """
+        new = {field: np.ascontiguousarray(columns[field], dtype=dtype)
+               for field, dtype in BAR_FIELDS.items()}
+        if not len(new['time']):
+            return
+        if np.any(np.diff(new['time']) <= 0):
+            order = np.argsort(new['time'], kind='stable')
+            new = {field: array[order] for field, array in new.items()}
+            new = self._dedupe(new)
+
+        directory = self._symbol_dir(code, freq)
+        with self._lock:
+            os.makedirs(directory, exist_ok=True)
+            count = self._row_count(directory)
+            existing = self._open(code, freq) if count else None
+
+            if existing is None or new['time'][0] > existing['time'][-1]:
+                for field, array in new.items():
+                    path = os.path.join(directory, f"{field}.bin")
+                    with open(path, 'r+b' if os.path.exists(path) else 'wb') as f:
+                        # 截掉上次中断写入留下的多余数据
+                        f.truncate(count * array.itemsize)
+                        f.seek(0, os.SEEK_END)
+                        f.write(array.tobytes())
+            else:
+                merged = {field: np.concatenate([np.array(existing[field]), new[field]])
+                          for field in BAR_FIELDS}
+                order = np.argsort(merged['time'], kind='stable')
+                merged = self._dedupe({field: array[order] for field, array in merged.items()})
+                # 释放旧映射后再替换文件（Windows 下被映射的文件无法替换）
+                self._maps.pop((freq, code), None)
+                del existing
+                for field, array in merged.items():
+                    path = os.path.join(directory, f"{field}.bin")
+                    tmp_path = path + '.tmp'
+                    array.tofile(tmp_path)
+                    os.replace(tmp_path, path)
+
+    def _dedupe(self, columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """按时间去重（已排序），保留同一时间的最后一条"""
+        times = columns['time']
+        keep = np.ones(len(times), dtype=bool)
+        keep[:-1] = times[1:] != times[:-1]
+        if keep.all():
+            return columns
+        return {field: array[keep] for field, array in columns.items()}
+
+    def append_rows(self, freq: str, rows: Iterable[Tuple]):
+        """追加解析器输出的K线元组（可包含多只股票）"""
+        grouped: Dict[str, list] = {}
+        time_index = 3 if freq != 'daily' else None
+        for row in rows:
+            grouped.setdefault(row[0], []).append(row)
+
+        for code, code_rows in grouped.items():
+            values = list(zip(*code_rows))
+            price_start = 3 if time_index is None else 4
+            times = [pack_bar_time(d, t) for d, t in
+                     zip(values[2], values[time_index] if time_index else [None] * len(code_rows))]
+            self.append(code, freq, {
+                'time': times,
+                'open': values[price_start],
+                'high': values[price_start + 1],
+                'low': values[price_start + 2],
+                'close': values[price_start + 3],
+                'volume': values[price_start + 4],
+                'amount': values[price_start + 5]
+            })
+        logging.debug(f"列式存储追加{freq}数据: {len(grouped)} 只股票")
@@ -0,0 +1,152 @@
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict
+import logging
+
+# 默认连接参数，可在创建第一个 DatabaseManager 之前修改
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',     # 读写互不阻塞
+    'synchronous': 'NORMAL',   # WAL 模式下 NORMAL 已足够安全
+    'cache_size': -64000,      # 每个连接约64MB页缓存（负数单位为KB）
+    'mmap_size': 268435456,    # 256MB 内存映射读
+    'busy_timeout': 5000,      # 毫秒，跨进程写冲突时的等待时间
+    'temp_store': 'MEMORY'
+}
+
+class ConnectionPool:
+    """SQLite 连接池
+
+    每个线程持有一个长连接用于读取（WAL 模式下不会被写入阻塞），
+    所有写操作共用一个写连接，并由锁串行化。同一数据库文件在进程内共享一个连接池。
+    """
+    _pools: Dict[str, 'ConnectionPool'] = {}
+    _pools_lock = threading.Lock()
+
+    @classmethod
+    def for_path(cls, db_path: str, **pragmas) -> 'ConnectionPool':
+        """获取（或创建）指定数据库文件的连接池"""
+        with cls._pools_lock:
+            pool = cls._pools.get(db_path)
+            if pool is None:
+                pool = cls(db_path, **pragmas)
+                cls._pools[db_path] = pool
+            return pool
+
+    @classmethod
+    def close_all_pools(cls):
+        """关闭进程内所有连接池"""
+        with cls._pools_lock:
+            for pool in cls._pools.values():
+                pool.close()
+            cls._pools.clear()
+
+    def __init__(self, db_path: str, **pragmas):
+        self.db_path = db_path
+        self.pragmas = {**DEFAULT_PRAGMAS, **pragmas}
+        self._readers: Dict[int, tuple] = {}  # 线程ID -> (线程对象, 连接)
+        self._readers_lock = threading.Lock()
+        self._writer = None
+        self._write_lock = threading.RLock()
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'connections_opened': 0,
+            'connections_closed': 0,
+            'read_checkouts': 0,
+            'write_checkouts': 0,
+            'write_wait_total': 0.0,
+            'write_wait_max': 0.0,
+            'write_hold_total': 0.0,
+            'write_hold_max': 0.0
+        }
+
+    def _connect(self, read_only: bool) -> sqlite3.Connection:
+        """创建连接并设置 PRAGMA"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False,
+                               timeout=self.pragmas['busy_timeout'] / 1000)
+        cursor = conn.cursor()
+        for name in ('journal_mode', 'synchronous', 'cache_size', 'mmap_size',
+                     'busy_timeout', 'temp_store'):
+            cursor.execute(f"PRAGMA {name}={self.pragmas[name]}")
+        if read_only:
+            cursor.execute('PRAGMA query_only=ON')
+        with self._stats_lock:
+            self._stats['connections_opened'] += 1
+        return conn
+
+    def _close_connection(self, conn: sqlite3.Connection):
+        """关闭连接并计数"""
+        try:
+            conn.close()
+        finally:
+            with self._stats_lock:
+                self._stats['connections_closed'] += 1
+
+    @contextmanager
+    def read(self):
+        """获取当前线程的读连接"""
+        thread = threading.current_thread()
+        entry = self._readers.get(thread.ident)
+        if entry is None or entry[0] is not thread:
+            entry = (thread, self._connect(read_only=True))
+            with self._readers_lock:
+                self._prune_readers()
+                self._readers[thread.ident] = entry
+        with self._stats_lock:
+            self._stats['read_checkouts'] += 1
+        yield entry[1]
+
+    def _prune_readers(self):
+        """关闭已退出线程留下的读连接（调用方持有 _readers_lock）"""
+        for ident, (thread, conn) in list(self._readers.items()):
+            if not thread.is_alive():
+                del self._readers[ident]
+                self._close_connection(conn)
+
+    @contextmanager
+    def write(self):
+        """获取串行化的写连接，退出时回滚未提交的事务"""
+        wait_start = time.perf_counter()
+        with self._write_lock:
+            hold_start = time.perf_counter()
+            if self._writer is None:
+                self._writer = self._connect(read_only=False)
+            try:
+                yield self._writer
+            finally:
+                if self._writer.in_transaction:
+                    self._writer.rollback()
+                hold_end = time.perf_counter()
+                with self._stats_lock:
+                    wait = hold_start - wait_start
+                    hold = hold_end - hold_start
+                    self._stats['write_checkouts'] += 1
+                    self._stats['write_wait_total'] += wait
+                    self._stats['write_wait_max'] = max(self._stats['write_wait_max'], wait)
+                    self._stats['write_hold_total'] += hold
+                    self._stats['write_hold_max'] = max(self._stats['write_hold_max'], hold)
+
+    def stats(self) -> Dict:
+        """返回连接池统计信息"""
+        with self._stats_lock:
+            stats = dict(self._stats)
+        with self._readers_lock:
+            stats['active_readers'] = len(self._readers)
+        stats['writer_open'] = self._writer is not None
+        checkouts = stats['write_checkouts'] or 1
+        stats['write_wait_avg'] = stats['write_wait_total'] / checkouts
+        stats['write_hold_avg'] = stats['write_hold_total'] / checkouts
+        return stats
+
+    def close(self):
+        """关闭所有连接"""
+        with self._write_lock:
+            if self._writer is not None:
+                self._close_connection(self._writer)
+                self._writer = None
+        with self._readers_lock:
+            for _, conn in self._readers.values():
+                self._close_connection(conn)
+            self._readers.clear()
+        logging.info(f"连接池已关闭: {self.db_path}")
@@ -1,27 +1,119 @@
 import os
-import sqlite3
+import weakref
 from contextlib import contextmanager
-from typing import Dict, List
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, Union
 import logging
+import numpy as np
+from .bar_keys import pack_bar_time, pack_date, pack_time, to_bar_time, unpack_date, unpack_time
+from .column_store import BAR_FIELDS, ColumnarBarStore
+from .connection_pool import ConnectionPool
+from .models import COMPACT_SCHEMA_VERSION
+
+# 历史K线数据类型与表名的对应关系
+BAR_TABLES = {
+    'daily': 'stock_daily',
+    '5min': 'stock_5min',
+    '1min': 'stock_1min'
+}
+
+# K线表的列顺序（日线没有 trade_time）
+BAR_COLUMNS = {
+    'daily': ('stock_code', 'stock_name', 'trade_date',
+              'open_price', 'high_price', 'low_price',
+              'close_price', 'volume', 'amount'),
+    '5min': ('stock_code', 'stock_name', 'trade_date', 'trade_time',
+             'open_price', 'high_price', 'low_price',
+             'close_price', 'volume', 'amount'),
+    '1min': ('stock_code', 'stock_name', 'trade_date', 'trade_time',
+             'open_price', 'high_price', 'low_price',
+             'close_price', 'volume', 'amount')
+}
+
+# 单条K线：字典，或按 BAR_COLUMNS 顺序排列的元组
+BarRecord = Union[Dict, Tuple]
+
+def bar_params(data_type: str, data_list: Iterable[BarRecord]) -> Iterable[Tuple]:
+    """把K线数据统一为按列顺序的元组，元组块和迭代器直接透传"""
+    columns = BAR_COLUMNS[data_type]
+    if isinstance(data_list, (list, tuple)):
+        if not data_list or not isinstance(data_list[0], dict):
+            return data_list
+        return [tuple(item[c] for c in columns) for item in data_list]
+    return (tuple(item[c] for c in columns) if isinstance(item, dict) else item
+            for item in data_list)
+
+# 导入清单表的列顺序
+MANIFEST_COLUMNS = ('file_path', 'data_type', 'stock_code', 'file_size', 'file_mtime',
+                    'content_hash', 'data_offset', 'last_bar_date', 'last_bar_time', 'row_count')
+
+# 紧凑结构下K线表名和整数主键列
+COMPACT_BAR_TABLES = {
+    'daily': ('bar_daily', 'trade_date'),
+    '5min': ('bar_5min', 'bar_time'),
+    '1min': ('bar_1min', 'bar_time')
+}
+
+def compact_insert_sql(data_type: str) -> str:
+    """生成紧凑K线表的批量插入语句"""
+    return f"INSERT OR REPLACE INTO {COMPACT_BAR_TABLES[data_type][0]} VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+
+# 指标缓存中直接由K线表计算的频率，其余频率（如 15min、周线）由重采样得到
+STORED_FREQS = tuple(BAR_TABLES)
+
+# 由日线聚合的频率，其余非存储频率由1分钟K线聚合
+DAILY_DERIVED_FREQS = ('weekly', 'monthly')
+
+def source_freq(freq: str) -> str:
+    """频率对应的源K线表：存储频率是自身，周线和月线是日线，其余为1分钟K线"""
+    if freq in STORED_FREQS:
+        return freq
+    return 'daily' if freq in DAILY_DERIVED_FREQS else '1min'
+
+def bar_insert_sql(data_type: str) -> str:
+    """生成K线表的批量插入语句"""
+    columns = BAR_COLUMNS[data_type]
+    return (f"INSERT OR REPLACE INTO {BAR_TABLES[data_type]} ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})")
 
 class DatabaseManager:
-    def __init__(self, db_name: str = "stock_analysis.db"):
-        """初始化数据库管理器"""
+    # K线写入监听器，按数据库路径登记，同一进程内所有实例共享
+    _bar_listeners: Dict[str, List[Callable]] = {}
+
+    def __init__(self, db_name: str = "stock_analysis.db", column_store_path: Optional[str] = None,
+                 **pool_pragmas):
+        """初始化数据库管理器，同一数据库文件的所有实例共享一个连接池
+
+        指定 column_store_path 时，K线写入会同步到列式存储，get_bars 默认从列式存储读取。
+        """
         self.db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), db_name)
+        self.pool = ConnectionPool.for_path(self.db_path, **pool_pragmas)
+        self.column_store = ColumnarBarStore(column_store_path) if column_store_path else None
+        self._compact_schema = False
+        self._symbol_ids: Dict[str, int] = {}
+        self._pending_symbol_ids: Dict[str, int] = {}
         logging.info(f"数据库路径: {self.db_path}")
         
     @contextmanager
     def get_connection(self):
-        """获取数据库连接的上下文管理器"""
-        conn = sqlite3.connect(self.db_path)
-        try:
+        """获取数据库连接的上下文管理器（写连接，兼容旧代码）"""
+        with self.pool.write() as conn:
             yield conn
-        finally:
-            conn.close()
+    
+    def read_connection(self):
+        """获取当前线程的读连接，不会被写入阻塞"""
+        return self.pool.read()
+    
+    def write_connection(self):
+        """获取串行化的写连接"""
+        return self.pool.write()
+    
+    def get_pool_stats(self) -> Dict:
+        """获取连接池统计信息"""
+        return self.pool.stats()
     
     def get_sectors_by_type(self, sector_type: str) -> List[Dict]:
         """获取指定类型的所有板块"""
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
             SELECT sector_code, sector_name, stock_count
@@ -33,7 +125,7 @@ class DatabaseManager:
     
     def get_sector_stocks(self, sector_code: str) -> List[Dict]:
         """获取板块下的所有股票"""
-        with self.get_connection() as conn:
+        with self.read_connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
             SELECT stock_code, stock_name, weight, is_leader
@@ -45,7 +137,7 @@ class DatabaseManager:
     
     def save_sector_info(self, sector_data: Dict):
         """保存板块数据"""
-        with self.get_connection() as conn:
+        with self.write_connection() as conn:
             cursor = conn.cursor()
             try:
                 # 开始事务
@@ -112,106 +204,452 @@ class DatabaseManager:
                 logging.error(f"错误信息: {str(e)}")
                 raise
 
-    def save_daily_data(self, data_list: List[Dict]):
+    def save_daily_data(self, data_list: Iterable[BarRecord]):
         """保存日线数据"""
-        with self.get_connection() as conn:
+        self._save_bar_data('daily', data_list, '日线')
+
+    def save_5min_data(self, data_list: Iterable[BarRecord]):
+        """保存5分钟数据"""
+        self._save_bar_data('5min', data_list, '5分钟')
+
+    def save_1min_data(self, data_list: Iterable[BarRecord]):
+        """保存1分钟数据"""
+        self._save_bar_data('1min', data_list, '1分钟')
+
+    def _save_bar_data(self, data_type: str, data_list: Iterable[BarRecord], label: str):
+        """以单个事务保存K线数据，支持字典列表、元组块或行迭代器"""
+        with self.write_connection() as conn:
             cursor = conn.cursor()
             try:
-                # 开始事务
                 cursor.execute('BEGIN TRANSACTION')
                 
-                # 批量插入数据
-                cursor.executemany('''
-                INSERT OR REPLACE INTO stock_daily (
-                    stock_code, stock_name, trade_date,
-                    open_price, high_price, low_price,
-                    close_price, volume, amount
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', [(
-                    item['stock_code'],
-                    item['stock_name'],
-                    item['trade_date'],
-                    item['open_price'],
-                    item['high_price'],
-                    item['low_price'],
-                    item['close_price'],
-                    item['volume'],
-                    item['amount']
-                ) for item in data_list])
+                rows, codes = self._write_bars(cursor, data_type, data_list)
+                count = cursor.rowcount
                 
-                # 提交事务
                 conn.commit()
-                logging.info(f"成功保存日线数据，数量: {len(data_list)}")
+                self._bars_committed(data_type, rows, codes)
+                logging.info(f"成功保存{label}数据，数量: {count}")
                 
             except Exception as e:
                 conn.rollback()
-                logging.error(f"保存日线数据失败: {str(e)}")
+                self._pending_symbol_ids.clear()
+                logging.error(f"保存{label}数据失败: {str(e)}")
                 raise
 
-    def save_5min_data(self, data_list: List[Dict]):
-        """保存5分钟数据"""
-        with self.get_connection() as conn:
+    def is_compact_schema(self) -> bool:
+        """K线表是否已迁移到紧凑结构（见 models.migrate_to_compact_schema）"""
+        if not self._compact_schema:
+            with self.read_connection() as conn:
+                version = conn.execute('PRAGMA user_version').fetchone()[0]
+            self._compact_schema = version >= COMPACT_SCHEMA_VERSION
+        return self._compact_schema
+
+    def _write_bars(self, cursor, data_type: str,
+                    data_list: Iterable[BarRecord]) -> Tuple[Optional[Sequence[Tuple]], Set[str]]:
+        """在当前事务中写入K线并删除相关股票的指标缓存
+
+        返回提交后需要同步到列式存储的行，以及本次写入涉及的股票代码。
+        """
+        params = bar_params(data_type, data_list)
+        compact = self.is_compact_schema()
+        if (compact or self.column_store is not None) and not isinstance(params, (list, tuple)):
+            params = list(params)
+        codes: Set[str] = set()
+        if compact:
+            codes.update(row[0] for row in params)
+            cursor.executemany(compact_insert_sql(data_type),
+                               self._compact_bar_params(cursor, data_type, params))
+        else:
+            cursor.executemany(bar_insert_sql(data_type), self._track_codes(params, codes))
+        self._invalidate_indicator_cache(cursor.connection, data_type, codes)
+        return (params if self.column_store is not None else None), codes
+
+    def _track_codes(self, rows: Iterable[Tuple], codes: Set[str]) -> Iterator[Tuple]:
+        """逐行透传并记录股票代码，不需要把迭代器展开成列表"""
+        for row in rows:
+            codes.add(row[0])
+            yield row
+
+    def _invalidate_indicator_cache(self, conn, data_type: str, codes: Set[str]):
+        """删除受本次写入影响的指标缓存（还包括以该K线表为源的重采样频率，见 source_freq）
+
+        使用单独的游标执行，调用方游标上的 rowcount 保持为K线写入行数。
+        """
+        if not codes:
+            return
+        if data_type == '1min':
+            others = tuple(freq for freq in STORED_FREQS if freq != '1min') + DAILY_DERIVED_FREQS
+            conn.executemany(f'''
+            DELETE FROM indicator_cache
+            WHERE stock_code = ? AND freq NOT IN ({', '.join('?' * len(others))})
+            ''', [(code,) + others for code in codes])
+        else:
+            freqs = (data_type,) + (DAILY_DERIVED_FREQS if data_type == 'daily' else ())
+            conn.executemany(f'''
+            DELETE FROM indicator_cache
+            WHERE stock_code = ? AND freq IN ({', '.join('?' * len(freqs))})
+            ''', [(code,) + freqs for code in codes])
+
+    def _compact_bar_params(self, cursor, data_type: str, rows: Sequence[Tuple]) -> Iterator[Tuple]:
+        """把K线元组转换为紧凑表的 (股票ID, 整数时间, 价格...) 格式"""
+        names = {row[0]: row[1] for row in rows}
+        symbol_ids = self._resolve_symbols(cursor, names)
+        if data_type == 'daily':
+            return ((symbol_ids[row[0]], pack_date(row[2])) + tuple(row[3:]) for row in rows)
+        return ((symbol_ids[row[0]], pack_date(row[2]) * 10000 + pack_time(row[3])) + tuple(row[4:])
+                for row in rows)
+
+    def _resolve_symbols(self, cursor, names: Dict[str, str]) -> Dict[str, int]:
+        """查找（必要时新建）股票ID
+
+        新建的ID在事务提交后才进入缓存，避免回滚后缓存中留下不存在的ID。
+        """
+        symbol_ids = {code: self._symbol_ids[code] for code in names if code in self._symbol_ids}
+        missing = [code for code in names if code not in symbol_ids]
+        if missing:
+            cursor.executemany('''
+            INSERT OR IGNORE INTO stock_symbol (stock_code, stock_name) VALUES (?, ?)
+            ''', [(code, names[code]) for code in missing])
+            for i in range(0, len(missing), 500):
+                chunk = missing[i:i + 500]
+                cursor.execute(f'''
+                SELECT stock_code, symbol_id FROM stock_symbol
+                WHERE stock_code IN ({', '.join('?' * len(chunk))})
+                ''', chunk)
+                resolved = dict(cursor.fetchall())
+                symbol_ids.update(resolved)
+                self._pending_symbol_ids.update(resolved)
+        return symbol_ids
+
+    def _bars_committed(self, data_type: str, rows: Optional[Sequence[Tuple]], codes: Set[str]):
+        """K线事务提交后的处理：更新股票ID缓存，同步到列式存储，通知监听器"""
+        if self._pending_symbol_ids:
+            self._symbol_ids.update(self._pending_symbol_ids)
+            self._pending_symbol_ids.clear()
+        if rows and self.column_store is not None:
+            self.column_store.append_rows(data_type, rows)
+        if codes:
+            self._notify_bar_listeners(data_type, codes)
+
+    def add_bar_listener(self, callback: Callable[[str, Set[str]], None]):
+        """登记K线写入监听器，写入提交后以 (数据类型, 股票代码集合) 调用
+
+        绑定方法以弱引用保存，所属对象被回收后自动注销。
+        """
+        ref = weakref.WeakMethod(callback) if hasattr(callback, '__self__') else (lambda: callback)
+        self._bar_listeners.setdefault(self.db_path, []).append(ref)
+
+    def _notify_bar_listeners(self, data_type: str, codes: Set[str]):
+        """调用监听器，顺便清理已失效的弱引用"""
+        listeners = self._bar_listeners.get(self.db_path)
+        if not listeners:
+            return
+        for ref in list(listeners):
+            callback = ref()
+            if callback is None:
+                listeners.remove(ref)
+                continue
+            try:
+                callback(data_type, codes)
+            except Exception as e:
+                logging.error(f"K线写入监听器执行失败: {str(e)}")
+
+    def get_bars(self, stock_code: str, data_type: str, start: Union[int, str, None] = None,
+                 end: Union[int, str, None] = None, backend: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """查询K线区间，返回 time/open/high/low/close/volume/amount 列数组
+
+        backend 为 'columnar' 时返回列式存储上的零拷贝视图，为 'sqlite' 时从K线表读取；
+        默认配置了列式存储就用列式存储。time 为 YYYYMMDDHHMM 打包整数。
+        """
+        if backend is None:
+            backend = 'columnar' if self.column_store is not None else 'sqlite'
+        if backend == 'columnar':
+            if self.column_store is None:
+                raise ValueError("未配置列式存储")
+            return self.column_store.get_bars(stock_code, data_type, start, end)
+
+        start_key = to_bar_time(start)
+        end_key = to_bar_time(end, end=True)
+        if self.is_compact_schema():
+            return self._get_bars_compact(stock_code, data_type, start_key, end_key)
+
+        conditions = ['stock_code = ?']
+        params = [stock_code]
+        if start_key is not None:
+            conditions.append('trade_date >= ?')
+            params.append(unpack_date(start_key // 10000))
+        if end_key is not None:
+            conditions.append('trade_date <= ?')
+            params.append(unpack_date(end_key // 10000))
+        time_column = 'NULL' if data_type == 'daily' else 'trade_time'
+        with self.read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+            SELECT trade_date, {time_column}, open_price, high_price,
+                   low_price, close_price, volume, amount
+            FROM {BAR_TABLES[data_type]}
+            WHERE {' AND '.join(conditions)}
+            ORDER BY trade_date{', trade_time' if data_type != 'daily' else ''}
+            ''', params)
+            rows = cursor.fetchall()
+
+        times = np.fromiter((pack_bar_time(row[0], row[1]) for row in rows),
+                            dtype=BAR_FIELDS['time'], count=len(rows))
+        bars = self._rows_to_bars(times, rows, 2)
+
+        # 日期条件之外再按分钟精确截取
+        lo = 0 if start_key is None else int(np.searchsorted(times, start_key, 'left'))
+        hi = len(times) if end_key is None else int(np.searchsorted(times, end_key, 'right'))
+        if lo or hi < len(times):
+            bars = {field: array[lo:hi] for field, array in bars.items()}
+        return bars
+
+    def get_last_bar_time(self, stock_code: str, data_type: str,
+                          backend: Optional[str] = None) -> Optional[int]:
+        """最后一根K线的时间（YYYYMMDDHHMM），走主键索引，没有数据时返回 None"""
+        if backend is None:
+            backend = 'columnar' if self.column_store is not None else 'sqlite'
+        if backend == 'columnar':
+            return self.column_store.last_time(stock_code, data_type)
+
+        with self.read_connection() as conn:
+            cursor = conn.cursor()
+            if self.is_compact_schema():
+                table, key = COMPACT_BAR_TABLES[data_type]
+                cursor.execute(f'''
+                SELECT MAX({key}) FROM {table}
+                WHERE symbol_id = (SELECT symbol_id FROM stock_symbol WHERE stock_code = ?)
+                ''', (stock_code,))
+                value = cursor.fetchone()[0]
+                if value is None:
+                    return None
+                return value * 10000 if data_type == 'daily' else value
+
+            time_column = 'NULL' if data_type == 'daily' else 'trade_time'
+            cursor.execute(f'''
+            SELECT trade_date, {time_column} FROM {BAR_TABLES[data_type]}
+            WHERE stock_code = ?
+            ORDER BY trade_date DESC{', trade_time DESC' if data_type != 'daily' else ''}
+            LIMIT 1
+            ''', (stock_code,))
+            row = cursor.fetchone()
+            return pack_bar_time(row[0], row[1]) if row else None
+
+    def get_bar_page(self, stock_code: str, data_type: str, after: Optional[int] = None,
+                     end: Union[int, str, None] = None, limit: int = 1000,
+                     backend: Optional[str] = None) -> Dict[str, np.ndarray]:
+        """键集分页：按主键顺序取时间晚于 after（YYYYMMDDHHMM，不含）、不晚于 end 的至多 limit 根K线
+
+        沿主键索引定位到 after 之后顺序读取 limit 行，翻到第几页代价都一样，
+        下一页的 after 就是本页最后一根K线的时间。
+        """
+        end_key = to_bar_time(end, end=True)
+        if backend is None:
+            backend = 'columnar' if self.column_store is not None else 'sqlite'
+        if backend == 'columnar':
+            if self.column_store is None:
+                raise ValueError("未配置列式存储")
+            bars = self.column_store.get_bars(stock_code, data_type, None if after is None else after + 1, end_key)
+            return {field: array[:limit] for field, array in bars.items()}
+
+        with self.read_connection() as conn:
+            cursor = conn.cursor()
+            if self.is_compact_schema():
+                table, key = COMPACT_BAR_TABLES[data_type]
+                divisor = 10000 if data_type == 'daily' else 1
+                cursor.execute(f'''
+                SELECT {key}, open_price, high_price, low_price, close_price, volume, amount
+                FROM {table}
+                WHERE symbol_id = (SELECT symbol_id FROM stock_symbol WHERE stock_code = ?)
+                  AND {key} > ? AND {key} <= ?
+                ORDER BY {key}
+                LIMIT ?
+                ''', (stock_code, -1 if after is None else after // divisor,
+                      99999999999999 if end_key is None else end_key // divisor, limit))
+                rows = cursor.fetchall()
+                times = np.fromiter((row[0] for row in rows), dtype=BAR_FIELDS['time'], count=len(rows))
+                return self._rows_to_bars(times * divisor, rows, 1)
+
+            # 用行值比较 (trade_date, trade_time) 走复合主键的范围扫描
+            after_key = 0 if after is None else after
+            end_key = 999999999999 if end_key is None else end_key
+            if data_type == 'daily':
+                key, time_column, placeholder = 'trade_date', 'NULL', '?'
+                low = (unpack_date(after_key // 10000),)
+                high = (unpack_date(end_key // 10000),)
+            else:
+                key, time_column, placeholder = '(trade_date, trade_time)', 'trade_time', '(?, ?)'
+                low = (unpack_date(after_key // 10000), unpack_time(after_key % 10000))
+                high = (unpack_date(end_key // 10000), unpack_time(end_key % 10000))
+            cursor.execute(f'''
+            SELECT trade_date, {time_column}, open_price, high_price,
+                   low_price, close_price, volume, amount
+            FROM {BAR_TABLES[data_type]}
+            WHERE stock_code = ? AND {key} > {placeholder} AND {key} <= {placeholder}
+            ORDER BY trade_date{', trade_time' if data_type != 'daily' else ''}
+            LIMIT ?
+            ''', (stock_code,) + low + high + (limit,))
+            rows = cursor.fetchall()
+
+        times = np.fromiter((pack_bar_time(row[0], row[1]) for row in rows),
+                            dtype=BAR_FIELDS['time'], count=len(rows))
+        return self._rows_to_bars(times, rows, 2)
+
+    def get_bar_symbols(self, data_type: str) -> Dict[str, str]:
+        """有K线数据的股票代码及名称"""
+        with self.read_connection() as conn:
+            cursor = conn.cursor()
+            if self.is_compact_schema():
+                cursor.execute('SELECT stock_code, stock_name FROM stock_symbol ORDER BY stock_code')
+                return dict(cursor.fetchall())
+            # 沿主键索引逐个跳到下一个股票代码，不扫描全部K线
+            table = BAR_TABLES[data_type]
+            cursor.execute(f'''
+            WITH RECURSIVE codes(code) AS (
+                SELECT MIN(stock_code) FROM {table}
+                UNION ALL
+                SELECT (SELECT MIN(stock_code) FROM {table} WHERE stock_code > codes.code)
+                FROM codes WHERE codes.code IS NOT NULL
+            )
+            SELECT code, (SELECT stock_name FROM {table} WHERE stock_code = code LIMIT 1)
+            FROM codes WHERE code IS NOT NULL
+            ''')
+            return dict(cursor.fetchall())
+
+    def _get_bars_compact(self, stock_code: str, data_type: str, start_key: Optional[int],
+                          end_key: Optional[int]) -> Dict[str, np.ndarray]:
+        """从紧凑K线表按主键区间读取"""
+        table, key = COMPACT_BAR_TABLES[data_type]
+        # 日线主键是 YYYYMMDD，分钟线是 YYYYMMDDHHMM
+        divisor = 10000 if data_type == 'daily' else 1
+        low = 0 if start_key is None else -(-start_key // divisor)
+        high = 99999999999999 if end_key is None else end_key // divisor
+        with self.read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+            SELECT {key}, open_price, high_price, low_price, close_price, volume, amount
+            FROM {table}
+            WHERE symbol_id = (SELECT symbol_id FROM stock_symbol WHERE stock_code = ?)
+              AND {key} BETWEEN ? AND ?
+            ORDER BY {key}
+            ''', (stock_code, low, high))
+            rows = cursor.fetchall()
+
+        times = np.fromiter((row[0] for row in rows), dtype=BAR_FIELDS['time'], count=len(rows))
+        return self._rows_to_bars(times * divisor, rows, 1)
+
+    def _rows_to_bars(self, times: np.ndarray, rows: List[Tuple], first: int) -> Dict[str, np.ndarray]:
+        """把查询结果转换为列数组，first 为开盘价所在列"""
+        values = list(zip(*rows)) if rows else [()] * (first + 6)
+        bars = {'time': times}
+        for index, field in enumerate(('open', 'high', 'low', 'close', 'volume', 'amount'), first):
+            bars[field] = np.array(values[index], dtype=BAR_FIELDS[field])
+        return bars
+
+    @contextmanager
+    def bulk_load_session(self, data_type: str, fast_pragmas: bool = True,
+                          defer_indexes: bool = True):
+        """批量导入会话：可选调整 PRAGMA 并延迟重建二级索引，结束后恢复
+
+        会话期间不独占写连接，每批数据由 save_bar_batch 单独加锁提交，
+        实时数据的写入可以在批次之间穿插进行。defer_indexes 只对用户另外在K线表上
+        创建的二级索引起作用：本项目建表时K线表只有主键索引，主键索引无法删除，
+        这种情况下该选项不做任何事。
+        """
+        table = BAR_TABLES[data_type]
+        saved_pragmas = {}
+        dropped_indexes = []
+        try:
+            with self.write_connection() as conn:
+                cursor = conn.cursor()
+                if fast_pragmas:
+                    # 记录原有设置，导入结束后恢复
+                    for pragma in ('synchronous', 'cache_size'):
+                        saved_pragmas[pragma] = cursor.execute(f'PRAGMA {pragma}').fetchone()[0]
+                    cursor.execute('PRAGMA synchronous=OFF')
+                    cursor.execute('PRAGMA cache_size=-200000')  # 约200MB页缓存
+                    logging.info("批量导入模式: synchronous=OFF")
+                
+                if defer_indexes:
+                    # 主键索引无法删除（sql 为空），只延迟用户创建的二级索引
+                    cursor.execute('''
+                    SELECT name, sql FROM sqlite_master
+                    WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL
+                    ''', (table,))
+                    dropped_indexes = cursor.fetchall()
+                    for name, _ in dropped_indexes:
+                        cursor.execute(f'DROP INDEX IF EXISTS "{name}"')
+                    conn.commit()
+                    if dropped_indexes:
+                        logging.info(f"导入期间暂时删除 {table} 的 {len(dropped_indexes)} 个索引")
+            
+            yield
+            
+        finally:
+            with self.write_connection() as conn:
+                cursor = conn.cursor()
+                for name, sql in dropped_indexes:
+                    cursor.execute(sql)
+                    logging.info(f"重建索引: {name}")
+                conn.commit()
+                for pragma, value in saved_pragmas.items():
+                    cursor.execute(f"PRAGMA {pragma}={value}")
+
+    def save_bar_batch(self, data_type: str, rows: Sequence[BarRecord],
+                       manifests: Optional[List[Dict]] = None):
+        """在批量导入会话中以单个事务写入一批K线数据及对应文件的导入清单"""
+        with self.write_connection() as conn:
             cursor = conn.cursor()
             try:
                 cursor.execute('BEGIN TRANSACTION')
-                
-                cursor.executemany('''
-                INSERT OR REPLACE INTO stock_5min (
-                    stock_code, stock_name, trade_date,
-                    trade_time, open_price, high_price,
-                    low_price, close_price, volume, amount
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', [(
-                    item['stock_code'],
-                    item['stock_name'],
-                    item['trade_date'],
-                    item['trade_time'],
-                    item['open_price'],
-                    item['high_price'],
-                    item['low_price'],
-                    item['close_price'],
-                    item['volume'],
-                    item['amount']
-                ) for item in data_list])
-                
+                written, codes = self._write_bars(cursor, data_type, rows)
+                if manifests:
+                    self._upsert_manifest(cursor, manifests)
                 conn.commit()
-                logging.info(f"成功保存5分钟数据，数量: {len(data_list)}")
-                
+                self._bars_committed(data_type, written, codes)
             except Exception as e:
                 conn.rollback()
-                logging.error(f"保存5分钟数据失败: {str(e)}")
+                self._pending_symbol_ids.clear()
+                logging.error(f"批量保存{data_type}数据失败: {str(e)}")
                 raise
 
-    def save_1min_data(self, data_list: List[Dict]):
-        """保存1分钟数据"""
-        with self.get_connection() as conn:
+    def get_import_manifest(self, data_type: str) -> Dict[str, Dict]:
+        """获取指定类型数据文件的导入清单，以文件路径为键"""
+        with self.read_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+            SELECT {', '.join(MANIFEST_COLUMNS)}
+            FROM import_manifest
+            WHERE data_type = ?
+            ''', (data_type,))
+            return {row[0]: dict(zip(MANIFEST_COLUMNS, row)) for row in cursor.fetchall()}
+
+    def save_imported_file(self, data_type: str, data_list: Iterable[BarRecord],
+                           get_manifest: Callable[[], Dict]) -> int:
+        """以单个事务保存一个文件的K线数据和导入清单
+
+        get_manifest 在数据写完后调用（此时解析器已知道结束偏移和最后一根K线），
+        数据和清单同时提交，中断的导入下次会从未完成的文件继续。
+        """
+        with self.write_connection() as conn:
             cursor = conn.cursor()
             try:
                 cursor.execute('BEGIN TRANSACTION')
-                
-                cursor.executemany('''
-                INSERT OR REPLACE INTO stock_1min (
-                    stock_code, stock_name, trade_date,
-                    trade_time, open_price, high_price,
-                    low_price, close_price, volume, amount
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                ''', [(
-                    item['stock_code'],
-                    item['stock_name'],
-                    item['trade_date'],
-                    item['trade_time'],
-                    item['open_price'],
-                    item['high_price'],
-                    item['low_price'],
-                    item['close_price'],
-                    item['volume'],
-                    item['amount']
-                ) for item in data_list])
-                
+                rows, codes = self._write_bars(cursor, data_type, data_list)
+                count = cursor.rowcount
+                self._upsert_manifest(cursor, [get_manifest()])
                 conn.commit()
-                logging.info(f"成功保存1分钟数据，数量: {len(data_list)}")
-                
+                self._bars_committed(data_type, rows, codes)
+                return count
             except Exception as e:
                 conn.rollback()
-                logging.error(f"保存1分钟数据失败: {str(e)}")
-                raise
\ No newline at end of file
+                self._pending_symbol_ids.clear()
+                logging.error(f"保存导入文件失败: {str(e)}")
+                raise
+
+    def _upsert_manifest(self, cursor, manifests: List[Dict]):
+        """写入导入清单记录"""
+        cursor.executemany(f'''
+        INSERT OR REPLACE INTO import_manifest ({', '.join(MANIFEST_COLUMNS)}, import_time)
+        VALUES ({', '.join('?' * len(MANIFEST_COLUMNS))}, CURRENT_TIMESTAMP)
+        ''', [tuple(m[c] for c in MANIFEST_COLUMNS) for m in manifests])
\ No newline at end of file
@@ -0,0 +1,75 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+def arrays_nbytes(arrays: Dict[str, Any]) -> int:
+    """列数组字典占用的字节数"""
+    return sum(array.nbytes for array in arrays.values())
+
+class ByteLRUCache:
+    """按占用字节数淘汰的 LRU 缓存（线程安全）
+
+    sizeof 计算一个值的字节数，默认 len（用于 bytes）；超过 max_bytes 的单个值不缓存。
+    get 统计命中和未命中次数。
+    """
+    def __init__(self, max_bytes: int, sizeof: Callable[[Any], int] = len):
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self._items: 'OrderedDict[Hashable, Any]' = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """取值并标记为最近使用，没有时返回 None"""
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> bool:
+        """写入并按字节上限淘汰最久未使用的值，值本身超过上限时不缓存并返回 False"""
+        size = self.sizeof(value)
+        with self._lock:
+            self._pop(key)
+            if size > self.max_bytes:
+                return False
+            self._items[key] = value
+            self._sizes[key] = size
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                self._pop(next(iter(self._items)))
+        return True
+
+    def discard_if(self, predicate: Callable[[Hashable], bool]) -> int:
+        """删除键满足条件的值，返回删除个数"""
+        with self._lock:
+            keys = [key for key in self._items if predicate(key)]
+            for key in keys:
+                self._pop(key)
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self._sizes.clear()
+            self.bytes = 0
+
+    def _pop(self, key: Hashable):
+        if key in self._items:
+            del self._items[key]
+            self.bytes -= self._sizes.pop(key)
+
+    def stats(self) -> Dict:
+        """缓存统计"""
+        with self._lock:
+            return {'entries': len(self._items), 'bytes': self.bytes, 'hits': self.hits, 'misses': self.misses}
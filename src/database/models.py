@@ -24,9 +24,16 @@ class StockRealtime:
     main_force_net: float
     timestamp: datetime
 
-def init_database():
-    """初始化数据库表结构"""
-    db_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'stock_analysis.db')
+# 紧凑K线表结构的版本号（记录在 PRAGMA user_version 中）
+COMPACT_SCHEMA_VERSION = 2
+
+def default_db_path() -> str:
+    """默认数据库文件路径"""
+    return os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), 'stock_analysis.db')
+
+def init_database(db_path: str = None, compact: bool = False):
+    """初始化数据库表结构，compact=True 时把K线表迁移为紧凑结构"""
+    db_path = db_path or default_db_path()
     logging.info(f"初始化数据库: {db_path}")
     
     conn = sqlite3.connect(db_path)
@@ -144,6 +151,48 @@ def init_database():
         ('index', '指数板块', '各类股票指数')
     ])
     
+    # 已迁移到紧凑结构时 stock_daily 等是兼容视图，不再创建旧表
+    schema_version = cursor.execute('PRAGMA user_version').fetchone()[0]
+    if schema_version < COMPACT_SCHEMA_VERSION:
+        _create_legacy_bar_schema(cursor)
+
+    # 创建历史数据导入清单表（增量导入与断点续传）
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS import_manifest (
+        file_path TEXT PRIMARY KEY,
+        data_type TEXT NOT NULL,
+        stock_code TEXT,
+        file_size INTEGER,
+        file_mtime INTEGER,   -- 修改时间（纳秒）
+        content_hash TEXT,    -- 已导入部分 [0, data_offset) 的哈希
+        data_offset INTEGER,  -- 最后一条已导入数据行结束处的字节偏移
+        last_bar_date TEXT,
+        last_bar_time TEXT,
+        row_count INTEGER,
+        import_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )''')
+
+    # 创建指标缓存表（写入K线时在同一事务中删除对应股票的缓存）
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS indicator_cache (
+        stock_code TEXT NOT NULL,
+        freq TEXT NOT NULL,
+        indicator TEXT NOT NULL,
+        params TEXT NOT NULL,
+        last_bar_time INTEGER,  -- 计算时源数据最后一根K线的时间
+        payload BLOB,           -- np.savez 格式的指标序列
+        update_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (stock_code, freq, indicator, params)
+    ) WITHOUT ROWID''')
+
+    conn.commit()
+    conn.close()
+
+    if compact:
+        migrate_to_compact_schema(db_path)
+
+def _create_legacy_bar_schema(cursor):
+    """创建原始结构的K线表"""
     # 创建日线数据表
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS stock_daily (
@@ -190,6 +239,156 @@ def init_database():
         amount REAL,
         PRIMARY KEY (stock_code, trade_date, trade_time)
     )''')
-    
-    conn.commit()
-    conn.close() 
\ No newline at end of file
+ 
+def _create_compact_bar_schema(cursor):
+    """创建紧凑结构的K线表和兼容视图
+
+    股票代码和名称只在 stock_symbol 中存一份，K线表以整数股票ID加整数日期
+    (YYYYMMDD) 或整数时间 (YYYYMMDDHHMM) 为主键，使用 WITHOUT ROWID 存储。
+    原来的 stock_daily/stock_5min/stock_1min 变为同名视图，通过 INSTEAD OF
+    触发器继续支持原有的 INSERT OR REPLACE 写法。
+    """
+    # 股票字典表
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS stock_symbol (
+        symbol_id INTEGER PRIMARY KEY,
+        stock_code TEXT NOT NULL UNIQUE,
+        stock_name TEXT NOT NULL
+    )''')
+
+    # 日线表
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS bar_daily (
+        symbol_id INTEGER NOT NULL,
+        trade_date INTEGER NOT NULL,  -- YYYYMMDD
+        open_price REAL,
+        high_price REAL,
+        low_price REAL,
+        close_price REAL,
+        volume INTEGER,
+        amount REAL,
+        PRIMARY KEY (symbol_id, trade_date)
+    ) WITHOUT ROWID''')
+
+    # 分钟线表
+    for table in ('bar_5min', 'bar_1min'):
+        cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            symbol_id INTEGER NOT NULL,
+            bar_time INTEGER NOT NULL,  -- YYYYMMDDHHMM
+            open_price REAL,
+            high_price REAL,
+            low_price REAL,
+            close_price REAL,
+            volume INTEGER,
+            amount REAL,
+            PRIMARY KEY (symbol_id, bar_time)
+        ) WITHOUT ROWID''')
+
+    # 兼容视图：保持原表的列名和文本日期格式
+    cursor.execute('''
+    CREATE VIEW IF NOT EXISTS stock_daily AS
+    SELECT s.stock_code, s.stock_name,
+           printf('%04d-%02d-%02d', b.trade_date / 10000, b.trade_date / 100 % 100,
+                  b.trade_date % 100) AS trade_date,
+           b.open_price, b.high_price, b.low_price, b.close_price, b.volume, b.amount
+    FROM bar_daily b JOIN stock_symbol s ON s.symbol_id = b.symbol_id''')
+
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS stock_daily_insert INSTEAD OF INSERT ON stock_daily
+    BEGIN
+        INSERT OR IGNORE INTO stock_symbol (stock_code, stock_name)
+        VALUES (NEW.stock_code, NEW.stock_name);
+        INSERT OR REPLACE INTO bar_daily VALUES (
+            (SELECT symbol_id FROM stock_symbol WHERE stock_code = NEW.stock_code),
+            CAST(replace(NEW.trade_date, '-', '') AS INTEGER),
+            NEW.open_price, NEW.high_price, NEW.low_price, NEW.close_price,
+            NEW.volume, NEW.amount);
+    END''')
+
+    for view, table in (('stock_5min', 'bar_5min'), ('stock_1min', 'bar_1min')):
+        cursor.execute(f'''
+        CREATE VIEW IF NOT EXISTS {view} AS
+        SELECT s.stock_code, s.stock_name,
+               printf('%04d-%02d-%02d', b.bar_time / 100000000, b.bar_time / 1000000 % 100,
+                      b.bar_time / 10000 % 100) AS trade_date,
+               printf('%02d:%02d:00', b.bar_time / 100 % 100, b.bar_time % 100) AS trade_time,
+               b.open_price, b.high_price, b.low_price, b.close_price, b.volume, b.amount
+        FROM {table} b JOIN stock_symbol s ON s.symbol_id = b.symbol_id''')
+
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {view}_insert INSTEAD OF INSERT ON {view}
+        BEGIN
+            INSERT OR IGNORE INTO stock_symbol (stock_code, stock_name)
+            VALUES (NEW.stock_code, NEW.stock_name);
+            INSERT OR REPLACE INTO {table} VALUES (
+                (SELECT symbol_id FROM stock_symbol WHERE stock_code = NEW.stock_code),
+                CAST(replace(NEW.trade_date, '-', '') AS INTEGER) * 10000
+                    + CAST(substr(NEW.trade_time, 1, 2) AS INTEGER) * 100
+                    + CAST(substr(NEW.trade_time, 4, 2) AS INTEGER),
+                NEW.open_price, NEW.high_price, NEW.low_price, NEW.close_price,
+                NEW.volume, NEW.amount);
+        END''')
+
+def migrate_to_compact_schema(db_path: str = None, vacuum: bool = True):
+    """把K线表从原始结构迁移到紧凑结构，已迁移的数据库直接返回"""
+    db_path = db_path or default_db_path()
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+    try:
+        if cursor.execute('PRAGMA user_version').fetchone()[0] >= COMPACT_SCHEMA_VERSION:
+            return
+
+        logging.info(f"开始迁移K线表到紧凑结构: {db_path}")
+        cursor.execute('BEGIN TRANSACTION')
+        _create_legacy_bar_schema(cursor)
+
+        # 原表改名后再创建同名视图
+        for table in ('stock_daily', 'stock_5min', 'stock_1min'):
+            cursor.execute(f'ALTER TABLE {table} RENAME TO {table}_legacy')
+        _create_compact_bar_schema(cursor)
+
+        cursor.execute('''
+        INSERT OR IGNORE INTO stock_symbol (stock_code, stock_name)
+        SELECT stock_code, MAX(stock_name) FROM (
+            SELECT stock_code, stock_name FROM stock_daily_legacy
+            UNION ALL SELECT stock_code, stock_name FROM stock_5min_legacy
+            UNION ALL SELECT stock_code, stock_name FROM stock_1min_legacy
+        ) GROUP BY stock_code ORDER BY stock_code''')
+
+        # 按主键顺序插入，WITHOUT ROWID 表的B树可以顺序追加
+        cursor.execute('''
+        INSERT OR REPLACE INTO bar_daily
+        SELECT s.symbol_id, CAST(replace(d.trade_date, '-', '') AS INTEGER),
+               d.open_price, d.high_price, d.low_price, d.close_price, d.volume, d.amount
+        FROM stock_daily_legacy d JOIN stock_symbol s ON s.stock_code = d.stock_code
+        ORDER BY 1, 2''')
+        logging.info(f"迁移日线数据: {cursor.rowcount} 条")
+
+        for legacy, table in (('stock_5min_legacy', 'bar_5min'), ('stock_1min_legacy', 'bar_1min')):
+            cursor.execute(f'''
+            INSERT OR REPLACE INTO {table}
+            SELECT s.symbol_id,
+                   CAST(replace(m.trade_date, '-', '') AS INTEGER) * 10000
+                       + CAST(substr(m.trade_time, 1, 2) AS INTEGER) * 100
+                       + CAST(substr(m.trade_time, 4, 2) AS INTEGER),
+                   m.open_price, m.high_price, m.low_price, m.close_price, m.volume, m.amount
+            FROM {legacy} m JOIN stock_symbol s ON s.stock_code = m.stock_code
+            ORDER BY 1, 2''')
+            logging.info(f"迁移{table}数据: {cursor.rowcount} 条")
+
+        for table in ('stock_daily', 'stock_5min', 'stock_1min'):
+            cursor.execute(f'DROP TABLE {table}_legacy')
+        cursor.execute(f'PRAGMA user_version = {COMPACT_SCHEMA_VERSION}')
+        conn.commit()
+        logging.info("K线表迁移完成")
+
+        if vacuum:
+            # 回收旧表占用的空间
+            cursor.execute('VACUUM')
+    except Exception as e:
+        conn.rollback()
+        logging.error(f"K线表迁移失败: {str(e)}")
+        raise
+    finally:
+        conn.close()
\ No newline at end of file
@@ -0,0 +1,221 @@
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+import logging
+
+from .db_manager import DatabaseManager
+
+# 分区表名前缀，每个自然日一张表：stock_realtime_20240213
+PARTITION_PREFIX = 'stock_realtime_'
+
+# 写入分区表的列（与 stock_realtime 一致，成交额写入 turnover）
+PARTITION_COLUMNS = ('stock_code', 'stock_name', 'current_price', 'open_price', 'high_price',
+                     'low_price', 'volume', 'turnover', 'prev_close', 'change_percent',
+                     'change_amount', 'timestamp')
+
+def partition_name(day: str) -> str:
+    """'2024-02-13' -> stock_realtime_20240213"""
+    return PARTITION_PREFIX + day.replace('-', '')
+
+class RealtimePersister:
+    """实时行情的后写式持久化
+
+    采集器调用 submit 只是把行追加到内存队列，后台线程按 flush_interval 把队列中的行
+    按日期分组，用 executemany 一次事务写入当天的分区表；跨日时自动创建新分区，
+    并只保留最近 retention_days 个分区。队列超过 max_queue 行时丢弃最旧的行并计数。
+    """
+    def __init__(self, db: DatabaseManager = None, flush_interval: float = 1.0,
+                 max_batch: int = 200000, max_queue: int = 2000000, retention_days: int = 5):
+        self.db = db or DatabaseManager()
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_queue = max_queue
+        self.retention_days = retention_days
+        self._queue: deque = deque()
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._running = False
+        self._partitions = set()
+        self.stats = {
+            'rows_submitted': 0,
+            'rows_written': 0,
+            'rows_dropped': 0,
+            'batches': 0,
+            'last_flush_seconds': 0.0,
+            'max_flush_seconds': 0.0
+        }
+
+    def start(self):
+        """启动后台写入线程"""
+        if self._thread is not None:
+            return
+        self._partitions = set(self.list_partitions())
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='realtime-persister', daemon=True)
+        self._thread.start()
+        logging.info("实时行情写入线程已启动")
+
+    def stop(self, flush: bool = True):
+        """停止后台线程，flush=True 时先写完队列中的数据"""
+        if self._thread is None:
+            return
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        self._thread.join()
+        self._thread = None
+        if flush:
+            while self._queue:
+                self.flush()
+        logging.info(f"实时行情写入线程已停止: {self.get_stats()}")
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def submit(self, rows: Sequence[Dict], timestamp: Optional[float] = None):
+        """把一批行情（采集器的行情字典）放入写入队列，不等待磁盘"""
+        moment = datetime.fromtimestamp(time.time() if timestamp is None else timestamp)
+        day = moment.strftime('%Y-%m-%d')
+        stamp = moment.strftime('%Y-%m-%d %H:%M:%S')
+        records = []
+        for row in rows:
+            prev_close = row.get('prev_close') or 0
+            change_amount = row['current'] - prev_close
+            change_percent = change_amount / prev_close * 100 if prev_close else 0.0
+            records.append((day, (row['code'], row.get('name'), row['current'], row.get('open'),
+                                  row.get('high'), row.get('low'), row.get('volume'), row.get('amount'),
+                                  prev_close, change_percent, change_amount, stamp)))
+
+        with self._condition:
+            self._queue.extend(records)
+            self.stats['rows_submitted'] += len(records)
+            overflow = len(self._queue) - self.max_queue
+            if overflow > 0:
+                for _ in range(overflow):
+                    self._queue.popleft()
+                self.stats['rows_dropped'] += overflow
+                logging.warning(f"实时行情写入队列已满，丢弃 {overflow} 行")
+            if len(self._queue) >= self.max_batch:
+                self._condition.notify()
+
+    def queue_depth(self) -> int:
+        """队列中等待写入的行数"""
+        return len(self._queue)
+
+    def _run(self):
+        """后台线程：定时或队列积压时写入"""
+        while True:
+            with self._condition:
+                if self._running and len(self._queue) < self.max_batch:
+                    self._condition.wait(self.flush_interval)
+                if not self._running:
+                    return
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"实时行情写入失败: {str(e)}")
+
+    def flush(self) -> int:
+        """把队列中最多 max_batch 行写入数据库，返回写入行数"""
+        batch = []
+        with self._condition:
+            while self._queue and len(batch) < self.max_batch:
+                batch.append(self._queue.popleft())
+        if not batch:
+            return 0
+
+        by_day: Dict[str, List[Tuple]] = {}
+        for day, record in batch:
+            by_day.setdefault(day, []).append(record)
+
+        started = time.perf_counter()
+        created = []
+        with self.db.write_connection() as conn:
+            cursor = conn.cursor()
+            try:
+                cursor.execute('BEGIN TRANSACTION')
+                for day, records in by_day.items():
+                    table = partition_name(day)
+                    if table not in self._partitions:
+                        self._create_partition(cursor, table)
+                        created.append(table)
+                    cursor.executemany(f'''
+                    INSERT INTO {table} ({', '.join(PARTITION_COLUMNS)})
+                    VALUES ({', '.join('?' * len(PARTITION_COLUMNS))})
+                    ''', records)
+                conn.commit()
+                # 建表随事务回滚时不能记为已存在，提交后才登记
+                self._partitions.update(created)
+            except Exception:
+                conn.rollback()
+                # 写入失败的行放回队列头部，下次重试
+                with self._condition:
+                    self._queue.extendleft(reversed(batch))
+                raise
+        if created:
+            self.apply_retention()
+
+        elapsed = time.perf_counter() - started
+        self.stats['rows_written'] += len(batch)
+        self.stats['batches'] += 1
+        self.stats['last_flush_seconds'] = elapsed
+        self.stats['max_flush_seconds'] = max(self.stats['max_flush_seconds'], elapsed)
+        return len(batch)
+
+    def _create_partition(self, cursor, table: str):
+        """在当前事务中创建一个自然日的分区表，提交后由 flush 登记"""
+        cursor.execute(f'''
+        CREATE TABLE IF NOT EXISTS {table} (
+            id INTEGER PRIMARY KEY,
+            stock_code TEXT NOT NULL,
+            stock_name TEXT,
+            current_price REAL,
+            open_price REAL,
+            high_price REAL,
+            low_price REAL,
+            close_price REAL,
+            volume INTEGER,
+            turnover REAL,
+            prev_close REAL,
+            change_percent REAL,
+            change_amount REAL,
+            turnover_rate REAL,
+            speed REAL,
+            main_force_net REAL,
+            timestamp DATETIME
+        )''')
+        cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_code ON {table} (stock_code, timestamp)')
+        logging.info(f"创建实时行情分区: {table}")
+
+    def list_partitions(self) -> List[str]:
+        """已有的分区表，按日期升序"""
+        with self.db.read_connection() as conn:
+            rows = conn.execute('''
+            SELECT name FROM sqlite_master
+            WHERE type = 'table' AND name GLOB 'stock_realtime_[0-9]*'
+            ORDER BY name
+            ''').fetchall()
+        return [row[0] for row in rows]
+
+    def apply_retention(self) -> List[str]:
+        """删除超出保留数量的最旧分区，返回被删除的表名"""
+        partitions = self.list_partitions()
+        expired = partitions[:-self.retention_days] if self.retention_days > 0 else []
+        if expired:
+            with self.db.write_connection() as conn:
+                for table in expired:
+                    conn.execute(f'DROP TABLE IF EXISTS {table}')
+                    self._partitions.discard(table)
+                conn.commit()
+            logging.info(f"删除过期实时行情分区: {', '.join(expired)}")
+        return expired
+
+    def get_stats(self) -> Dict:
+        """写入统计，含当前队列深度"""
+        return {**self.stats, 'queue_depth': self.queue_depth()}
@@ -0,0 +1,318 @@
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# 最新行情的列：(列名, 行情字典中的键, 类型)，列名与 stock_realtime 表一致
+REALTIME_COLUMNS = (
+    ('current_price', 'current', np.float64),
+    ('open_price', 'open', np.float64),
+    ('high_price', 'high', np.float64),
+    ('low_price', 'low', np.float64),
+    ('prev_close', 'prev_close', np.float64),
+    ('volume', 'volume', np.int64),
+    ('amount', 'amount', np.float64)
+)
+
+# 由上面的列计算得到的列
+DERIVED_COLUMNS = ('change_amount', 'change_percent', 'timestamp')
+
+# 逐笔环形缓冲保存的列
+TICK_COLUMNS = ('timestamp', 'current_price', 'volume', 'amount')
+
+# 列按固定大小分块保存，更新时只复制被修改的块，未修改的块由前后两帧共享
+CHUNK_SIZE = 256
+
+class ChunkedColumn:
+    """分块保存的只读列，按槽位读取的用法与一维数组相同
+
+    整数下标返回单个值；切片和槽位数组返回新的 ndarray，只访问涉及的块。
+    """
+    def __init__(self, chunks: Tuple[np.ndarray, ...], dtype):
+        self.chunks = chunks
+        self.dtype = np.dtype(dtype)
+
+    def __len__(self) -> int:
+        return len(self.chunks) * CHUNK_SIZE
+
+    def __getitem__(self, index):
+        if isinstance(index, (int, np.integer)):
+            return self.chunks[index // CHUNK_SIZE][index % CHUNK_SIZE]
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1 or start >= stop:
+                return self[np.arange(start, stop, step)]
+            first, last = start // CHUNK_SIZE, (stop - 1) // CHUNK_SIZE + 1
+            data = self.chunks[first] if last - first == 1 else np.concatenate(self.chunks[first:last])
+            return data[start - first * CHUNK_SIZE:stop - first * CHUNK_SIZE]
+
+        index = np.asarray(index)
+        if index.dtype == bool:
+            index = np.flatnonzero(index)
+        result = np.empty(index.shape, self.dtype)
+        if not index.size:
+            return result
+        # 按块分组后逐块取值
+        chunk_ids = index // CHUNK_SIZE
+        order = np.argsort(chunk_ids, kind='stable')
+        sorted_ids = chunk_ids[order]
+        starts = np.flatnonzero(np.concatenate(([True], sorted_ids[1:] != sorted_ids[:-1])))
+        ends = np.append(starts[1:], len(order))
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            positions = order[start:end]
+            result[positions] = self.chunks[sorted_ids[start]][index[positions] % CHUNK_SIZE]
+        return result
+
+    def __array__(self, dtype=None, copy=None):
+        data = np.concatenate(self.chunks)
+        return data if dtype is None else data.astype(dtype)
+
+    def updated(self, touched: np.ndarray, offsets: Sequence[np.ndarray], values: np.ndarray,
+                bounds: Sequence[Tuple[int, int]]) -> 'ChunkedColumn':
+        """复制 touched 中的块并写入新值，返回新列；values 按 bounds 切分到各块的 offsets"""
+        chunks = list(self.chunks)
+        for chunk_id, chunk_offsets, (start, end) in zip(touched.tolist(), offsets, bounds):
+            chunk = chunks[chunk_id].copy()
+            chunk[chunk_offsets] = values[start:end]
+            chunk.flags.writeable = False
+            chunks[chunk_id] = chunk
+        return ChunkedColumn(tuple(chunks), self.dtype)
+
+    def extended(self, chunk_count: int) -> 'ChunkedColumn':
+        """追加全零的块到 chunk_count 块"""
+        extra = []
+        for _ in range(chunk_count - len(self.chunks)):
+            chunk = np.zeros(CHUNK_SIZE, self.dtype)
+            chunk.flags.writeable = False
+            extra.append(chunk)
+        return ChunkedColumn(self.chunks + tuple(extra), self.dtype)
+
+    @classmethod
+    def zeros(cls, chunk_count: int, dtype) -> 'ChunkedColumn':
+        return cls((), dtype).extended(chunk_count)
+
+class RealtimeFrame:
+    """某一版本的全市场最新行情（只读），读取方拿到引用后不受后续写入影响"""
+    def __init__(self, version: int, count: int, codes: List[str], names: List[str],
+                 columns: Dict[str, ChunkedColumn], slot_versions: ChunkedColumn,
+                 chunk_versions: np.ndarray):
+        self.version = version
+        self.count = count
+        self.codes = codes
+        self.names = names
+        self.columns = columns
+        self.slot_versions = slot_versions
+        # 每块中最大的槽位版本号，查找变化的槽位时跳过没有变化的块
+        self.chunk_versions = chunk_versions
+
+    def changed_slots(self, version: int = 0) -> np.ndarray:
+        """版本号大于 version 的槽位，version=0 时为全部有行情的槽位"""
+        parts = [chunk_id * CHUNK_SIZE + np.flatnonzero(self.slot_versions.chunks[chunk_id] > version)
+                 for chunk_id in np.flatnonzero(self.chunk_versions > version).tolist()]
+        return np.concatenate(parts) if parts else np.empty(0, dtype=np.int64)
+
+    def record(self, slot: int) -> Dict:
+        """单只股票的行情字典"""
+        record = {'stock_code': self.codes[slot], 'stock_name': self.names[slot]}
+        for name, column in self.columns.items():
+            record[name] = column[slot].item()
+        return record
+
+    def records(self, slots: Optional[np.ndarray] = None) -> List[Dict]:
+        """多只股票的行情字典，默认全部"""
+        if slots is None:
+            slots = np.arange(self.count)
+        values = {name: column[slots].tolist() for name, column in self.columns.items()}
+        names = list(values)
+        records = []
+        for i, slot in enumerate(slots.tolist()):
+            record = {'stock_code': self.codes[slot], 'stock_name': self.names[slot]}
+            for name in names:
+                record[name] = values[name][i]
+            records.append(record)
+        return records
+
+    def column_data(self, slots: Optional[np.ndarray] = None) -> Dict[str, object]:
+        """多只股票的列数据：代码和名称为列表，其余为数组，默认全部"""
+        if slots is None:
+            slots = np.arange(self.count)
+        data = {'stock_code': [self.codes[slot] for slot in slots.tolist()],
+                'stock_name': [self.names[slot] for slot in slots.tolist()]}
+        for name, array in self.columns.items():
+            data[name] = array[slots]
+        return data
+
+class RealtimeStore:
+    """进程内的实时行情表：每只股票一个槽位保存最新值，另有定长环形缓冲保存最近的逐笔
+
+    采集器是唯一写入方。每次 update 发布新的 RealtimeFrame，读取最新行情不加锁也不访问磁盘。
+    列数据按 CHUNK_SIZE 个槽位分块，更新只复制包含变化槽位的块，其余块与上一帧共享，
+    一次更新的复制量与变化的股票数成正比（最多为整列），与容量无关。
+    逐笔缓冲原地写入，读写由一把锁保护。
+    """
+    def __init__(self, capacity: int = 8192, history: int = 240):
+        self.history = history
+        self._slots: Dict[str, int] = {}
+        self._codes: List[str] = []
+        self._names: List[str] = []
+        chunk_count = -(-capacity // CHUNK_SIZE)
+        self._capacity = chunk_count * CHUNK_SIZE
+        columns = {name: ChunkedColumn.zeros(chunk_count, dtype) for name, _, dtype in REALTIME_COLUMNS}
+        for name in DERIVED_COLUMNS:
+            columns[name] = ChunkedColumn.zeros(chunk_count, np.float64)
+        self._frame = RealtimeFrame(0, 0, [], [], columns, ChunkedColumn.zeros(chunk_count, np.int64),
+                                    np.zeros(chunk_count, dtype=np.int64))
+        self._ticks = np.zeros((self._capacity, history, len(TICK_COLUMNS)))
+        self._tick_pos = np.zeros(self._capacity, dtype=np.int64)
+        self._tick_count = np.zeros(self._capacity, dtype=np.int64)
+        self._names_changed = False
+        self._write_lock = threading.Lock()
+        self._tick_lock = threading.Lock()
+
+    @property
+    def version(self) -> int:
+        """当前版本号，每次 update 加一"""
+        return self._frame.version
+
+    def frame(self) -> RealtimeFrame:
+        """当前发布的行情帧"""
+        return self._frame
+
+    def _assign_slots(self, rows: Sequence[Dict]) -> np.ndarray:
+        """查找或分配股票槽位"""
+        slots = np.empty(len(rows), dtype=np.int64)
+        for i, row in enumerate(rows):
+            code = row['code']
+            slot = self._slots.get(code)
+            if slot is None:
+                slot = len(self._codes)
+                self._slots[code] = slot
+                self._codes.append(code)
+                self._names.append(row.get('name', ''))
+            elif row.get('name') and row['name'] != self._names[slot]:
+                self._names[slot] = row['name']
+                self._names_changed = True
+            slots[i] = slot
+        return slots
+
+    def _grow(self, needed: int):
+        """槽位不够时按倍数扩容（新增全零的块）"""
+        capacity = self._capacity
+        while capacity < needed:
+            capacity *= 2
+        extra = capacity - self._capacity
+        with self._tick_lock:
+            self._ticks = np.concatenate([self._ticks, np.zeros((extra,) + self._ticks.shape[1:])])
+            self._tick_pos = np.concatenate([self._tick_pos, np.zeros(extra, dtype=np.int64)])
+            self._tick_count = np.concatenate([self._tick_count, np.zeros(extra, dtype=np.int64)])
+        self._capacity = capacity
+
+    def update(self, rows: Sequence[Dict], timestamp: Optional[float] = None) -> int:
+        """写入一批行情（采集器的行情字典），返回新的版本号"""
+        if not rows:
+            return self.version
+        timestamp = time.time() if timestamp is None else timestamp
+        with self._write_lock:
+            current = self._frame
+            slots = self._assign_slots(rows)
+            # 同一批中重复出现的股票只保留最后一条；slots 为升序
+            slots, last = np.unique(slots[::-1], return_index=True)
+            index = len(rows) - 1 - last
+            if len(self._codes) > self._capacity:
+                self._grow(len(self._codes))
+            chunk_count = self._capacity // CHUNK_SIZE
+
+            values = {}
+            for name, key, dtype in REALTIME_COLUMNS:
+                values[name] = np.fromiter((rows[i].get(key, 0) or 0 for i in index), dtype=dtype, count=len(index))
+            prev_close = values['prev_close']
+            change = values['current_price'] - prev_close
+            values['change_amount'] = change
+            with np.errstate(divide='ignore', invalid='ignore'):
+                values['change_percent'] = np.where(prev_close > 0, change / prev_close * 100, 0.0)
+            values['timestamp'] = np.full(len(slots), timestamp)
+
+            version = current.version + 1
+            values['slot_versions'] = np.full(len(slots), version, dtype=np.int64)
+
+            # 按块切分：slots 升序，同一块的槽位相邻
+            chunk_ids = slots // CHUNK_SIZE
+            bounds_index = np.flatnonzero(np.concatenate(([True], chunk_ids[1:] != chunk_ids[:-1])))
+            touched = chunk_ids[bounds_index]
+            ends = np.append(bounds_index[1:], len(slots))
+            bounds = list(zip(bounds_index.tolist(), ends.tolist()))
+            offsets = [slots[start:end] % CHUNK_SIZE for start, end in bounds]
+
+            columns = {name: column.extended(chunk_count).updated(touched, offsets, values[name], bounds)
+                       for name, column in current.columns.items()}
+            slot_versions = current.slot_versions.extended(chunk_count).updated(
+                touched, offsets, values['slot_versions'], bounds)
+            chunk_versions = np.zeros(chunk_count, dtype=np.int64)
+            chunk_versions[:len(current.chunk_versions)] = current.chunk_versions
+            chunk_versions[touched] = version
+            chunk_versions.flags.writeable = False
+
+            self._write_ticks(slots, values)
+            # 代码和名称列表只在有新股票或名称变化时复制
+            codes, names = current.codes, current.names
+            if len(self._codes) != current.count or self._names_changed:
+                codes, names = list(self._codes), list(self._names)
+                self._names_changed = False
+            self._frame = RealtimeFrame(version, len(self._codes), codes, names,
+                                        columns, slot_versions, chunk_versions)
+            return version
+
+    def _write_ticks(self, slots: np.ndarray, values: Dict[str, np.ndarray]):
+        """把本次更新追加到各股票的环形缓冲，values 与 slots 一一对应"""
+        values = np.column_stack([values[name] for name in TICK_COLUMNS])
+        with self._tick_lock:
+            positions = self._tick_pos[slots]
+            self._ticks[slots, positions] = values
+            self._tick_pos[slots] = (positions + 1) % self.history
+            self._tick_count[slots] = np.minimum(self._tick_count[slots] + 1, self.history)
+
+    def get_latest(self, stock_code: str) -> Optional[Dict]:
+        """单只股票的最新行情"""
+        frame = self._frame
+        slot = self._slots.get(stock_code)
+        if slot is None or slot >= frame.count or not frame.slot_versions[slot]:
+            return None
+        return frame.record(slot)
+
+    def get_all(self) -> List[Dict]:
+        """全部股票的最新行情"""
+        frame = self._frame
+        return frame.records(frame.changed_slots())
+
+    def changes_since(self, version: int) -> Tuple[int, List[Dict]]:
+        """指定版本之后发生变化的股票，返回 (当前版本, 行情列表)"""
+        frame = self._frame
+        return frame.version, frame.records(frame.changed_slots(version))
+
+    def get_ticks(self, stock_code: str, limit: Optional[int] = None) -> List[Dict]:
+        """单只股票最近的逐笔，按时间升序"""
+        slot = self._slots.get(stock_code)
+        if slot is None:
+            return []
+        with self._tick_lock:
+            count = int(self._tick_count[slot])
+            order = (self._tick_pos[slot] - count + np.arange(count)) % self.history
+            values = self._ticks[slot, order]
+        if limit is not None:
+            values = values[-limit:]
+        return [dict(zip(TICK_COLUMNS, row)) for row in values.tolist()]
+
+    def __len__(self) -> int:
+        return self._frame.count
+
+_default_store: Optional[RealtimeStore] = None
+_default_lock = threading.Lock()
+
+def get_realtime_store() -> RealtimeStore:
+    """进程内共享的实时行情表（采集器写入，API 读取）"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = RealtimeStore()
+        return _default_store
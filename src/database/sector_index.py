@@ -0,0 +1,147 @@
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from .db_manager import DatabaseManager
+
+class SectorIndex:
+    """板块成分的只读内存索引，构建后不再修改，可在线程间共享
+
+    正向 CSR（行是板块、列是股票）：第 i 个板块的成分股为
+    stock_codes[indices[indptr[i]:indptr[i + 1]]]，entry_sectors 是每个非零元素所在的
+    板块行号，用于 np.bincount 做按板块求和；反向 CSR 记录每只股票所属的板块。
+    板块和股票代码各自映射为连续整数，两个方向的查询都是 O(1) 定位加一次切片。
+    """
+    def __init__(self, sector_codes: List[str], sector_names: List[str], sector_types: List[str],
+                 stock_codes: List[str], stock_names: List[str], indptr: np.ndarray, indices: np.ndarray,
+                 weights: np.ndarray, leaders: np.ndarray):
+        self.sector_codes = sector_codes
+        self.sector_names = sector_names
+        self.sector_types = np.asarray(sector_types, dtype=object)
+        self.stock_codes = stock_codes
+        self.stock_names = stock_names
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.leaders = leaders
+        self.sector_ids: Dict[str, int] = {code: i for i, code in enumerate(sector_codes)}
+        self.stock_ids: Dict[str, int] = {code: i for i, code in enumerate(stock_codes)}
+        self.entry_sectors = np.repeat(np.arange(len(sector_codes), dtype=np.int32), np.diff(indptr))
+
+        # 反向 CSR：按股票稳定排序，同一股票的板块保持板块代码顺序
+        order = np.argsort(indices, kind='stable')
+        self.stock_indptr = np.zeros(len(stock_codes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(indices, minlength=len(stock_codes)), out=self.stock_indptr[1:])
+        self.stock_sectors = self.entry_sectors[order]
+        self.stock_entries = order
+
+        self.type_sectors: Dict[str, np.ndarray] = {
+            sector_type: np.flatnonzero(self.sector_types == sector_type)
+            for sector_type in dict.fromkeys(sector_types)
+        }
+        for array in (self.indptr, self.indices, self.weights, self.leaders, self.entry_sectors,
+                      self.stock_indptr, self.stock_sectors, self.stock_entries, *self.type_sectors.values()):
+            array.flags.writeable = False
+
+    @property
+    def sector_count(self) -> int:
+        return len(self.sector_codes)
+
+    @property
+    def stock_count(self) -> int:
+        return len(self.stock_codes)
+
+    def sector_rows(self, sector_type: str) -> np.ndarray:
+        """某类板块的行号"""
+        return self.type_sectors.get(sector_type, np.empty(0, dtype=np.int64))
+
+    def stock_rows(self, sector_code: str) -> np.ndarray:
+        """板块成分股的股票编号"""
+        row = self.sector_ids.get(sector_code)
+        if row is None:
+            return np.empty(0, dtype=self.indices.dtype)
+        return self.indices[self.indptr[row]:self.indptr[row + 1]]
+
+    def sectors_of_rows(self, stock_code: str) -> np.ndarray:
+        """股票所属板块的行号"""
+        stock = self.stock_ids.get(stock_code)
+        if stock is None:
+            return np.empty(0, dtype=self.stock_sectors.dtype)
+        return self.stock_sectors[self.stock_indptr[stock]:self.stock_indptr[stock + 1]]
+
+    def get_sectors_by_type(self, sector_type: str) -> List[Dict]:
+        """与 DatabaseManager.get_sectors_by_type 字段相同（stock_count 为实际成分数），不访问数据库"""
+        counts = np.diff(self.indptr)
+        return [{'sector_code': self.sector_codes[row], 'sector_name': self.sector_names[row],
+                 'stock_count': int(counts[row])} for row in self.sector_rows(sector_type).tolist()]
+
+    def get_sector_stocks(self, sector_code: str) -> List[Dict]:
+        """与 DatabaseManager.get_sector_stocks 字段相同，不访问数据库"""
+        row = self.sector_ids.get(sector_code)
+        if row is None:
+            return []
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return [{'stock_code': self.stock_codes[stock], 'stock_name': self.stock_names[stock],
+                 'weight': weight, 'is_leader': int(leader)}
+                for stock, weight, leader in zip(self.indices[start:end].tolist(),
+                                                 self.weights[start:end].tolist(),
+                                                 self.leaders[start:end].tolist())]
+
+    def get_stock_sectors(self, stock_code: str, sector_type: Optional[str] = None) -> List[Dict]:
+        """股票所属的板块，可按板块类型过滤"""
+        return [{'sector_code': self.sector_codes[row], 'sector_name': self.sector_names[row],
+                 'sector_type': self.sector_types[row]}
+                for row in self.sectors_of_rows(stock_code).tolist()
+                if sector_type is None or self.sector_types[row] == sector_type]
+
+    @classmethod
+    def load(cls, db: DatabaseManager = None) -> 'SectorIndex':
+        """从 stock_sector / stock_sector_relation 构建索引"""
+        db = db or DatabaseManager()
+        with db.read_connection() as conn:
+            sectors = conn.execute('''
+            SELECT sector_code, sector_name, sector_type FROM stock_sector ORDER BY sector_code
+            ''').fetchall()
+            relations = conn.execute('''
+            SELECT r.sector_code, r.stock_code, r.stock_name, r.weight, r.is_leader
+            FROM stock_sector_relation r JOIN stock_sector s ON s.sector_code = r.sector_code
+            ORDER BY r.sector_code, r.stock_code
+            ''').fetchall()
+
+        sector_codes = [row[0] for row in sectors]
+        sector_ids = {code: i for i, code in enumerate(sector_codes)}
+        rows = np.fromiter((sector_ids[row[0]] for row in relations), dtype=np.int64, count=len(relations))
+        stock_names: Dict[str, str] = {}
+        for row in relations:
+            stock_names.setdefault(row[1], row[2])
+        stock_codes = sorted(stock_names)
+        stock_ids = {code: i for i, code in enumerate(stock_codes)}
+        columns = np.fromiter((stock_ids[row[1]] for row in relations), dtype=np.int32, count=len(relations))
+        weights = np.array([1.0 if row[3] is None else row[3] for row in relations], dtype=np.float32)
+        leaders = np.array([bool(row[4]) for row in relations], dtype=bool)
+
+        indptr = np.zeros(len(sector_codes) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(rows, minlength=len(sector_codes)), out=indptr[1:])
+        return cls(sector_codes, [row[1] for row in sectors], [row[2] for row in sectors],
+                   stock_codes, [stock_names[code] for code in stock_codes], indptr, columns, weights, leaders)
+
+# 按数据库路径保存当前索引；重建时先完整构建新索引，再一次性替换引用
+_indexes: Dict[str, SectorIndex] = {}
+_indexes_lock = threading.Lock()
+
+def get_sector_index(db: DatabaseManager = None) -> SectorIndex:
+    """当前的板块索引，首次使用时从数据库构建"""
+    db = db or DatabaseManager()
+    index = _indexes.get(db.db_path)
+    if index is None:
+        index = rebuild_sector_index(db)
+    return index
+
+def rebuild_sector_index(db: DatabaseManager = None) -> SectorIndex:
+    """重新构建板块索引并替换当前索引，已经拿到旧索引的读取方不受影响"""
+    db = db or DatabaseManager()
+    with _indexes_lock:
+        index = SectorIndex.load(db)
+        _indexes[db.db_path] = index
+    return index
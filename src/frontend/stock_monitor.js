@@ -1,27 +1,70 @@
 class StockMonitor {
     constructor() {
-        this.eventSource = new EventSource('http://localhost:5000/api/realtime');
+        // 以股票代码为键保存最新行情，快照整体替换，增量只合并变化的字段
+        this.stocks = new Map();
+        this.version = 0;
+        // 断线后浏览器自动重连并带上 Last-Event-ID，服务端只补发缺少的增量；
+        // 页面地址的 codes / sectors / fields / format 参数原样作为订阅条件
+        this.eventSource = new EventSource('http://localhost:5001/api/realtime' + window.location.search);
         this.setupEventListeners();
     }
-    
+
     setupEventListeners() {
-        this.eventSource.onmessage = (event) => {
+        this.eventSource.addEventListener('snapshot', (event) => {
             const data = JSON.parse(event.data);
-            this.updateUI(data);
-        };
-        
+            this.stocks.clear();
+            this.applyRows(data.rows);
+            this.version = data.version;
+            this.updateUI();
+        });
+
+        this.eventSource.addEventListener('delta', (event) => {
+            const data = JSON.parse(event.data);
+            this.applyRows(data.rows);
+            this.version = data.version;
+            this.updateUI();
+        });
+
+        this.eventSource.addEventListener('alert', (event) => {
+            JSON.parse(event.data).forEach(alert => {
+                console.info(`预警: ${alert.stock_code} ${alert.field} ${alert.direction} ${alert.threshold}`, alert);
+            });
+        });
+
         this.eventSource.onerror = (error) => {
-            console.error('SSE错误:', error);
-            this.eventSource.close();
+            console.error('SSE错误，等待自动重连:', error);
         };
     }
-    
-    updateUI(data) {
+
+    applyRows(rows) {
+        // format=columns 时快照为 {fields, values}（按列），先还原为逐行对象；增量始终逐行
+        if (!Array.isArray(rows)) {
+            const {fields, values} = rows;
+            const count = values.length ? values[0].length : 0;
+            const decoded = [];
+            for (let i = 0; i < count; i++) {
+                const row = {};
+                fields.forEach((field, j) => { row[field] = values[j][i]; });
+                decoded.push(row);
+            }
+            rows = decoded;
+        }
+        rows.forEach(row => {
+            const stock = this.stocks.get(row.stock_code);
+            if (stock) {
+                Object.assign(stock, row);
+            } else {
+                this.stocks.set(row.stock_code, row);
+            }
+        });
+    }
+
+    updateUI() {
         // 更新股票列表
         const stockList = document.getElementById('stock-list');
         stockList.innerHTML = '';
-        
-        data.forEach(stock => {
+
+        this.stocks.forEach(stock => {
             const row = document.createElement('div');
             row.className = 'stock-row';
             row.innerHTML = `
@@ -38,4 +81,4 @@ class StockMonitor {
 }
 
 // 启动监控
-const monitor = new StockMonitor(); 
\ No newline at end of file
+const monitor = new StockMonitor();
@@ -1,6 +1,7 @@
 from data_collector.stock_collector import StockCollector
 from data_collector.sector_loader import SectorLoader
 from api.sse_server import start_server
+from api.stream_server import start_stream_server
 from database.models import init_database
 import threading
 
@@ -20,6 +21,9 @@ def main():
     collector_thread.daemon = True
     collector_thread.start()
     
+    # 启动实时行情推送服务（asyncio，单一生产者广播给所有连接）
+    start_stream_server()
+    
     # 启动SSE服务器
     start_server()
 
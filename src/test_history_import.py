@@ -5,6 +5,8 @@ import sys
 project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 sys.path.insert(0, project_dir)
 
+import argparse
+from src.database.db_manager import DatabaseManager
 from src.database.models import init_database
 from src.data_collector.history_loader import HistoryLoader
 import logging
@@ -15,18 +17,42 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
+def parse_args():
+    """命令行参数，未指定时读取环境变量，都没有则使用默认的 E: 盘目录"""
+    parser = argparse.ArgumentParser(description="导入通达信历史K线数据")
+    parser.add_argument('--data-root', default=os.environ.get('TDX_DATA_ROOT'),
+                        help="包含 daily/5min/1min 子目录的数据根目录（环境变量 TDX_DATA_ROOT）")
+    for data_type in ('daily', '5min', '1min'):
+        parser.add_argument(f'--{data_type}', dest=f'path_{data_type}',
+                            default=os.environ.get(f'TDX_{data_type.upper()}_PATH'),
+                            help=f"{data_type} 数据目录（环境变量 TDX_{data_type.upper()}_PATH）")
+    parser.add_argument('--db', default=os.environ.get('STOCK_DB_PATH', 'stock_analysis.db'),
+                        help="数据库文件（环境变量 STOCK_DB_PATH）")
+    parser.add_argument('--bulk', action='store_true', help="使用多进程批量导入")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     try:
+        data_paths = {}
+        for data_type in ('daily', '5min', '1min'):
+            path = getattr(args, f'path_{data_type}')
+            if path is None and args.data_root:
+                path = os.path.join(args.data_root, data_type)
+            if path:
+                data_paths[data_type] = path
+        
         # 初始化数据库
         logging.info("初始化数据库...")
-        init_database()
+        db = DatabaseManager(args.db)
+        init_database(db.db_path)
         
         # 创建历史数据加载器
-        loader = HistoryLoader()
+        loader = HistoryLoader(data_paths, db)
         
         # 加载历史数据
         logging.info("开始加载历史数据...")
-        loader.load_history_data()
+        loader.load_history_data(bulk=args.bulk)
         
         logging.info("历史数据加载完成!")
         
@@ -1,8 +1,15 @@
+import argparse
+import os
+import sys
+
+# 添加项目根目录到 Python 路径
+project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, project_dir)
+
 from src.database.models import init_database
 from src.data_collector.sector_loader import SectorLoader
 from src.database.db_manager import DatabaseManager
 import logging
-import os
 
 # 配置日志
 logging.basicConfig(
@@ -10,9 +17,8 @@ logging.basicConfig(
     format='%(asctime)s - %(levelname)s - %(message)s'
 )
 
-def process_sector_file(file_path: str, sector_type: str):
+def process_sector_file(file_path: str, sector_type: str, db: DatabaseManager):
     """处理单个板块文件"""
-    db = DatabaseManager()
     current_sector = None
     
     # 尝试不同的编码
@@ -78,14 +84,25 @@ def process_sector_file(file_path: str, sector_type: str):
     logging.error(f"所有编码尝试都失败，无法读取文件 {file_path}")
     return False
 
+def parse_args():
+    """命令行参数，未指定时读取环境变量，都没有则使用默认的 E: 盘目录"""
+    parser = argparse.ArgumentParser(description="导入通达信板块数据")
+    parser.add_argument('--data-path', default=os.environ.get('SECTOR_DATA_PATH', "E:\\ztdatabase\\bankuaiDATA"),
+                        help="板块文件目录（环境变量 SECTOR_DATA_PATH）")
+    parser.add_argument('--db', default=os.environ.get('STOCK_DB_PATH', 'stock_analysis.db'),
+                        help="数据库文件（环境变量 STOCK_DB_PATH）")
+    return parser.parse_args()
+
 def main():
+    args = parse_args()
     try:
         # 初始化数据库
         logging.info("初始化数据库...")
-        init_database()
+        db = DatabaseManager(args.db)
+        init_database(db.db_path)
         
         # 板块文件目录
-        data_path = "E:\\ztdatabase\\bankuaiDATA"
+        data_path = args.data_path
         
         # 板块类型映射
         sector_type_map = {
@@ -103,13 +120,12 @@ def main():
                 sector_type = sector_type_map[filename]
                 
                 logging.info(f"开始处理 {filename}...")
-                if process_sector_file(file_path, sector_type):
+                if process_sector_file(file_path, sector_type, db):
                     logging.info(f"成功处理 {filename}")
                 else:
                     logging.error(f"处理 {filename} 失败")
         
         # 验证导入结果
-        db = DatabaseManager()
         for sector_type in sector_type_map.values():
             sectors = db.get_sectors_by_type(sector_type)
             logging.info(f"{sector_type} 板块数量: {len(sectors)}")
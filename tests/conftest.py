@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# 添加项目根目录到 Python 路径，直接运行 pytest 时也能导入 src
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.database.db_manager import DatabaseManager
+from src.database.models import init_database
+
+@pytest.fixture
+def db(tmp_path):
+    """临时目录中已建表的数据库"""
+    path = str(tmp_path / 'stock_analysis.db')
+    init_database(path)
+    return DatabaseManager(path)
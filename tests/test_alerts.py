@@ -0,0 +1,111 @@
+import threading
+
+import pytest
+
+from src.analysis.alerts import AlertEngine, AlertEventStream
+from src.database.realtime_store import RealtimeStore
+
+def quote(code, current, volume=100):
+    return {'code': code, 'name': '浦发银行', 'current': current, 'open': 10.0, 'high': current,
+            'low': 10.0, 'prev_close': 10.0, 'volume': volume, 'amount': current * volume}
+
+def tick(engine, store, timestamp, *rows):
+    store.update(list(rows), timestamp)
+    return engine.evaluate(rows, timestamp)
+
+def test_fires_only_on_crossing():
+    store = RealtimeStore(capacity=16)
+    engine = AlertEngine(store)
+    alert_id = engine.add_alert('600000', 'price', 'above', 10.5, cooldown=0)
+
+    # 第一笔行情只记录基准，即使已经在阈值之上也不触发
+    assert tick(engine, store, 1.0, quote('600000', 10.6)) == []
+    assert tick(engine, store, 2.0, quote('600000', 10.4)) == []
+    events = tick(engine, store, 3.0, quote('600000', 10.5))
+    assert [(event['alert_id'], event['prev_value'], event['value']) for event in events] == [(alert_id, 10.4, 10.5)]
+    assert events[0]['stock_name'] == '浦发银行'
+    # 保持在阈值之上不是新的穿越
+    assert tick(engine, store, 4.0, quote('600000', 10.7)) == []
+
+def test_below_direction_and_other_symbols_ignored():
+    store = RealtimeStore(capacity=16)
+    engine = AlertEngine(store)
+    engine.add_alert('600000', 'change_percent', 'below', -2.0, cooldown=0)
+    tick(engine, store, 1.0, quote('600000', 10.0), quote('000001', 10.0))
+    assert tick(engine, store, 2.0, quote('000001', 9.0)) == []
+    events = tick(engine, store, 3.0, quote('600000', 9.7))
+    assert [event['field'] for event in events] == ['change_percent']
+
+def test_cooldown_suppresses_repeat():
+    store = RealtimeStore(capacity=16)
+    engine = AlertEngine(store)
+    engine.add_alert('600000', 'price', 'above', 10.5, cooldown=60)
+    tick(engine, store, 0.0, quote('600000', 10.0))
+    assert len(tick(engine, store, 10.0, quote('600000', 10.6))) == 1
+    tick(engine, store, 20.0, quote('600000', 10.0))
+    assert tick(engine, store, 30.0, quote('600000', 10.6)) == []
+    tick(engine, store, 80.0, quote('600000', 10.0))
+    assert len(tick(engine, store, 90.0, quote('600000', 10.6))) == 1
+
+def test_once_alert_deactivates():
+    store = RealtimeStore(capacity=16)
+    engine = AlertEngine(store)
+    alert_id = engine.add_alert('600000', 'volume', 'above', 500, cooldown=0, once=True)
+    tick(engine, store, 0.0, quote('600000', 10.0, volume=100))
+    assert len(tick(engine, store, 1.0, quote('600000', 10.0, volume=600))) == 1
+    assert engine.list_alerts('600000')[0]['active'] is False
+
+    # 增删规则后保留触发状态和上一笔的值
+    engine.add_alert('600000', 'price', 'above', 10.5, cooldown=0)
+    tick(engine, store, 2.0, quote('600000', 10.0, volume=100))
+    events = tick(engine, store, 3.0, quote('600000', 10.6, volume=700))
+    assert [event['field'] for event in events] == ['price']
+    assert engine.remove_alert(alert_id)
+    assert not engine.remove_alert(alert_id)
+    assert [alert['field'] for alert in engine.list_alerts()] == ['price']
+
+def test_invalid_rule_rejected():
+    engine = AlertEngine(RealtimeStore(capacity=16))
+    with pytest.raises(ValueError):
+        engine.add_alert('600000', 'turnover', 'above', 1.0)
+    with pytest.raises(ValueError):
+        engine.add_alert('600000', 'price', 'cross', 1.0)
+
+def test_event_stream_since():
+    stream = AlertEventStream(capacity=3)
+    assert stream.since(0) == (0, [])
+    stream.publish([{'n': i} for i in range(5)])
+    seq, events = stream.since(0)
+    # 超出容量的旧事件已被淘汰
+    assert seq == 5
+    assert [event['seq'] for event in events] == [3, 4, 5]
+    assert [event['seq'] for event in stream.since(4)[1]] == [5]
+    assert stream.since(5) == (5, [])
+
+def test_rules_can_change_while_evaluating():
+    store = RealtimeStore(capacity=64)
+    engine = AlertEngine(store)
+    codes = [f"{i:06d}" for i in range(20)]
+    stop = threading.Event()
+    errors = []
+
+    def manage():
+        try:
+            while not stop.is_set():
+                ids = [engine.add_alert(code, 'price', 'above', 10.5, cooldown=0) for code in codes]
+                engine.list_alerts()
+                for alert_id in ids:
+                    engine.remove_alert(alert_id)
+        except Exception as e:
+            errors.append(e)
+
+    worker = threading.Thread(target=manage)
+    worker.start()
+    try:
+        for i in range(200):
+            tick(engine, store, float(i), *[quote(code, 10.0 + (i % 2)) for code in codes])
+    finally:
+        stop.set()
+        worker.join()
+    assert errors == []
+    assert engine.list_alerts() == []
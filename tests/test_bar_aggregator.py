@@ -0,0 +1,53 @@
+from src.analysis.trading_session import tick_session_minute
+from src.data_collector.bar_aggregator import BarAggregator
+
+def quote(time, current, volume, amount, code='600000'):
+    return {'code': code, 'name': '浦发银行', 'time': time, 'current': current,
+            'volume': volume, 'amount': amount}
+
+def test_tick_time_maps_to_next_minute_bar():
+    assert tick_session_minute(930) == 1
+    assert tick_session_minute(1129) == 120
+    # 午休和收盘后的成交归入前一根K线
+    assert tick_session_minute(1130) == 120
+    assert tick_session_minute(1300) == 121
+    assert tick_session_minute(1500) == 240
+
+def test_completed_bars_are_written_when_minute_rolls(db):
+    bars = BarAggregator(db, trade_date='2024-01-03')
+    bars.update([quote('09:30:10', 10.0, 100, 1000.0)])
+    bars.update([quote('09:30:40', 10.2, 150, 1510.0)])
+    assert db.get_bars('600000', '1min')['time'].tolist() == []
+
+    bars.update([quote('09:31:05', 9.9, 200, 2005.0)])
+    written = db.get_bars('600000', '1min')
+    assert written['time'].tolist() == [202401030931]
+    assert (written['open'][0], written['high'][0], written['low'][0], written['close'][0]) == (10.0, 10.2, 10.0, 10.2)
+    assert written['volume'][0] == 150
+
+    assert bars.get_forming('600000') == {'time': 202401030932, 'open': 9.9, 'high': 9.9, 'low': 9.9,
+                                          'close': 9.9, 'volume': 50, 'amount': 495.0}
+    five = bars.get_forming('600000', '5min')
+    assert (five['time'], five['high'], five['low'], five['volume']) == (202401030935, 10.2, 9.9, 200)
+
+    assert bars.finish() == 2
+    assert db.get_bars('600000', '1min')['time'].tolist() == [202401030931, 202401030932]
+    assert db.get_bars('600000', '5min')['volume'].tolist() == [200]
+    assert bars.get_forming('600000') is None
+
+def test_first_tick_mid_session_only_sets_baseline(db):
+    bars = BarAggregator(db, auto_flush=False, trade_date='2024-01-03')
+    bars.update([quote('10:00:10', 10.0, 5000, 50000.0)])
+    assert bars.get_forming('600000')['volume'] == 0
+    bars.update([quote('10:00:30', 10.1, 5100, 51010.0)])
+    assert bars.get_forming('600000')['volume'] == 100
+
+def test_late_tick_goes_to_forming_bar(db):
+    bars = BarAggregator(db, auto_flush=False, trade_date='2024-01-03')
+    bars.update([quote('09:30:10', 10.0, 100, 1000.0, code='600000'),
+                 quote('09:31:10', 5.0, 10, 50.0, code='000001')])
+    # 000001 已把市场时间推进到 0932，600000 晚到的 09:30 行情不再修改已完成的 0931
+    bars.update([quote('09:30:50', 10.3, 120, 1236.0, code='600000')])
+    assert bars.get_forming('600000')['time'] == 202401030932
+    assert bars.get_forming('600000')['volume'] == 20
+    assert bars.get_stats()['pending'] == 1
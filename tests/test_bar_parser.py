@@ -0,0 +1,46 @@
+from src.data_collector.bar_parser import BarFileParser, parse_date, parse_time
+
+def write_file(path, header, rows):
+    lines = [header, "      日期\t    时间\t    开盘\t    最高\t    最低\t    收盘\t    成交量\t    成交额"] + rows
+    lines.append("数据来源:通达信")
+    path.write_bytes(('\r\n'.join(lines) + '\r\n').encode('gbk'))
+
+def test_parse_date_and_time():
+    assert parse_date(b'2024/2/3') == '2024-02-03'
+    assert parse_time(b'0931') == '09:31:00'
+    assert parse_time(b'1500') == '15:00:00'
+
+def test_minute_rows_in_chunks(tmp_path):
+    path = tmp_path / 'SH#600000.txt'
+    rows = [f"2024/02/13\t{930 + i:04d}\t10.00\t10.10\t9.90\t10.05\t1.2e+03\t12060.00" for i in range(1, 6)]
+    write_file(path, '600000 浦发银行 1分钟线 不复权', rows)
+    parser = BarFileParser(str(path), '1min', chunk_size=2)
+    chunks = list(parser.iter_chunks())
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
+    first = chunks[0][0]
+    assert first == ('600000', '浦发银行', '2024-02-13', '09:31:00', 10.0, 10.1, 9.9, 10.05, 1200, 12060.0)
+    # 所有行共享同一个代码和名称对象
+    assert all(row[0] is first[0] and row[1] is first[1] for chunk in chunks for row in chunk)
+    assert parser.rows_parsed == 5
+    assert parser.header['data_type'] == '1分钟线'
+
+def test_daily_rows_skip_bad_lines(tmp_path):
+    path = tmp_path / 'SZ#000001.txt'
+    write_file(path, '000001 平安银行 日线 不复权', [
+        "2024/02/08\t9.00\t9.20\t8.90\t9.10\t500\t4550.00",
+        "2024/02/09\tbad\t9.20\t8.90\t9.10\t500\t4550.00",
+        "",
+        "2024/02/19\t9.10\t9.30\t9.00\t9.20\t600\t5520.00",
+    ])
+    parser = BarFileParser(str(path), 'daily')
+    rows = list(parser.iter_rows())
+    assert [row[2] for row in rows] == ['2024-02-08', '2024-02-19']
+    assert rows[1][3:] == (9.1, 9.3, 9.0, 9.2, 600, 5520.0)
+    assert parser.rows_failed == 1
+
+def test_missing_header_yields_nothing(tmp_path):
+    path = tmp_path / 'SH#600000.txt'
+    path.write_bytes(b'\r\n')
+    parser = BarFileParser(str(path), 'daily')
+    assert list(parser.iter_rows()) == []
+    assert parser.header is None
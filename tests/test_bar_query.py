@@ -0,0 +1,75 @@
+import json
+
+import pytest
+
+from src.api.bar_query import BarQueryService
+
+def daily_rows(days, code='600000'):
+    return [(code, '浦发银行', f'2024-01-{day:02d}', float(day), day + 0.5, day - 0.5, float(day), 100, 1000.0)
+            for day in days]
+
+@pytest.fixture
+def service(db):
+    db.save_daily_data(daily_rows(range(2, 12)))
+    return BarQueryService(db)
+
+def page(service, *args, **kwargs):
+    return json.loads(service.get_page('600000', 'daily', *args, **kwargs))
+
+def test_pages_follow_next_cursor(service):
+    first = page(service, limit=4)
+    assert first['count'] == 4
+    assert [bar['time'] for bar in first['bars']] == [202401020000, 202401030000, 202401040000, 202401050000]
+    assert first['next'] == 202401050000
+
+    second = page(service, after=first['next'], limit=4)
+    third = page(service, after=second['next'], limit=4)
+    assert [bar['time'] // 10000 for bar in second['bars']] == [20240106, 20240107, 20240108, 20240109]
+    assert [bar['time'] // 10000 for bar in third['bars']] == [20240110, 20240111]
+    assert third['next'] is None
+    assert third['bars'][-1] == {'time': 202401110000, 'open': 11.0, 'high': 11.5, 'low': 10.5,
+                                 'close': 11.0, 'volume': 100, 'amount': 1000.0}
+
+def test_range_bounds_and_invalid_limit(service):
+    bars = page(service, start='2024-01-05', end='2024-01-07')['bars']
+    assert [bar['time'] // 10000 for bar in bars] == [20240105, 20240106, 20240107]
+    with pytest.raises(ValueError):
+        service.get_page('600000', 'daily', limit=0)
+    with pytest.raises(ValueError):
+        service.get_page('600000', 'yearly')
+
+def test_etag_changes_only_on_write(service, db):
+    etag = service.etag('600000', 'daily')
+    # 没有写入时 ETag 不变，路由据此直接返回 304
+    assert service.etag('600000', 'daily') == etag
+    assert service.etag('600000', 'weekly') == etag
+    assert service.etag('600000', '1min') != etag
+
+    # 覆盖写入历史K线不改变最后一根的时间，由写入代数区分
+    db.save_daily_data(daily_rows([5]))
+    rewritten = service.etag('600000', 'daily')
+    assert rewritten != etag
+    db.save_daily_data(daily_rows([12]))
+    assert service.etag('600000', 'daily') not in (etag, rewritten)
+
+def test_closed_pages_cached_until_written(service, db):
+    payload = service.get_page('600000', 'daily', limit=4)
+    assert service.get_page('600000', 'daily', limit=4) is payload
+    # 最后一页还会追加新K线，不缓存
+    service.get_page('600000', 'daily', after=202401090000)
+    service.get_page('600000', 'daily', after=202401090000)
+    stats = service.cache_stats()
+    assert (stats['entries'], stats['hits'], stats['misses']) == (1, 1, 3)
+
+    db.save_daily_data(daily_rows([3]))
+    assert service.cache_stats()['entries'] == 0
+    assert service.get_page('600000', 'daily', limit=4) is not payload
+
+def test_formats_have_own_etag_and_cache_entry(service):
+    assert service.etag('600000', 'daily', 'columns') != service.etag('600000', 'daily')
+    body = json.loads(service.get_page('600000', 'daily', limit=2, fmt='columns'))
+    assert body['next'] == 202401030000
+    assert body['bars']['fields'][:2] == ['time', 'open']
+    assert body['bars']['values'][0] == [202401020000, 202401030000]
+    assert page(service, limit=2)['bars'][0]['time'] == 202401020000
+    assert service.cache_stats()['entries'] == 2
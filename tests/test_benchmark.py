@@ -0,0 +1,62 @@
+import json
+import sqlite3
+
+from src.benchmark.data_generator import generate_sector_data, generate_tdx_data, make_stocks
+from src.benchmark.run_benchmark import Benchmark, load_previous
+from src.data_collector.history_loader import HistoryLoader
+from src.data_collector.sector_loader import SectorLoader
+
+DAY_COUNTS = {'daily': 3, '5min': 1, '1min': 1}
+
+def count(db, table):
+    with sqlite3.connect(db.db_path) as conn:
+        return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+def test_stock_codes_are_unique_and_deterministic():
+    stocks = make_stocks(20, seed=3)
+    assert len(stocks) == 20
+    assert len({code for _, code, _ in stocks}) == 20
+    assert stocks == make_stocks(20, seed=3)
+
+def test_generated_bars_import_completely(tmp_path, db):
+    totals = generate_tdx_data(str(tmp_path), stock_count=5, day_counts=DAY_COUNTS)
+    assert totals == {'daily': 15, '5min': 5 * 48, '1min': 5 * 240}
+
+    loader = HistoryLoader({data_type: str(tmp_path / data_type) for data_type in DAY_COUNTS}, db)
+    loader.load_history_data()
+    assert count(db, 'stock_daily') == 15
+    assert count(db, 'stock_5min') == 240
+    assert count(db, 'stock_1min') == 1200
+
+def test_generated_sectors_import(tmp_path, db):
+    total = generate_sector_data(str(tmp_path), stock_count=10, sectors_per_file=2, stocks_per_sector=4)
+    assert total == 5 * 2 * 4
+
+    SectorLoader(str(tmp_path), db).load_all_sectors()
+    assert count(db, 'stock_sector') == 10
+    assert count(db, 'stock_sector_relation') == total
+
+def test_benchmark_run_reports_every_phase(tmp_path):
+    benchmark = Benchmark(str(tmp_path), stock_count=3, day_counts=DAY_COUNTS,
+                          sectors_per_file=1, bulk=False)
+    results = {result['phase']: result for result in benchmark.run()}
+
+    assert results['import_daily']['rows'] == 9
+    assert results['reimport_1min']['rows'] == 3
+    assert results['realtime_write']['rows'] == 60
+    assert 'resample_15min' in results
+    assert all(result['db_size_bytes'] > 0 for phase, result in results.items()
+               if not phase.startswith('generate'))
+
+def test_load_previous_matches_scale(tmp_path):
+    path = tmp_path / 'results.jsonl'
+    records = [
+        {'timestamp': '1', 'scale': {'stocks': 10}, 'results': []},
+        {'timestamp': '2', 'scale': {'stocks': 20}, 'results': []},
+        {'timestamp': '3', 'scale': {'stocks': 10}, 'results': []},
+    ]
+    path.write_text(''.join(json.dumps(record) + '\n' for record in records), encoding='utf-8')
+
+    assert load_previous(str(path), {'stocks': 10})['timestamp'] == '3'
+    assert load_previous(str(path), {'stocks': 30}) is None
+    assert load_previous(str(tmp_path / 'missing.jsonl'), {'stocks': 10}) is None
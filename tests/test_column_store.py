@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from src.database.bar_keys import pack_bar_time, to_bar_time, unpack_date, unpack_time
+from src.database.column_store import ColumnarBarStore
+from src.database.db_manager import DatabaseManager
+
+def columns(times, close=None):
+    count = len(times)
+    close = close if close is not None else [float(i) for i in range(count)]
+    return {
+        'time': times,
+        'open': close,
+        'high': close,
+        'low': close,
+        'close': close,
+        'volume': [100] * count,
+        'amount': [1000.0] * count
+    }
+
+def test_bar_keys_round_trip():
+    assert pack_bar_time('2024-02-13', '09:31:00') == 202402130931
+    assert pack_bar_time('2024-02-13') == 202402130000
+    assert unpack_date(20240213) == '2024-02-13'
+    assert unpack_time(931) == '09:31:00'
+    assert to_bar_time(20240213) == 202402130000
+    assert to_bar_time(20240213, end=True) == 202402139999
+    assert to_bar_time('2024-02-13 09:31') == 202402130931
+    assert to_bar_time(None) is None
+
+def test_append_and_range_query(tmp_path):
+    store = ColumnarBarStore(str(tmp_path))
+    store.append('600000', 'daily', columns([202401020000, 202401030000, 202401040000]))
+
+    bars = store.get_bars('600000', 'daily', '2024-01-03', '2024-01-04')
+    assert bars['time'].tolist() == [202401030000, 202401040000]
+    assert bars['close'].tolist() == [1.0, 2.0]
+    # 结果是映射文件上的视图
+    assert isinstance(bars['close'].base, np.memmap) or isinstance(bars['close'], np.memmap)
+    assert store.last_time('600000', 'daily') == 202401040000
+    assert store.symbols('daily') == ['600000']
+
+def test_tail_append_remaps(tmp_path):
+    store = ColumnarBarStore(str(tmp_path))
+    store.append('600000', 'daily', columns([202401020000, 202401030000]))
+    assert len(store.get_bars('600000', 'daily')['time']) == 2
+
+    store.append('600000', 'daily', columns([202401040000], [9.0]))
+    bars = store.get_bars('600000', 'daily')
+    assert bars['time'].tolist() == [202401020000, 202401030000, 202401040000]
+    assert bars['close'][-1] == 9.0
+
+def test_overlapping_append_merges_and_prefers_new(tmp_path):
+    store = ColumnarBarStore(str(tmp_path))
+    store.append('600000', 'daily', columns([202401020000, 202401040000], [1.0, 2.0]))
+    store.append('600000', 'daily', columns([202401040000, 202401030000], [5.0, 3.0]))
+
+    bars = store.get_bars('600000', 'daily')
+    assert bars['time'].tolist() == [202401020000, 202401030000, 202401040000]
+    assert bars['close'].tolist() == [1.0, 3.0, 5.0]
+
+def test_truncated_write_uses_shortest_field(tmp_path):
+    store = ColumnarBarStore(str(tmp_path))
+    store.append('600000', 'daily', columns([202401020000, 202401030000]))
+    # 模拟写入中断：time 文件比其他字段多出一条记录
+    with open(tmp_path / 'daily' / '600000' / 'time.bin', 'ab') as f:
+        f.write(b'\x00' * 8)
+
+    reopened = ColumnarBarStore(str(tmp_path))
+    assert len(reopened.get_bars('600000', 'daily')['time']) == 2
+    reopened.append('600000', 'daily', columns([202401040000]))
+    assert reopened.get_bars('600000', 'daily')['time'].tolist() == [
+        202401020000, 202401030000, 202401040000]
+
+def test_unknown_frequency_rejected(tmp_path):
+    store = ColumnarBarStore(str(tmp_path))
+    with pytest.raises(ValueError):
+        store.get_bars('600000', '15min')
+
+def test_db_manager_syncs_columnar_store(tmp_path, db):
+    manager = DatabaseManager(db.db_path, column_store_path=str(tmp_path / 'bars'))
+    manager.save_1min_data([
+        ('600000', '浦发银行', '2024-01-02', '09:31:00', 10.0, 10.5, 9.9, 10.2, 100, 1000.0),
+        ('600000', '浦发银行', '2024-01-02', '09:32:00', 10.2, 10.6, 10.1, 10.4, 200, 2000.0),
+    ])
+
+    columnar = manager.get_bars('600000', '1min', '2024-01-02 09:32', '2024-01-02')
+    sqlite = manager.get_bars('600000', '1min', '2024-01-02 09:32', '2024-01-02', backend='sqlite')
+    assert columnar['time'].tolist() == [202401020932]
+    for field in ('time', 'close', 'volume'):
+        assert columnar[field].tolist() == sqlite[field].tolist()
@@ -0,0 +1,90 @@
+import sqlite3
+
+import pytest
+
+from src.database.db_manager import DatabaseManager
+from src.database.models import COMPACT_SCHEMA_VERSION, init_database, migrate_to_compact_schema
+
+DAILY = [
+    ('600000', '浦发银行', '2024-01-02', 10.0, 10.5, 9.9, 10.2, 100, 1000.0),
+    ('600000', '浦发银行', '2024-01-03', 10.2, 10.8, 10.1, 10.6, 200, 2000.0),
+    ('000001', '平安银行', '2024-01-02', 9.0, 9.2, 8.8, 9.1, 300, 3000.0),
+]
+
+MINUTE = [
+    ('600000', '浦发银行', '2024-01-02', '09:31:00', 10.0, 10.1, 9.9, 10.0, 10, 100.0),
+    ('600000', '浦发银行', '2024-01-02', '09:32:00', 10.0, 10.2, 10.0, 10.1, 20, 200.0),
+]
+
+def query(db, sql, params=()):
+    with sqlite3.connect(db.db_path) as conn:
+        return conn.execute(sql, params).fetchall()
+
+def test_migration_preserves_rows_through_views(db):
+    db.save_daily_data(DAILY)
+    db.save_1min_data(MINUTE)
+    before_daily = query(db, 'SELECT * FROM stock_daily ORDER BY stock_code, trade_date')
+    before_minute = query(db, 'SELECT * FROM stock_1min ORDER BY trade_date, trade_time')
+
+    migrate_to_compact_schema(db.db_path)
+
+    assert query(db, 'PRAGMA user_version')[0][0] == COMPACT_SCHEMA_VERSION
+    assert query(db, "SELECT type FROM sqlite_master WHERE name = 'stock_daily'") == [('view',)]
+    assert query(db, 'SELECT * FROM stock_daily ORDER BY stock_code, trade_date') == before_daily
+    assert query(db, 'SELECT * FROM stock_1min ORDER BY trade_date, trade_time') == before_minute
+    # 紧凑表使用整数键
+    assert query(db, 'SELECT bar_time FROM bar_1min ORDER BY bar_time') == [(202401020931,), (202401020932,)]
+    assert query(db, "SELECT COUNT(*) FROM stock_symbol") == [(2,)]
+
+def test_migration_is_idempotent_and_init_keeps_views(db):
+    migrate_to_compact_schema(db.db_path)
+    migrate_to_compact_schema(db.db_path)
+    init_database(db.db_path)
+
+    assert query(db, "SELECT name FROM sqlite_master WHERE name LIKE '%_legacy'") == []
+    assert query(db, "SELECT type FROM sqlite_master WHERE name = 'stock_5min'") == [('view',)]
+
+def test_legacy_insert_statement_goes_through_trigger(db):
+    migrate_to_compact_schema(db.db_path)
+    with sqlite3.connect(db.db_path) as conn:
+        conn.execute('''
+        INSERT OR REPLACE INTO stock_5min
+        (stock_code, stock_name, trade_date, trade_time, open_price, high_price,
+         low_price, close_price, volume, amount)
+        VALUES ('600000', '浦发银行', '2024-01-02', '09:35:00', 1, 2, 0.5, 1.5, 10, 15)''')
+
+    assert query(db, 'SELECT bar_time, close_price FROM bar_5min') == [(202401020935, 1.5)]
+    assert query(db, 'SELECT trade_date, trade_time FROM stock_5min') == [('2024-01-02', '09:35:00')]
+
+def test_manager_writes_compact_tables_and_reads_by_key(tmp_path):
+    path = str(tmp_path / 'compact.db')
+    init_database(path, compact=True)
+    manager = DatabaseManager(path)
+    assert manager.is_compact_schema()
+
+    manager.save_daily_data(DAILY)
+    manager.save_1min_data(MINUTE)
+
+    bars = manager.get_bars('600000', 'daily', '2024-01-03', '2024-01-03')
+    assert bars['time'].tolist() == [202401030000]
+    assert bars['close'].tolist() == [10.6]
+    minute = manager.get_bars('600000', '1min', '2024-01-02 09:32', '2024-01-02')
+    assert minute['time'].tolist() == [202401020932]
+    assert manager._symbol_ids.keys() == {'600000', '000001'}
+
+def test_rolled_back_symbol_ids_are_not_cached(tmp_path):
+    path = str(tmp_path / 'compact.db')
+    init_database(path, compact=True)
+    manager = DatabaseManager(path)
+
+    # 第二行缺少价格列，executemany 失败后整个事务回滚
+    broken = [DAILY[0], ('600036', '招商银行', '2024-01-02')]
+    with pytest.raises(Exception):
+        manager.save_daily_data(broken)
+
+    assert manager._symbol_ids == {}
+    with sqlite3.connect(path) as conn:
+        assert conn.execute('SELECT COUNT(*) FROM stock_symbol').fetchone()[0] == 0
+
+    manager.save_daily_data(DAILY[:1])
+    assert manager.get_bars('600000', 'daily')['close'].tolist() == [10.2]
@@ -0,0 +1,95 @@
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from src.database.connection_pool import ConnectionPool
+
+@pytest.fixture
+def pool(tmp_path):
+    pool = ConnectionPool(str(tmp_path / 'pool.db'))
+    with pool.write() as conn:
+        conn.execute('CREATE TABLE t (x INTEGER)')
+        conn.commit()
+    yield pool
+    pool.close()
+
+def test_connections_use_wal(pool):
+    with pool.read() as conn:
+        assert conn.execute('PRAGMA journal_mode').fetchone()[0] == 'wal'
+
+def test_read_connection_is_per_thread_and_read_only(pool):
+    with pool.read() as first, pool.read() as second:
+        assert first is second
+        with pytest.raises(sqlite3.OperationalError):
+            first.execute('INSERT INTO t VALUES (1)')
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(pool.read().__enter__()))
+    thread.start()
+    thread.join()
+    assert other[0] is not first
+
+def test_dead_thread_readers_are_pruned(pool):
+    threads = [threading.Thread(target=lambda: pool.read().__enter__()) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+        thread.join()
+    with pool.read():
+        pass
+    stats = pool.stats()
+    # 新线程登记读连接时关闭已退出线程的连接
+    assert stats['active_readers'] == 1
+    assert stats['connections_closed'] == 3
+
+def test_uncommitted_write_is_rolled_back(pool):
+    with pool.write() as conn:
+        conn.execute('INSERT INTO t VALUES (1)')
+    with pool.write() as conn:
+        conn.execute('INSERT INTO t VALUES (2)')
+        conn.commit()
+    with pool.read() as conn:
+        assert conn.execute('SELECT x FROM t').fetchall() == [(2,)]
+
+def test_writes_are_serialized(pool):
+    inside = []
+    overlaps = []
+
+    def writer(value):
+        with pool.write() as conn:
+            inside.append(value)
+            overlaps.append(len(inside))
+            time.sleep(0.01)
+            conn.execute('INSERT INTO t VALUES (?)', (value,))
+            conn.commit()
+            inside.remove(value)
+
+    threads = [threading.Thread(target=writer, args=(i,)) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(overlaps) == 1
+    stats = pool.stats()
+    assert stats['write_checkouts'] == 6
+    assert stats['write_wait_max'] > 0
+    with pool.read() as conn:
+        assert conn.execute('SELECT COUNT(*) FROM t').fetchone()[0] == 5
+
+def test_reader_sees_committed_data_while_writer_holds_transaction(pool):
+    with pool.write() as conn:
+        conn.execute('INSERT INTO t VALUES (1)')
+        conn.commit()
+        conn.execute('BEGIN IMMEDIATE')
+        conn.execute('INSERT INTO t VALUES (2)')
+        # WAL 模式下读取不被未提交的写事务阻塞
+        with pool.read() as reader:
+            assert reader.execute('SELECT x FROM t').fetchall() == [(1,)]
+
+def test_for_path_shares_one_pool(tmp_path):
+    path = str(tmp_path / 'shared.db')
+    try:
+        assert ConnectionPool.for_path(path) is ConnectionPool.for_path(path)
+    finally:
+        ConnectionPool.for_path(path).close()
@@ -0,0 +1,67 @@
+import sqlite3
+
+import pytest
+
+from src.data_collector.history_loader import HistoryLoader
+
+def write_daily_file(directory, code, name, rows):
+    """按通达信导出格式写一个日线文件（GBK 编码，制表符分隔，末行为数据来源）"""
+    lines = [f"{code} {name} 日线 不复权", "      日期\t    开盘\t    最高\t    最低\t    收盘\t    成交量\t    成交额"]
+    for day, price in rows:
+        lines.append(f"{day}\t{price:.2f}\t{price + 1:.2f}\t{price - 1:.2f}\t{price + 0.5:.2f}\t1000\t10000.00")
+    lines.append("数据来源:通达信")
+    market = 'SH' if code.startswith('6') else 'SZ'
+    (directory / f"{market}#{code}.txt").write_text('\n'.join(lines) + '\n', encoding='gbk')
+
+@pytest.fixture
+def loader(db, tmp_path):
+    daily = tmp_path / 'daily'
+    daily.mkdir()
+    for i, code in enumerate(('600000', '600001', '000001', '000002', '300750')):
+        write_daily_file(daily, code, f'股票{i}', [(f'2024/01/{day:02d}', 10.0 + day) for day in range(2, 12)])
+    loader = HistoryLoader()
+    loader.db = db
+    loader.data_paths = {'daily': str(daily)}
+    return loader
+
+def daily_rows(db):
+    with sqlite3.connect(db.db_path) as conn:
+        return conn.execute('''
+        SELECT stock_code, stock_name, trade_date, open_price, close_price, volume
+        FROM stock_daily ORDER BY stock_code, trade_date
+        ''').fetchall()
+
+def test_bulk_load_imports_every_file(loader, db):
+    summary = loader.bulk_load('daily', workers=2, files_per_txn=2, report_interval=0)
+    assert summary['files_done'] == 5
+    assert summary['files_failed'] == 0
+    assert summary['rows'] == 50
+    rows = daily_rows(db)
+    assert len(rows) == 50
+    assert rows[0] == ('000001', '股票2', '2024-01-02', 12.0, 12.5, 1000)
+
+def test_bulk_load_matches_serial_import(loader, db, tmp_path):
+    loader.bulk_load('daily', workers=2, rows_per_txn=15)
+    bulk = daily_rows(db)
+    with sqlite3.connect(db.db_path) as conn:
+        conn.execute('DELETE FROM stock_daily')
+    loader._load_data_files('daily', incremental=False)
+    assert daily_rows(db) == bulk
+
+def test_bulk_load_counts_broken_files(loader, db, tmp_path):
+    # 没有头部的文件无法解析
+    (tmp_path / 'daily' / 'SH#600002.txt').write_text('\n', encoding='gbk')
+    summary = loader.bulk_load('daily', workers=2)
+    assert summary['files_done'] == 5
+    assert summary['files_failed'] == 1
+    assert len(daily_rows(db)) == 50
+
+def test_session_restores_secondary_indexes(loader, db):
+    """defer_indexes 只处理用户自建的二级索引，导入结束后重建"""
+    with sqlite3.connect(db.db_path) as conn:
+        conn.execute('CREATE INDEX idx_daily_close ON stock_daily (close_price)')
+    loader.bulk_load('daily', workers=1)
+    with sqlite3.connect(db.db_path) as conn:
+        names = [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = 'stock_daily'")]
+    assert 'idx_daily_close' in names
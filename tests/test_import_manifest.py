@@ -0,0 +1,82 @@
+import os
+import sqlite3
+
+import pytest
+
+from src.data_collector.history_loader import HistoryLoader
+from src.data_collector.import_manifest import ImportPlan
+
+HEADER = "600000 浦发银行 日线 不复权\r\n      日期\t    开盘\t    最高\t    最低\t    收盘\t    成交量\t    成交额\r\n"
+
+def day_line(day: int, price: float = 10.0) -> str:
+    return f"2024/01/{day:02d}\t{price:.2f}\t{price + 1:.2f}\t{price - 1:.2f}\t{price:.2f}\t100\t1000.00\r\n"
+
+@pytest.fixture
+def data_file(tmp_path):
+    directory = tmp_path / 'daily'
+    directory.mkdir()
+    path = directory / 'SH#600000.txt'
+    path.write_bytes((HEADER + ''.join(day_line(day) for day in range(2, 6))).encode('gbk'))
+    return path
+
+@pytest.fixture
+def loader(db, data_file):
+    loader = HistoryLoader()
+    loader.db = db
+    loader.data_paths = {'daily': str(data_file.parent)}
+    return loader
+
+def stored_dates(db):
+    with sqlite3.connect(db.db_path) as conn:
+        return [row[0] for row in conn.execute('SELECT trade_date FROM stock_daily ORDER BY trade_date')]
+
+def append(path, text: str):
+    with open(path, 'ab') as f:
+        f.write(text.encode('gbk'))
+    # 保证修改时间变化
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+def test_unchanged_file_is_skipped(loader, db):
+    first = loader.bulk_load('daily', workers=1)
+    assert first['files_done'] == 1 and first['rows'] == 4
+    second = loader.bulk_load('daily', workers=1)
+    assert second['files_skipped'] == 1 and second['rows'] == 0
+    entry = db.get_import_manifest('daily')[loader._list_data_files('daily')[0]]
+    assert entry['row_count'] == 4
+    assert entry['last_bar_date'] == '2024-01-05'
+
+def test_appended_rows_import_only_the_tail(loader, db, data_file):
+    loader._load_data_files('daily')
+    entry = db.get_import_manifest('daily')[str(data_file)]
+    append(data_file, day_line(8) + day_line(9))
+
+    plan = ImportPlan(str(data_file), 'daily', entry)
+    assert plan.action == ImportPlan.TAIL
+    assert plan.start_offset == entry['data_offset']
+    assert [row[2] for row in plan.parser().iter_rows()] == ['2024-01-08', '2024-01-09']
+
+    summary = loader.bulk_load('daily', workers=1)
+    assert summary['rows'] == 2
+    assert stored_dates(db) == ['2024-01-0%d' % day for day in (2, 3, 4, 5, 8, 9)]
+    assert db.get_import_manifest('daily')[str(data_file)]['row_count'] == 6
+
+def test_rewritten_prefix_forces_full_import(loader, db, data_file):
+    loader._load_data_files('daily')
+    entry = db.get_import_manifest('daily')[str(data_file)]
+    # 重新导出：已导入部分的价格变了
+    data_file.write_bytes((HEADER + ''.join(day_line(day, 20.0) for day in range(2, 7))).encode('gbk'))
+    stat = os.stat(data_file)
+    os.utime(data_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert ImportPlan(str(data_file), 'daily', entry).action == ImportPlan.FULL
+
+    loader._load_data_files('daily')
+    with sqlite3.connect(db.db_path) as conn:
+        closes = [row[0] for row in conn.execute('SELECT close_price FROM stock_daily')]
+    assert closes == [20.0] * 5
+
+def test_incremental_off_always_imports_everything(data_file):
+    entry = {'data_offset': 10, 'file_size': os.path.getsize(data_file),
+             'file_mtime': os.stat(data_file).st_mtime_ns, 'content_hash': ''}
+    assert ImportPlan(str(data_file), 'daily', entry).action == ImportPlan.SKIP
+    assert ImportPlan(str(data_file), 'daily', entry, incremental=False).action == ImportPlan.FULL
@@ -0,0 +1,72 @@
+import sqlite3
+from contextlib import contextmanager
+
+import numpy as np
+import pytest
+
+from src.analysis.indicator_cache import IndicatorCache
+
+def daily_rows(days, code='600000'):
+    return [(code, '浦发银行', f'2024-01-{day:02d}', float(day), day + 0.5, day - 0.5, float(day), 100, 1000.0)
+            for day in days]
+
+@pytest.fixture
+def cache(db):
+    db.save_daily_data(daily_rows(range(2, 12)))
+    return IndicatorCache(db)
+
+def cached_freqs(db):
+    with sqlite3.connect(db.db_path) as conn:
+        return sorted(row[0] for row in conn.execute('SELECT freq FROM indicator_cache'))
+
+def test_memory_hit_does_not_touch_database(cache, db, monkeypatch):
+    first = cache.get('600000', 'daily', 'ma', (5,))
+    np.testing.assert_allclose(first['ma5'][-1], np.mean(range(7, 12)))
+    assert not first['ma5'].flags.writeable
+
+    @contextmanager
+    def no_database():
+        raise AssertionError("命中内存缓存时不应访问数据库")
+        yield
+    monkeypatch.setattr(db, 'read_connection', no_database)
+    assert cache.get('600000', 'daily', 'ma', (5,)) is first
+    assert cache.cache_stats()['memory_hits'] == 1
+    assert cache.cache_stats()['misses'] == 1
+
+def test_persistent_layer_serves_new_instance(cache, db):
+    cache.get('600000', 'daily', 'macd')
+    other = IndicatorCache(db)
+    series = other.get('600000', 'daily', 'macd')
+    assert series['dif'].shape == (10,)
+    assert other.cache_stats()['db_hits'] == 1
+    assert other.cache_stats()['misses'] == 0
+
+def test_daily_write_invalidates_daily_and_weekly(cache, db):
+    cache.get('600000', 'daily', 'ma', (5,))
+    cache.get('600000', 'weekly', 'ma', (5,))
+    cache.get('600000', '5min', 'ma', (5,))
+    assert cached_freqs(db) == ['5min', 'daily', 'weekly']
+
+    db.save_daily_data(daily_rows([12]))
+    # 持久化缓存在写入事务中删除，分钟线缓存不受影响
+    assert cached_freqs(db) == ['5min']
+    series = cache.get('600000', 'daily', 'ma', (5,))
+    assert series['time'][-1] == 202401120000
+    assert cache.cache_stats()['misses'] == 4
+
+def test_other_symbols_stay_cached(cache, db):
+    db.save_daily_data(daily_rows(range(2, 8), code='000001'))
+    cache.get('600000', 'daily', 'rsi')
+    cache.get('000001', 'daily', 'rsi')
+
+    db.save_daily_data(daily_rows([12]))
+    cache.get('000001', 'daily', 'rsi')
+    assert cache.cache_stats()['memory_hits'] == 1
+
+def test_result_read_before_write_is_not_remembered(cache):
+    """读取期间源K线被写入，旧结果不进入内存缓存"""
+    generation = cache._generation('600000', 'daily')
+    series = cache._compute('600000', 'daily', 'ma', (5,))
+    cache._on_bars_written('daily', {'600000'})
+    cache._remember(('600000', 'daily', 'ma', '5'), generation, series)
+    assert cache.cache_stats()['entries'] == 0
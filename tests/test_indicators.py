@@ -0,0 +1,51 @@
+import numpy as np
+import pytest
+
+from src.analysis.indicators import IndicatorEngine
+
+CODES = ['600000', '000001', '300750']
+
+@pytest.fixture
+def bars():
+    rng = np.random.default_rng(7)
+    close = 10 + np.cumsum(rng.normal(0, 0.2, (len(CODES), 120)), axis=1)
+    high = close + rng.uniform(0, 0.3, close.shape)
+    low = close - rng.uniform(0, 0.3, close.shape)
+    return high, low, close
+
+def test_update_matches_compute(bars):
+    """先批量计算前一段历史，再逐根增量更新，结果与一次性批量计算一致"""
+    high, low, close = bars
+    full = IndicatorEngine(CODES).compute(high, low, close)
+
+    engine = IndicatorEngine(CODES)
+    engine.compute(high[:, :80], low[:, :80], close[:, :80])
+    for t in range(80, close.shape[1]):
+        result = engine.update(high[:, t], low[:, t], close[:, t])
+        for name, values in result.items():
+            np.testing.assert_allclose(values, full[name][:, t], rtol=1e-9, err_msg=f"{name} @ {t}")
+
+def test_unfinished_bar_does_not_advance_state(bars):
+    """final=False 的盘中K线可以反复刷新，不影响随后的收盘结果"""
+    high, low, close = bars
+    full = IndicatorEngine(CODES).compute(high, low, close)
+
+    engine = IndicatorEngine(CODES)
+    engine.compute(high[:, :-1], low[:, :-1], close[:, :-1])
+    engine.update(high[:, -1] + 1, low[:, -1] - 1, close[:, -1] + 0.5, final=False)
+    result = engine.update(high[:, -1], low[:, -1], close[:, -1])
+    for name, values in result.items():
+        np.testing.assert_allclose(values, full[name][:, -1], rtol=1e-9, err_msg=name)
+
+def test_missing_bar_keeps_previous_values(bars):
+    """没有新K线的股票（NaN）指标保持不变"""
+    high, low, close = bars
+    engine = IndicatorEngine(CODES)
+    engine.compute(high, low, close)
+    before = engine.get('000001')
+    nan = np.full(len(CODES), np.nan)
+    row = CODES.index('000001')
+    engine.update(np.where(np.arange(len(CODES)) == row, nan, high[:, -1]),
+                  np.where(np.arange(len(CODES)) == row, nan, low[:, -1]),
+                  np.where(np.arange(len(CODES)) == row, nan, close[:, -1]))
+    assert engine.get('000001') == before
@@ -0,0 +1,85 @@
+import numpy as np
+
+from src.analysis.limit_up import LimitUpEngine, limit_prices, limit_ratio, seed_from_daily
+
+def test_limit_ratio():
+    assert limit_ratio('600000', '浦发银行') == 0.10
+    assert limit_ratio('600001', '*ST 某某') == 0.05
+    assert limit_ratio('300750') == 0.20
+    assert limit_ratio('688981') == 0.20
+    assert limit_ratio('830799') == 0.30
+
+def test_limit_price_rounds_half_up_to_cent():
+    # 10.45 × 1.1 = 11.495000000000001，按分四舍五入为 11.50
+    assert limit_prices(10.45, 0.10) == 11.50
+    # 9.95 × 1.1 = 10.945 在浮点数中略小于 10.945，仍应进位为 10.95
+    assert limit_prices(9.95, 0.10) == 10.95
+    assert limit_prices(3.33, 0.05) == 3.50
+    np.testing.assert_allclose(limit_prices(np.array([10.0, 12.34, 7.77]), np.array([0.1, 0.2, 0.05])),
+                               [11.0, 14.81, 8.16])
+
+def test_seed_counts_consecutive_limits():
+    codes = np.array(['600000'] * 5 + ['300750'] * 3 + ['000001'] * 2)
+    closes = np.array([10.0, 10.45, 11.50, 12.65, 13.92,
+                       20.0, 24.0, 28.8,
+                       5.0, 5.1])
+    opens = np.array([10.0, 10.0, 11.0, 12.0, 14.00,
+                      20.0, 22.0, 27.0,
+                      5.0, 5.0])
+    ratios = np.array([limit_ratio(code) for code in codes])
+    seeds = seed_from_daily(codes, opens, closes, ratios)
+    # 10.45 -> 11.50 -> 12.65 -> 13.92 连续三个涨停（涨停价均需四舍五入到分），最后一天收阴
+    assert seeds['600000'] == (3, True, 13.92)
+    assert seeds['300750'] == (2, False, 28.8)
+    assert seeds['000001'] == (0, False, 5.1)
+
+def test_seed_break_resets_count():
+    codes = np.array(['600000'] * 5)
+    closes = np.array([10.0, 11.0, 10.5, 11.55, 12.71])
+    opens = closes.copy()
+    seeds = seed_from_daily(codes, opens, closes, np.full(5, 0.10))
+    assert seeds['600000'] == (2, False, 12.71)
+
+def test_seed_empty():
+    empty = np.array([])
+    assert seed_from_daily(empty, empty, empty, empty) == {}
+
+def quote(code, current, prev_close=10.0, name='', time='09:31:00'):
+    return {'code': code, 'name': name, 'current': current, 'prev_close': prev_close, 'time': time}
+
+def test_engine_tracks_seal_and_break(db):
+    engine = LimitUpEngine(db, trade_date='2024-01-03')
+    assert engine.process([quote('600000', 10.5)]) == []
+
+    sealed = engine.process([quote('600000', 11.0, time='09:35:00')])
+    assert len(sealed) == 1
+    engine.process([quote('600000', 10.9, time='10:00:00')])
+    engine.process([quote('600000', 11.0, time='10:30:00')])
+
+    record = engine.get_limit_ups()[0]
+    assert record['first_limit_up_time'] == '09:35:00'
+    assert record['break_limit_up_times'] == 1
+    assert record['continuous_limit_up'] == 1
+    with db.read_connection() as conn:
+        rows = conn.execute('SELECT stock_code, break_limit_up_times, date FROM stock_limit_up').fetchall()
+    assert [tuple(row) for row in rows] == [('600000', 1, '2024-01-03')]
+
+def test_engine_seeds_prev_close_and_streak_from_daily(db):
+    db.save_daily_data([
+        ('600000', '浦发银行', '2024-01-01', 10.0, 10.0, 10.0, 10.0, 100, 1000.0),
+        ('600000', '浦发银行', '2024-01-02', 10.5, 11.0, 10.5, 11.0, 100, 1100.0),
+    ])
+    engine = LimitUpEngine(db, persist=False, trade_date='2024-01-03')
+    # 行情没有前收盘时用日线最后收盘价 11.0 计算涨停价 12.1
+    changed = engine.process([quote('600000', 12.1, prev_close=0)])
+    assert len(changed) == 1
+    record = engine.get_limit_ups()[0]
+    assert record['continuous_limit_up'] == 2
+    assert record['change_percent'] == 10.0
+
+def test_engine_skips_symbol_without_positive_prev_close(db):
+    engine = LimitUpEngine(db, persist=False, trade_date='2024-01-03')
+    # 前收盘为 0 或负数时涨停价无意义，不建状态机，也不会误判为封板
+    assert engine.process([quote('600000', 11.0, prev_close=0), quote('000001', 5.0, prev_close=-1.0)]) == []
+    assert engine.states == {}
+    assert engine.get_limit_ups(sealed_only=False) == []
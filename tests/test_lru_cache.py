@@ -0,0 +1,34 @@
+import numpy as np
+
+from src.database.lru_cache import ByteLRUCache, arrays_nbytes
+
+def test_evicts_least_recently_used_by_bytes():
+    cache = ByteLRUCache(10)
+    cache.put('a', b'1234')
+    cache.put('b', b'1234')
+    assert cache.get('a') == b'1234'
+    cache.put('c', b'1234')
+
+    assert cache.get('b') is None
+    assert cache.get('a') == b'1234'
+    assert cache.bytes == 8
+    assert cache.stats() == {'entries': 2, 'bytes': 8, 'hits': 2, 'misses': 1}
+
+def test_oversize_value_is_rejected_and_replaces_old_entry():
+    cache = ByteLRUCache(4)
+    cache.put('a', b'12')
+    assert not cache.put('a', b'12345')
+    assert cache.get('a') is None
+    assert cache.bytes == 0
+
+def test_discard_if_and_array_sizes():
+    cache = ByteLRUCache(1024, arrays_nbytes)
+    cache.put(('600000', 'daily'), {'close': np.zeros(4)})
+    cache.put(('000001', 'daily'), {'close': np.zeros(2)})
+    assert cache.bytes == 48
+
+    assert cache.discard_if(lambda key: key[0] == '600000') == 1
+    assert len(cache) == 1
+    assert cache.bytes == 16
+    cache.clear()
+    assert len(cache) == 0 and cache.bytes == 0
@@ -0,0 +1,71 @@
+import time
+from datetime import datetime
+
+import pytest
+
+from src.data_collector.quote_source import ReplayQuoteSource, save_snapshots
+
+def quote(code, current, volume=100):
+    return {'code': code, 'current': current, 'open': 10.0, 'high': current, 'low': 10.0,
+            'prev_close': 10.0, 'volume': volume}
+
+FRAMES = [
+    (1704159060.0, [quote('600000', 10.1)]),
+    (1704159120.0, [quote('600000', 10.2, 200)]),
+    (1704159180.0, [quote('600000', 10.3, 300)]),
+]
+
+def read_all(source):
+    played = []
+    with source:
+        while True:
+            snapshot = source.read_snapshot()
+            if snapshot is None:
+                return played
+            played.append((source.timestamp, snapshot))
+
+def test_replay_reports_replayed_moment():
+    played = read_all(ReplayQuoteSource(FRAMES, speed=None))
+    assert [ts for ts, _ in played] == [ts for ts, _ in FRAMES]
+    assert played[-1][1][0]['current'] == 10.3
+
+def test_reopen_restarts_replay():
+    source = ReplayQuoteSource(FRAMES, speed=None)
+    assert len(read_all(source)) == 3
+    assert source.frames_played == 3
+    assert len(read_all(source)) == 3
+
+def test_speed_compresses_original_intervals():
+    frames = [(0.0, []), (1.0, []), (2.0, [])]
+    started = time.perf_counter()
+    read_all(ReplayQuoteSource(frames, speed=100))
+    assert 0.015 <= time.perf_counter() - started < 1.0
+
+def test_invalid_speed_rejected():
+    with pytest.raises(ValueError):
+        ReplayQuoteSource(FRAMES, speed=0)
+    with pytest.raises(ValueError):
+        ReplayQuoteSource(FRAMES, speed=ReplayQuoteSource.MAX_SPEED * 2)
+
+def test_recorded_file_round_trip(tmp_path):
+    path = str(tmp_path / 'frames.jsonl')
+    assert save_snapshots(path, FRAMES) == 3
+    assert read_all(ReplayQuoteSource.from_file(path, speed=None)) == FRAMES
+
+def test_history_frames_rebuild_intraday_snapshots(db):
+    db.save_daily_data([('600000', '浦发银行', '2024-01-02', 9.0, 9.5, 8.5, 9.0, 1000, 9000.0)])
+    db.save_1min_data([
+        ('600000', '浦发银行', '2024-01-03', '09:31:00', 9.1, 9.3, 9.0, 9.2, 100, 920.0),
+        ('600000', '浦发银行', '2024-01-03', '09:33:00', 9.2, 9.6, 9.2, 9.5, 50, 475.0),
+    ])
+    played = read_all(ReplayQuoteSource.from_history(db, '2024-01-03', speed=None))
+
+    assert len(played) == 240
+    first_ts, first = played[0]
+    assert datetime.fromtimestamp(first_ts).strftime('%H:%M') == '09:31'
+    assert first[0]['prev_close'] == 9.0
+    assert first[0]['current'] == 9.2
+    # 09:32 没有成交，沿用上一分钟的价格
+    assert played[1][1][0]['current'] == 9.2
+    third = played[2][1][0]
+    assert (third['volume'], third['high'], third['current_volume']) == (150, 9.6, 50)
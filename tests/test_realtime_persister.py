@@ -0,0 +1,80 @@
+from datetime import datetime
+
+import pytest
+
+from src.database.realtime_persister import RealtimePersister, partition_name
+
+def quote(code, current, volume=100):
+    return {'code': code, 'name': '', 'current': current, 'open': 10.0, 'high': current,
+            'low': 10.0, 'prev_close': 10.0, 'volume': volume, 'amount': current * volume}
+
+def moment(day, clock='09:31:00'):
+    return datetime.strptime(f"{day} {clock}", '%Y-%m-%d %H:%M:%S').timestamp()
+
+def count_rows(db, table):
+    with db.read_connection() as conn:
+        return conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0]
+
+def test_submit_queues_until_flush(db):
+    persister = RealtimePersister(db)
+    persister.submit([quote('600000', 10.5), quote('000001', 9.0)], moment('2024-02-13'))
+    persister.submit([quote('600000', 10.6)], moment('2024-02-13', '09:31:01'))
+    assert persister.queue_depth() == 3
+    assert persister.list_partitions() == []
+
+    # 一次 flush 写入整批
+    assert persister.flush() == 3
+    assert persister.queue_depth() == 0
+    assert persister.list_partitions() == [partition_name('2024-02-13')]
+    assert count_rows(db, 'stock_realtime_20240213') == 3
+    with db.read_connection() as conn:
+        row = conn.execute('SELECT change_percent, timestamp FROM stock_realtime_20240213 '
+                           'WHERE stock_code = ? ORDER BY id LIMIT 1', ('600000',)).fetchone()
+    assert row[0] == pytest.approx(5.0)
+    assert row[1] == '2024-02-13 09:31:00'
+
+def test_flush_respects_max_batch(db):
+    persister = RealtimePersister(db, max_batch=2)
+    persister.submit([quote(f"{i:06d}", 10.0) for i in range(5)], moment('2024-02-13'))
+    assert persister.flush() == 2
+    assert persister.queue_depth() == 3
+    assert persister.get_stats()['batches'] == 1
+
+def test_queue_overflow_drops_oldest(db):
+    persister = RealtimePersister(db, max_queue=2)
+    persister.submit([quote('600000', 10.1), quote('600000', 10.2), quote('600000', 10.3)],
+                     moment('2024-02-13'))
+    assert persister.get_stats()['rows_dropped'] == 1
+    persister.flush()
+    with db.read_connection() as conn:
+        prices = [row[0] for row in conn.execute('SELECT current_price FROM stock_realtime_20240213 ORDER BY id')]
+    assert prices == [10.2, 10.3]
+
+def test_rows_split_by_day_and_old_partitions_dropped(db):
+    persister = RealtimePersister(db, retention_days=2)
+    for day in ('2024-02-07', '2024-02-08', '2024-02-09'):
+        persister.submit([quote('600000', 10.1)], moment(day))
+    persister.flush()
+
+    assert persister.list_partitions() == ['stock_realtime_20240208', 'stock_realtime_20240209']
+    assert persister.get_stats()['rows_written'] == 3
+
+def test_failed_flush_does_not_register_partition(db):
+    persister = RealtimePersister(db)
+    persister.submit([quote('600000', 10.1)], moment('2024-02-13'))
+    # 列数不对的行让整个事务失败，当天分区的建表一起回滚
+    persister._queue.append(('2024-02-14', ('600000',)))
+    with pytest.raises(Exception):
+        persister.flush()
+    assert persister.queue_depth() == 2
+    assert persister.list_partitions() == []
+
+    persister._queue.pop()
+    assert persister.flush() == 1
+    assert count_rows(db, 'stock_realtime_20240213') == 1
+
+def test_background_thread_writes_on_stop(db):
+    with RealtimePersister(db, flush_interval=60) as persister:
+        persister.submit([quote('600000', 10.1)], moment('2024-02-13'))
+    assert persister.queue_depth() == 0
+    assert count_rows(db, 'stock_realtime_20240213') == 1
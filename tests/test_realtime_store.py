@@ -0,0 +1,100 @@
+import numpy as np
+
+from src.database.realtime_store import CHUNK_SIZE, ChunkedColumn, RealtimeStore
+
+def quote(code, current, volume=100, prev_close=10.0, name=''):
+    return {'code': code, 'name': name, 'current': current, 'open': 10.0, 'high': current,
+            'low': 10.0, 'prev_close': prev_close, 'volume': volume, 'amount': current * volume}
+
+def codes(count):
+    return [f"{i:06d}" for i in range(count)]
+
+def test_latest_quote_and_derived_columns():
+    store = RealtimeStore(capacity=16)
+    version = store.update([quote('600000', 11.0, name='浦发银行'), quote('000001', 5.0, prev_close=0)],
+                           timestamp=1704159060.0)
+    assert version == 1
+
+    latest = store.get_latest('600000')
+    assert latest['stock_name'] == '浦发银行'
+    assert latest['current_price'] == 11.0
+    assert latest['change_amount'] == 1.0
+    assert latest['change_percent'] == 10.0
+    assert latest['timestamp'] == 1704159060.0
+    # 前收盘为 0 时涨跌幅记为 0
+    assert store.get_latest('000001')['change_percent'] == 0.0
+    assert store.get_latest('300750') is None
+
+def test_duplicate_rows_keep_last():
+    store = RealtimeStore(capacity=16)
+    store.update([quote('600000', 10.5), quote('600000', 10.8)])
+    assert len(store) == 1
+    assert store.get_latest('600000')['current_price'] == 10.8
+
+def test_old_frame_is_unchanged_by_later_updates():
+    store = RealtimeStore(capacity=16)
+    store.update([quote('600000', 10.5)])
+    frame = store.frame()
+    store.update([quote('600000', 10.9), quote('000001', 9.0)])
+
+    assert frame.count == 1
+    assert frame.record(0)['current_price'] == 10.5
+    assert store.frame().record(0)['current_price'] == 10.9
+
+def test_update_copies_only_touched_chunks():
+    store = RealtimeStore(capacity=CHUNK_SIZE * 4)
+    store.update([quote(code, 10.0) for code in codes(CHUNK_SIZE * 3)])
+    before = store.frame()
+    store.update([quote(codes(1)[0], 10.5)])
+    after = store.frame()
+
+    for name, column in after.columns.items():
+        assert column.chunks[0] is not before.columns[name].chunks[0]
+        assert all(a is b for a, b in zip(column.chunks[1:], before.columns[name].chunks[1:]))
+    assert after.codes is before.codes
+    assert after.chunk_versions.tolist() == [2, 1, 1, 0]
+
+def test_changes_since_skips_unchanged_slots():
+    store = RealtimeStore(capacity=CHUNK_SIZE * 2)
+    all_codes = codes(CHUNK_SIZE + 10)
+    store.update([quote(code, 10.0) for code in all_codes])
+    version = store.version
+    store.update([quote(all_codes[3], 10.1), quote(all_codes[CHUNK_SIZE + 5], 10.2)])
+
+    current, changed = store.changes_since(version)
+    assert current == version + 1
+    assert [row['stock_code'] for row in changed] == [all_codes[3], all_codes[CHUNK_SIZE + 5]]
+    assert len(store.get_all()) == len(all_codes)
+    assert store.changes_since(current) == (current, [])
+
+def test_grows_past_initial_capacity():
+    store = RealtimeStore(capacity=CHUNK_SIZE)
+    early = store.frame()
+    all_codes = codes(CHUNK_SIZE * 2 + 1)
+    store.update([quote(code, 10.0, volume=i) for i, code in enumerate(all_codes)])
+
+    assert len(store) == len(all_codes)
+    assert store.get_latest(all_codes[-1])['volume'] == len(all_codes) - 1
+    assert len(early.slot_versions) == CHUNK_SIZE
+    assert len(store.get_ticks(all_codes[-1])) == 1
+
+def test_chunked_column_reads_like_array():
+    data = np.arange(CHUNK_SIZE * 3, dtype=np.int64)
+    column = ChunkedColumn(tuple(np.split(data, 3)), np.int64)
+
+    assert column[CHUNK_SIZE + 1] == CHUNK_SIZE + 1
+    assert column[10:CHUNK_SIZE * 2 + 5].tolist() == data[10:CHUNK_SIZE * 2 + 5].tolist()
+    slots = np.array([CHUNK_SIZE * 2 + 1, 3, CHUNK_SIZE, 4])
+    assert column[slots].tolist() == data[slots].tolist()
+    assert column[np.empty(0, dtype=np.int64)].tolist() == []
+    assert np.asarray(column).tolist() == data.tolist()
+
+def test_tick_ring_keeps_recent_history():
+    store = RealtimeStore(capacity=16, history=3)
+    for i in range(5):
+        store.update([quote('600000', 10.0 + i, volume=i)], timestamp=float(i))
+
+    ticks = store.get_ticks('600000')
+    assert [tick['timestamp'] for tick in ticks] == [2.0, 3.0, 4.0]
+    assert store.get_ticks('600000', limit=1)[0]['current_price'] == 14.0
+    assert store.get_ticks('300750') == []
@@ -0,0 +1,102 @@
+import numpy as np
+
+from src.analysis.resampler import BarResampler, resample
+from src.analysis.trading_session import bucket_end_minute, session_minute, session_minute_to_hhmm
+
+DAY = 20240213
+
+def minute_bars(hhmm):
+    """给定结束时间的1分钟K线，每根成交量为1、收盘价为序号"""
+    hhmm = np.asarray(hhmm, dtype=np.int64)
+    index = np.arange(len(hhmm), dtype=np.float64)
+    return {
+        'time': DAY * 10000 + hhmm,
+        'open': index,
+        'high': index + 0.5,
+        'low': index - 0.5,
+        'close': index,
+        'volume': np.ones(len(hhmm), dtype=np.int64),
+        'amount': index * 100
+    }
+
+def full_session():
+    return minute_bars(session_minute_to_hhmm(np.arange(1, 241)))
+
+def test_session_minute_folds_lunch_break():
+    """午休时间归入上午最后一根，13:01 是下午第一根"""
+    assert session_minute_to_hhmm(120) == 1130
+    assert session_minute_to_hhmm(121) == 1301
+    assert session_minute(np.array([1130, 1200, 1300, 1301])).tolist() == [120, 120, 120, 121]
+
+def test_60min_buckets():
+    bars = resample(full_session(), '60min')
+    assert (bars['time'] % 10000).tolist() == [1030, 1130, 1400, 1500]
+    assert bars['volume'].tolist() == [60, 60, 60, 60]
+    assert (bars['first_time'] % 10000).tolist() == [931, 1031, 1301, 1401]
+    assert bars['open'].tolist() == [0, 60, 120, 180]
+    assert bars['close'].tolist() == [59, 119, 179, 239]
+    assert bars['high'].tolist() == [59.5, 119.5, 179.5, 239.5]
+    assert bars['low'].tolist() == [-0.5, 59.5, 119.5, 179.5]
+
+def test_buckets_do_not_span_lunch_break():
+    """周期不能整除上午时长时，上午最后一根提前在 11:30 结束，下午重新计数"""
+    assert bucket_end_minute(np.array([1, 90, 91, 120, 121, 210, 211, 240]), 90).tolist() == \
+        [90, 90, 120, 120, 210, 210, 240, 240]
+    bars = resample(full_session(), '90min')
+    assert (bars['time'] % 10000).tolist() == [1100, 1130, 1430, 1500]
+    assert bars['volume'].tolist() == [90, 30, 90, 30]
+
+def test_lunch_break_bar_joins_morning_bucket():
+    """时间戳落在午休中的K线（如 13:00）并入 11:30 那根"""
+    bars = resample(minute_bars([1129, 1130, 1300, 1301, 1302]), '60min')
+    assert (bars['time'] % 10000).tolist() == [1130, 1400]
+    assert bars['volume'].tolist() == [3, 2]
+    assert bars['close'].tolist() == [2, 4]
+
+def test_daily_bucket_time():
+    bars = resample(full_session(), 'daily')
+    assert bars['time'].tolist() == [DAY * 10000]
+    assert bars['volume'].tolist() == [240]
+
+def save_week_days(db):
+    """2024-01-02 至 2024-01-10 的日线（跨两周），收盘价为日期的日"""
+    db.save_daily_data([
+        ('600000', '浦发银行', f'2024-01-{day:02d}', float(day), day + 0.5, day - 0.5, float(day), 100, 1000.0)
+        for day in (2, 3, 4, 5, 8, 9, 10)
+    ])
+
+def test_weekly_bars_come_from_daily_table(db):
+    save_week_days(db)
+    resampler = BarResampler(db)
+
+    bars = resampler.get_bars('600000', 'weekly')
+    assert bars['time'].tolist() == [202401050000, 202401100000]
+    assert bars['open'].tolist() == [2.0, 8.0]
+    assert bars['close'].tolist() == [5.0, 10.0]
+    assert bars['volume'].tolist() == [400, 300]
+    # 查询区间只落在周中时仍返回完整的一周
+    partial = resampler.get_bars('600000', 'weekly', '2024-01-09', '2024-01-09')
+    assert partial['open'].tolist() == [8.0]
+    assert partial['volume'].tolist() == [300]
+
+def test_minute_bars_come_from_1min_table(db):
+    db.save_1min_data([
+        ('600000', '浦发银行', '2024-02-13', f'09:{minute}:00', 1.0, 2.0, 0.5, float(minute), 10, 100.0)
+        for minute in range(31, 41)
+    ])
+    bars = BarResampler(db).get_bars('600000', '5min', '2024-02-13')
+    assert (bars['time'] % 10000).tolist() == [935, 940]
+    assert bars['close'].tolist() == [35.0, 40.0]
+
+def test_cache_hit_and_new_source_bar_misses(db):
+    save_week_days(db)
+    resampler = BarResampler(db)
+    first = resampler.get_bars('600000', 'monthly')
+    assert resampler.get_bars('600000', 'monthly') is first
+    assert not first['close'].flags.writeable
+    assert resampler.cache_stats()['hits'] == 1
+
+    # 新的日线改变了缓存键中的最后时间
+    db.save_daily_data([('600000', '浦发银行', '2024-01-11', 11.0, 11.5, 10.5, 11.0, 100, 1000.0)])
+    assert resampler.get_bars('600000', 'monthly')['close'].tolist() == [11.0]
+    assert resampler.cache_stats()['misses'] == 2
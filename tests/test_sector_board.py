@@ -0,0 +1,70 @@
+import pytest
+
+from src.analysis.sector_board import SectorAggregator
+from src.database.realtime_store import RealtimeStore
+from src.database.sector_index import SectorIndex
+
+def quote(code, current, amount, name=''):
+    return {'code': code, 'name': name, 'current': current, 'open': 10.0, 'high': current,
+            'low': 10.0, 'prev_close': 10.0, 'volume': 100, 'amount': amount}
+
+def save_sector(db, code, name, sector_type, stocks):
+    db.save_sector_info({'sector_code': code, 'sector_name': name, 'sector_type': sector_type,
+                         'stocks': [{'stock_code': stock, 'stock_name': stock} for stock in stocks]})
+
+@pytest.fixture
+def sectors(db):
+    save_sector(db, 'BK001', '银行', 'industry', ['600000', '600036', '000001'])
+    save_sector(db, 'BK002', '券商', 'industry', ['600030', '000001'])
+    save_sector(db, 'BK003', '金融科技', 'concept', ['300059'])
+    save_sector(db, 'BK004', '空板块', 'concept', [])
+    return db
+
+def test_index_is_csr_by_sector(sectors):
+    index = SectorIndex.load(sectors)
+    assert index.sector_codes == ['BK001', 'BK002', 'BK003', 'BK004']
+    assert index.indptr.tolist() == [0, 3, 5, 6, 6]
+    members = [index.stock_codes[i] for i in index.indices[index.indptr[1]:index.indptr[2]]]
+    assert members == ['000001', '600030']
+    assert index.entry_sectors.tolist() == [0, 0, 0, 1, 1, 2]
+    assert not index.indices.flags.writeable
+
+def test_board_aggregates_all_sectors_in_one_pass(sectors):
+    store = RealtimeStore(capacity=16)
+    store.update([quote('600000', 11.0, 100.0, '浦发银行'), quote('600036', 9.0, 50.0, '招商银行'),
+                  quote('000001', 10.0, 30.0, '平安银行'), quote('600030', 10.5, 20.0, '中信证券')])
+    aggregator = SectorAggregator(sectors, store, SectorIndex.load(sectors))
+    board = aggregator.update()
+
+    bank = {record['sector_code']: record for record in board.records()}['BK001']
+    assert bank['avg_change'] == pytest.approx(0.0)
+    assert (bank['stock_count'], bank['up_count'], bank['down_count'], bank['flat_count']) == (3, 1, 1, 1)
+    assert bank['amount'] == 180.0
+    assert bank['net_amount'] == 50.0
+    assert (bank['leader_code'], bank['leader_name'], bank['leader_change']) == ('600000', '浦发银行', 10.0)
+
+    ranked = [record['sector_code'] for record in board.records()]
+    # 没有行情的板块排在最后
+    assert ranked[:2] == ['BK002', 'BK001']
+    assert set(ranked[2:]) == {'BK003', 'BK004'}
+    assert {record['sector_code']: record for record in board.records()}['BK003']['avg_change'] is None
+
+def test_board_filters_and_recomputes_on_new_version(sectors):
+    store = RealtimeStore(capacity=16)
+    store.update([quote('300059', 10.2, 10.0)])
+    aggregator = SectorAggregator(sectors, store, SectorIndex.load(sectors))
+    first = aggregator.update()
+    assert aggregator.update() is first
+
+    # 榜单在采集器调用 update 时按新版本重算，读取方只取已发布的榜单
+    store.update([quote('300059', 10.8, 20.0)])
+    assert aggregator.get_board(sector_type='concept')[0]['avg_change'] == pytest.approx(2.0)
+    assert aggregator.update() is not first
+    records = aggregator.get_board(sector_type='concept', limit=1)
+    assert [record['sector_code'] for record in records] == ['BK003']
+    assert records[0]['avg_change'] == pytest.approx(8.0)
+
+def test_unknown_sort_field_rejected(sectors):
+    aggregator = SectorAggregator(sectors, RealtimeStore(capacity=16), SectorIndex.load(sectors))
+    with pytest.raises(ValueError):
+        aggregator.get_board(sort='volume')
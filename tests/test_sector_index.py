@@ -0,0 +1,58 @@
+from src.analysis.sector_board import SectorAggregator
+from src.database.realtime_store import RealtimeStore
+from src.database.sector_index import SectorIndex, get_sector_index, rebuild_sector_index
+
+def save_sector(db, code, name, sector_type, stocks):
+    db.save_sector_info({'sector_code': code, 'sector_name': name, 'sector_type': sector_type,
+                         'stocks': [{'stock_code': stock, 'stock_name': f"股票{stock}", 'weight': weight,
+                                     'is_leader': leader} for stock, weight, leader in stocks]})
+
+def load_sectors(db):
+    save_sector(db, 'BK001', '银行', 'industry', [('600036', 2.0, 1), ('600000', 1.0, 0)])
+    save_sector(db, 'BK002', '券商', 'industry', [('600030', 1.0, 1)])
+    save_sector(db, 'BK003', '金融科技', 'concept', [('600000', 0.5, 0), ('300059', 1.0, 1)])
+
+def test_forward_lookup_matches_database(db):
+    load_sectors(db)
+    index = SectorIndex.load(db)
+
+    assert index.get_sector_stocks('BK001') == [
+        {'stock_code': '600000', 'stock_name': '股票600000', 'weight': 1.0, 'is_leader': 0},
+        {'stock_code': '600036', 'stock_name': '股票600036', 'weight': 2.0, 'is_leader': 1},
+    ]
+    assert index.get_sector_stocks('BK999') == []
+    assert index.get_sectors_by_type('industry') == [
+        {'sector_code': 'BK001', 'sector_name': '银行', 'stock_count': 2},
+        {'sector_code': 'BK002', 'sector_name': '券商', 'stock_count': 1},
+    ]
+    assert index.get_sectors_by_type('region') == []
+
+def test_reverse_lookup_by_stock(db):
+    load_sectors(db)
+    index = SectorIndex.load(db)
+
+    assert [row['sector_code'] for row in index.get_stock_sectors('600000')] == ['BK001', 'BK003']
+    assert index.get_stock_sectors('600000', sector_type='concept') == [
+        {'sector_code': 'BK003', 'sector_name': '金融科技', 'sector_type': 'concept'}]
+    assert index.get_stock_sectors('000001') == []
+    assert not index.stock_sectors.flags.writeable
+
+def test_empty_database_builds_empty_index(db):
+    index = SectorIndex.load(db)
+    assert (index.sector_count, index.stock_count) == (0, 0)
+    assert index.get_stock_sectors('600000') == []
+
+def test_rebuild_swaps_shared_index(db):
+    load_sectors(db)
+    old = get_sector_index(db)
+    assert get_sector_index(db) is old
+    aggregator = SectorAggregator(db, RealtimeStore(capacity=16))
+    assert aggregator.index is old
+
+    save_sector(db, 'BK004', '白酒', 'concept', [('600519', 1.0, 1)])
+    new = rebuild_sector_index(db)
+    # 已经拿到旧索引的读取方不受影响，之后的读取使用新索引
+    assert old.sector_count == 3
+    assert get_sector_index(db) is new
+    assert aggregator.index is new
+    assert [row['sector_code'] for row in new.get_stock_sectors('600519')] == ['BK004']
@@ -0,0 +1,69 @@
+import json
+
+import numpy as np
+import pytest
+
+from src.api import serialization
+from src.api.serialization import (PayloadCache, dumps, encode_table, negotiate, pack_columns,
+                                   unpack_columns)
+
+COLUMNS = {'stock_code': ['600000', '000001'], 'price': np.array([10.5, 9.8]),
+           'volume': np.array([100, 200], dtype=np.int64)}
+
+def test_json_and_column_shapes():
+    rows = json.loads(encode_table(COLUMNS, 'json', {'version': 3}))
+    assert rows == {'version': 3, 'rows': [{'stock_code': '600000', 'price': 10.5, 'volume': 100},
+                                           {'stock_code': '000001', 'price': 9.8, 'volume': 200}]}
+    columns = json.loads(encode_table(COLUMNS, 'columns', key='bars'))
+    assert columns == {'bars': {'fields': ['stock_code', 'price', 'volume'],
+                                'values': [['600000', '000001'], [10.5, 9.8], [100, 200]]}}
+    with pytest.raises(ValueError):
+        encode_table(COLUMNS, 'xml')
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_non_finite_floats_become_null(monkeypatch, use_orjson):
+    if use_orjson and serialization.orjson is None:
+        pytest.skip('orjson 未安装')
+    if not use_orjson:
+        monkeypatch.setattr(serialization, 'orjson', None)
+    data = {'array': np.array([1.0, np.nan, np.inf]), 'scalar': np.float64('nan'), 'nested': [float('-inf')]}
+    assert json.loads(dumps(data)) == {'array': [1.0, None, None], 'scalar': None, 'nested': [None]}
+
+def test_packed_round_trip_is_aligned():
+    payload = pack_columns(COLUMNS, {'version': 7})
+    length = int.from_bytes(payload[:4], 'little')
+    assert (4 + length) % 8 == 0
+    header, columns = unpack_columns(payload)
+    assert (header['version'], header['count']) == (7, 2)
+    assert columns['stock_code'] == ['600000', '000001']
+    assert columns['price'].tolist() == [10.5, 9.8]
+    assert columns['volume'].dtype == np.dtype('<i8')
+
+def test_msgpack_matches_column_shape():
+    msgpack = pytest.importorskip('msgpack')
+    body = msgpack.unpackb(encode_table(COLUMNS, 'msgpack', {'version': 1}), raw=False)
+    assert body['rows']['values'][2] == [100, 200]
+
+def test_negotiate_prefers_query_then_q_values():
+    assert negotiate(None) == 'json'
+    assert negotiate('application/vnd.stock.columns+json;q=0.5, application/vnd.stock.packed;q=0.9') == 'packed'
+    assert negotiate('application/vnd.stock.packed', 'columns') == 'columns'
+    assert negotiate('text/html') == 'json'
+    with pytest.raises(ValueError):
+        negotiate(None, 'xml')
+
+def test_payload_cache_keeps_latest_version_only():
+    cache = PayloadCache()
+    builds = []
+
+    def build(body):
+        builds.append(body)
+        return body
+    assert cache.get(1, 'json', lambda: build(b'v1')) == b'v1'
+    assert cache.get(1, 'json', lambda: build(b'again')) == b'v1'
+    assert cache.get(2, 'json', lambda: build(b'v2')) == b'v2'
+    # 旧版本的请求不会覆盖新版本的缓存
+    assert cache.get(1, 'json', lambda: build(b'old')) == b'old'
+    assert cache.get(2, 'json', lambda: build(b'x')) == b'v2'
+    assert builds == [b'v1', b'v2', b'old']
+    assert (cache.hits, cache.misses) == (2, 3)
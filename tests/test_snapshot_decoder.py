@@ -0,0 +1,64 @@
+import struct
+
+import numpy as np
+import pytest
+
+from src.data_collector.snapshot_decoder import ROW_SIZE, SNAPSHOT_FIELDS, SnapshotDecoder
+
+def encode_row(values):
+    """按 SNAPSHOT_FIELDS 布局构造一行内存"""
+    row = bytearray(ROW_SIZE)
+    for name, offset, dtype in SNAPSHOT_FIELDS:
+        value = values.get(name, 0)
+        if dtype == 'S6':
+            row[offset:offset + 6] = value.encode('ascii').ljust(6, b'\x00')
+        elif dtype == '<f4':
+            row[offset:offset + 4] = struct.pack('<f', value)
+        else:
+            row[offset:offset + 4] = struct.pack('<I', value)
+    return bytes(row)
+
+ROWS = [
+    {'code': '600000', 'prev_close': 10.0, 'open': 10.1, 'high': 10.5, 'low': 9.9,
+     'current': 10.2, 'volume': 12345, 'current_volume': 12},
+    {'code': '000001', 'prev_close': 9.0, 'open': 9.1, 'high': 9.3, 'low': 8.9,
+     'current': 9.05, 'volume': 678, 'current_volume': 3},
+]
+
+def test_decode_block_to_dicts():
+    decoder = SnapshotDecoder()
+    block = b''.join(encode_row(row) for row in ROWS)
+    quotes = decoder.to_dicts(decoder.decode(block))
+
+    assert [quote['code'] for quote in quotes] == ['600000', '000001']
+    # 单精度价格还原为3位小数的双精度
+    assert quotes[0]['current'] == 10.2
+    assert quotes[1]['current'] == 9.05
+    assert quotes[0]['volume'] == 12345
+    assert isinstance(quotes[0]['volume'], int)
+
+def test_decode_does_not_copy_and_limits_rows():
+    decoder = SnapshotDecoder()
+    # 末尾不足一行的数据被忽略
+    block = bytearray(b''.join(encode_row(row) for row in ROWS) + b'\x00' * 10)
+    records = decoder.decode(block, rows=5)
+    assert len(records) == 2
+    assert len(decoder.decode(block, rows=1)) == 1
+
+    struct.pack_into('<I', block, dict((n, o) for n, o, _ in SNAPSHOT_FIELDS)['volume'], 99)
+    assert records['volume'][0] == 99
+
+def test_field_type_override():
+    decoder = SnapshotDecoder(field_types={'current': '<u4'})
+    row = bytearray(encode_row(ROWS[0]))
+    struct.pack_into('<I', row, 0x1B, 10200)
+    columns = decoder.to_columns(decoder.decode(bytes(row)))
+    assert columns['current'].tolist() == [10200]
+    assert columns['current'].dtype == np.uint32
+
+def test_field_outside_row_rejected():
+    with pytest.raises(ValueError):
+        SnapshotDecoder(fields=(('code', 0, 'S6'), ('current', ROW_SIZE - 2, '<f4')))
+
+def test_block_size():
+    assert SnapshotDecoder().block_size(80) == 80 * ROW_SIZE
@@ -0,0 +1,65 @@
+import time
+
+from src.data_collector.quote_source import ReplayQuoteSource
+from src.data_collector.stock_collector import ChangeDetector, StockCollector
+
+def quote(code, current, volume):
+    return {'code': code, 'current': current, 'open': 10.0, 'high': current, 'low': 10.0,
+            'prev_close': 10.0, 'volume': volume}
+
+FRAMES = [
+    (1704159060.0, [quote('600000', 10.1, 100), quote('000001', 9.0, 50)]),
+    (1704159061.0, [quote('600000', 10.1, 100), quote('000001', 9.1, 60)]),
+    (1704159062.0, [quote('600000', 10.1, 100), quote('000001', 9.1, 60)]),
+]
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, rows, timestamp):
+        self.calls.append(([row['code'] for row in rows], timestamp))
+
+def test_change_detector_passes_only_changed_rows():
+    detector = ChangeDetector()
+    assert len(detector.filter(FRAMES[0][1])) == 2
+    assert [row['code'] for row in detector.filter(FRAMES[1][1])] == ['000001']
+    assert detector.filter(FRAMES[2][1]) == []
+    detector.reset()
+    assert len(detector.filter(FRAMES[2][1])) == 2
+
+def test_sinks_receive_changed_rows_with_snapshot_moment(db):
+    recorder = Recorder()
+    collector = StockCollector(ReplayQuoteSource(FRAMES, speed=None), db, interval=0, sinks=[recorder])
+    collector.start_collecting()
+
+    # 第三帧没有变化，不调用接收者
+    assert recorder.calls == [(['600000', '000001'], 1704159060.0), (['000001'], 1704159061.0)]
+    stats = collector.get_stats()
+    assert (stats['ticks'], stats['rows_read'], stats['rows_changed']) == (3, 6, 3)
+
+def test_failing_sink_does_not_block_others(db):
+    def broken(rows, timestamp):
+        raise RuntimeError("boom")
+    recorder = Recorder()
+    collector = StockCollector(ReplayQuoteSource(FRAMES[:1], speed=None), db, interval=0,
+                               sinks=[broken, recorder])
+    collector.start_collecting()
+    assert len(recorder.calls) == 1
+
+def test_slow_tick_is_counted_as_overrun(db):
+    def slow(rows, timestamp):
+        time.sleep(0.05)
+    collector = StockCollector(ReplayQuoteSource(FRAMES[:2], speed=None), db, interval=0.01, sinks=[slow])
+    collector.start_collecting()
+
+    stats = collector.get_stats()
+    assert stats['overruns'] >= 1
+    assert stats['skipped_ticks'] >= 1
+    assert stats['max_duration'] >= 0.05
+
+def test_stop_ends_loop(db):
+    collector = StockCollector(ReplayQuoteSource(FRAMES * 100, speed=None), db, interval=0.001)
+    collector.sinks = [lambda rows, timestamp: collector.stop()]
+    collector.start_collecting()
+    assert collector.get_stats()['ticks'] == 1
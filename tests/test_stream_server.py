@@ -0,0 +1,334 @@
+import asyncio
+import json
+
+from src.analysis.alerts import AlertEngine
+from src.api.stream_server import (Broadcaster, StreamFilter, StreamGroup, StreamServer, Subscriber,
+                                   delta_records)
+from src.database.realtime_store import RealtimeStore
+
+def quote(code, current):
+    return {'code': code, 'name': '', 'current': current, 'open': 10.0, 'high': current,
+            'low': 10.0, 'prev_close': 10.0, 'volume': 100, 'amount': current * 100}
+
+def run_server(store, scenario, history=600, db=None, **options):
+    """在临时端口上运行推送服务和广播者，执行 scenario(port, broadcaster)"""
+    async def main():
+        broadcaster = Broadcaster(store, AlertEngine(store), interval=0.01, history=history, db=db)
+        server = StreamServer('127.0.0.1', 0, broadcaster, **options)
+        listener = await asyncio.start_server(server.handle, '127.0.0.1', 0, limit=server.max_header_bytes)
+        producer = asyncio.create_task(broadcaster.run())
+        try:
+            return await asyncio.wait_for(scenario(listener.sockets[0].getsockname()[1], broadcaster), 5)
+        finally:
+            producer.cancel()
+            listener.close()
+            await listener.wait_closed()
+    return asyncio.run(main())
+
+async def request(port, head: bytes):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(head)
+    await writer.drain()
+    return reader, writer
+
+async def read_event(reader):
+    """读取下一条 SSE 消息（跳过心跳）"""
+    while True:
+        message = (await reader.readuntil(b'\n\n')).decode('utf-8')
+        if not message.startswith(':'):
+            return message
+
+def parse_event(message):
+    """SSE 消息 -> (事件名, 事件 id, 数据)"""
+    fields = dict(line.split(': ', 1) for line in message.strip().split('\n'))
+    return fields.get('event'), fields.get('id'), json.loads(fields['data'])
+
+async def caught_up(broadcaster, store):
+    """等广播者发布到行情表的当前版本"""
+    while broadcaster.version != store.version:
+        await asyncio.sleep(0.005)
+
+async def subscribe(port, last_event_id=None, query=''):
+    head = f'GET /api/realtime{query} HTTP/1.1\r\n'.encode()
+    if last_event_id is not None:
+        head += b'Last-Event-ID: ' + last_event_id.encode() + b'\r\n'
+    reader, writer = await request(port, head + b'\r\n')
+    await reader.readuntil(b'\r\n\r\n')
+    return reader, writer
+
+def test_snapshot_then_deltas_with_changed_fields_only():
+    store = RealtimeStore(capacity=16)
+    store.update([quote('600000', 10.5), quote('000001', 10.0)])
+
+    async def scenario(port, broadcaster):
+        await caught_up(broadcaster, store)
+        reader, writer = await request(port, b'GET /api/realtime HTTP/1.1\r\nHost: x\r\n\r\n')
+        head = await reader.readuntil(b'\r\n\r\n')
+        first = await read_event(reader)
+        store.update([quote('600000', 10.8)])
+        second = await read_event(reader)
+        writer.close()
+        return head, broadcaster.epoch, first, second
+
+    head, epoch, first, second = run_server(store, scenario)
+    assert head.startswith(b'HTTP/1.1 200 OK')
+    assert b'text/event-stream' in head
+    event, event_id, data = parse_event(first)
+    assert (event, event_id, data['version']) == ('snapshot', f"{epoch}:1", 1)
+    assert [row['current_price'] for row in data['rows']] == [10.5, 10.0]
+
+    event, event_id, data = parse_event(second)
+    assert (event, event_id, data['base'], data['version']) == ('delta', f"{epoch}:2", 1, 2)
+    # 只有变化的股票和字段
+    assert [row['stock_code'] for row in data['rows']] == ['600000']
+    assert data['rows'][0]['current_price'] == 10.8
+    assert not {'stock_name', 'open_price', 'volume'} & set(data['rows'][0])
+
+def test_resume_sends_only_missing_deltas():
+    store = RealtimeStore(capacity=16)
+    store.update([quote('600000', 10.1)])
+
+    async def scenario(port, broadcaster):
+        await caught_up(broadcaster, store)
+        epoch = broadcaster.epoch
+        for price in (10.2, 10.3):
+            store.update([quote('600000', price)])
+            await caught_up(broadcaster, store)
+        reader, writer = await subscribe(port, f"{epoch}:2")
+        resumed = await read_event(reader)
+        writer.close()
+        # 不是本次启动产生的 id 退回全量快照
+        reader, writer = await subscribe(port, f"{epoch - 1}:2")
+        restarted = await read_event(reader)
+        writer.close()
+        return epoch, resumed, restarted, broadcaster.stats['resumes']
+
+    epoch, resumed, restarted, resumes = run_server(store, scenario)
+    event, event_id, data = parse_event(resumed)
+    assert (event, event_id, data['base']) == ('delta', f"{epoch}:3", 2)
+    assert data['rows'][0]['current_price'] == 10.3
+    event, event_id, data = parse_event(restarted)
+    assert (event, event_id) == ('snapshot', f"{epoch}:3")
+    assert resumes == 1
+
+def test_resume_beyond_ring_falls_back_to_snapshot():
+    store = RealtimeStore(capacity=16)
+    store.update([quote('600000', 10.1)])
+
+    async def scenario(port, broadcaster):
+        await caught_up(broadcaster, store)
+        epoch = broadcaster.epoch
+        for price in (10.2, 10.3, 10.4):
+            store.update([quote('600000', price)])
+            await caught_up(broadcaster, store)
+        reader, writer = await subscribe(port, f"{epoch}:1")
+        message = await read_event(reader)
+        writer.close()
+        return message
+
+    event, _, data = parse_event(run_server(store, scenario, history=2))
+    assert event == 'snapshot'
+    assert data['rows'][0]['current_price'] == 10.4
+
+def test_concurrent_snapshots_share_one_encoding():
+    store = RealtimeStore(capacity=16)
+    store.update([quote('600000', 10.1)])
+    broadcaster = Broadcaster(store, AlertEngine(store))
+
+    async def main():
+        frame = store.frame()
+        group = StreamGroup(StreamFilter())
+        payloads = await asyncio.gather(*[broadcaster.snapshot(group, frame) for _ in range(4)])
+        return payloads, await broadcaster.snapshot(group, frame)
+
+    payloads, cached = asyncio.run(main())
+    assert all(payload is cached for payload in payloads)
+    assert broadcaster.stats['snapshots'] == 1
+
+def test_delta_records_for_new_and_changed_symbols():
+    store = RealtimeStore(capacity=16)
+    store.update([quote('600000', 10.1)], timestamp=1.0)
+    previous = store.frame()
+    store.update([quote('600000', 10.1), quote('000001', 9.0)], timestamp=1.0)
+    frame = store.frame()
+
+    records = delta_records(previous, frame, frame.changed_slots(previous.version))
+    # 值没有变化的字段不发送，新出现的股票带全部字段
+    assert records[0] == {'stock_code': '600000'}
+    assert records[1]['stock_name'] == ''
+    assert records[1]['current_price'] == 9.0
+
+def test_alert_events_are_pushed():
+    store = RealtimeStore(capacity=16)
+
+    async def scenario(port, broadcaster):
+        reader, writer = await request(port, b'GET /api/realtime HTTP/1.1\r\n\r\n')
+        await reader.readuntil(b'\r\n\r\n')
+        broadcaster.alerts.stream.publish([{'alert_id': 1, 'stock_code': '600000'}])
+        message = await read_event(reader)
+        while not message.startswith('event: alert'):
+            message = await read_event(reader)
+        writer.close()
+        return message
+
+    message = run_server(store, scenario)
+    assert message.startswith('event: alert\n')
+    assert json.loads(message.split('data: ', 1)[1])[0]['alert_id'] == 1
+
+def test_filtered_stream_gets_only_its_codes_and_fields(db):
+    db.save_sector_info({'sector_code': 'BK001', 'sector_name': '银行', 'sector_type': 'industry',
+                         'stocks': [{'stock_code': '600036', 'stock_name': '招商银行'}]})
+    store = RealtimeStore(capacity=16)
+    store.update([quote('600000', 10.1), quote('600036', 10.1), quote('000001', 10.1)])
+
+    async def scenario(port, broadcaster):
+        await caught_up(broadcaster, store)
+        reader, writer = await subscribe(port, query='?codes=600000&sectors=BK001&fields=current_price')
+        snapshot = await read_event(reader)
+        # 订阅范围之外的变化不推送，下一条消息是 600000 的增量
+        store.update([quote('000001', 10.2)])
+        await caught_up(broadcaster, store)
+        store.update([quote('600000', 10.3)])
+        delta = await read_event(reader)
+        broadcaster.alerts.stream.publish([{'alert_id': 1, 'stock_code': '000001'},
+                                           {'alert_id': 2, 'stock_code': '600036'}])
+        alert = await read_event(reader)
+        writer.close()
+        return snapshot, delta, alert
+
+    snapshot, delta, alert = run_server(store, scenario, db=db)
+    event, _, data = parse_event(snapshot)
+    assert event == 'snapshot'
+    assert data['rows'] == [{'current_price': 10.1, 'stock_code': '600000'},
+                            {'current_price': 10.1, 'stock_code': '600036'}]
+    event, _, data = parse_event(delta)
+    assert (event, data['rows']) == ('delta', [{'current_price': 10.3, 'stock_code': '600000'}])
+    event, _, data = parse_event(alert)
+    assert (event, [item['alert_id'] for item in data]) == ('alert', [2])
+
+def test_same_filters_share_a_group():
+    store = RealtimeStore(capacity=16)
+    store.update([quote('600000', 10.1)])
+
+    async def scenario(port, broadcaster):
+        await caught_up(broadcaster, store)
+        first = await subscribe(port, query='?codes=600000')
+        second = await subscribe(port, query='?codes=600000')
+        messages = [await read_event(first[0]), await read_event(second[0])]
+        groups = len(broadcaster.groups)
+        first[1].close()
+        second[1].close()
+        return messages, groups, broadcaster.stats['snapshots']
+
+    messages, groups, snapshots = run_server(store, scenario)
+    assert messages[0] == messages[1]
+    assert groups == 1
+    # 同一版本的快照只生成一次
+    assert snapshots == 1
+
+def test_columns_format_snapshot_and_row_deltas():
+    store = RealtimeStore(capacity=16)
+    store.update([quote('600000', 10.5), quote('000001', 10.0)])
+
+    async def scenario(port, broadcaster):
+        await caught_up(broadcaster, store)
+        reader, writer = await subscribe(port, query='?format=columns&fields=current_price')
+        snapshot = await read_event(reader)
+        store.update([quote('000001', 9.9)])
+        delta = await read_event(reader)
+        writer.close()
+        return snapshot, delta
+
+    snapshot, delta = run_server(store, scenario)
+    event, _, data = parse_event(snapshot)
+    assert event == 'snapshot'
+    # 按列发送，字段名只出现一次
+    assert data['rows'] == {'fields': ['stock_code', 'current_price'],
+                            'values': [['600000', '000001'], [10.5, 10.0]]}
+    event, _, data = parse_event(delta)
+    assert (event, data['rows']) == ('delta', [{'stock_code': '000001', 'current_price': 9.9}])
+
+def test_unknown_field_or_binary_format_is_400():
+    async def scenario(port, broadcaster):
+        responses = []
+        for query in (b'fields=bogus', b'format=packed'):
+            reader, writer = await request(port, b'GET /api/realtime?' + query + b' HTTP/1.1\r\n\r\n')
+            responses.append(await reader.read())
+        return responses
+
+    fields, binary = run_server(RealtimeStore(capacity=16), scenario)
+    assert fields.startswith(b'HTTP/1.1 400 Bad Request')
+    assert 'bogus' in json.loads(fields.split(b'\r\n\r\n', 1)[1])['error']
+    # SSE 只能承载文本格式
+    assert binary.startswith(b'HTTP/1.1 400 Bad Request')
+
+def test_filter_mask_grows_with_new_symbols():
+    stream_filter = StreamFilter.from_query('codes=000001,300750', lambda sectors: set())
+    store = RealtimeStore(capacity=16)
+    store.update([quote('600000', 10.0), quote('000001', 10.0)])
+    first = stream_filter.mask(store.frame())
+    assert first.tolist() == [False, True]
+
+    store.update([quote('300750', 10.0)])
+    assert stream_filter.mask(store.frame()).tolist() == [False, True, True]
+    # 已返回的位图不被修改
+    assert first.tolist() == [False, True]
+    assert stream_filter.project([{'stock_code': '000001', 'volume': 1}]) == [{'stock_code': '000001', 'volume': 1}]
+    assert StreamFilter.from_query('', lambda sectors: set()).is_full
+
+def test_unknown_path_is_404():
+    async def scenario(port, broadcaster):
+        reader, writer = await request(port, b'GET /api/other HTTP/1.1\r\n\r\n')
+        return await reader.read()
+
+    response = run_server(RealtimeStore(capacity=16), scenario)
+    assert response.startswith(b'HTTP/1.1 404 Not Found')
+    assert json.loads(response.split(b'\r\n\r\n', 1)[1]) == {'error': 'Not found'}
+
+def test_slow_request_gets_408():
+    async def scenario(port, broadcaster):
+        # 请求头一直没有结束的空行
+        reader, writer = await request(port, b'GET /api/realtime HTTP/1.1\r\nHost: x\r\n')
+        return await reader.read()
+
+    response = run_server(RealtimeStore(capacity=16), scenario, request_timeout=0.1)
+    assert response.startswith(b'HTTP/1.1 408 Request Timeout')
+
+def test_too_many_or_too_large_headers_get_431():
+    async def scenario(port, broadcaster):
+        many = b'GET /api/realtime HTTP/1.1\r\n' + b'X-A: 1\r\n' * 6 + b'\r\n'
+        reader, writer = await request(port, many)
+        too_many = await reader.read()
+        reader, writer = await request(port, b'GET /api/realtime HTTP/1.1\r\nX-Big: ' + b'a' * 600 + b'\r\n\r\n')
+        too_large = await reader.read()
+        reader, writer = await request(port, b'GET /api/other HTTP/1.1\r\n' + b'X-A: 1\r\n' * 5 + b'\r\n')
+        at_limit = await reader.read()
+        return too_many, too_large, at_limit
+
+    too_many, too_large, at_limit = run_server(RealtimeStore(capacity=16), scenario,
+                                               max_header_lines=5, max_header_bytes=512)
+    assert too_many.startswith(b'HTTP/1.1 431 ')
+    assert too_large.startswith(b'HTTP/1.1 431 ')
+    # 恰好在上限内的请求正常处理
+    assert at_limit.startswith(b'HTTP/1.1 404 ')
+
+def test_slow_subscriber_is_dropped():
+    class Transport:
+        aborted = False
+
+        def abort(self):
+            self.aborted = True
+
+    class Writer:
+        transport = Transport()
+
+    async def scenario():
+        subscriber = Subscriber(Writer(), 2, StreamGroup(StreamFilter()))
+        for i in range(3):
+            subscriber.send(b'data: %d\n\n' % i)
+        return subscriber
+
+    subscriber = asyncio.run(scenario())
+    assert subscriber.closed
+    assert subscriber.writer.transport.aborted
+    assert subscriber.queue.qsize() == 2